@@ -1,6 +1,46 @@
 # app/bot.py
 from aiogram import Bot, Dispatcher
-from app.config import BOT_TOKEN
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from app.config import BOT_TOKEN, TELEGRAM_API_BASE
+from app.middlewares import (
+    DbReleaseMiddleware,
+    ResultRecorder,
+    TelegramMetrics,
+    db_session,
+    handler_metrics,
+    idempotency,
+    throttling,
+    update_metrics,
+)
+from app.services.outbound import OutboundMiddleware
 
-bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
+if TELEGRAM_API_BASE:
+    bot = Bot(
+        token=BOT_TOKEN,
+        parse_mode="HTML",
+        session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_BASE)),
+    )
+else:
+    bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
+# подключение апдейта к БД — в пул до ожидания в очереди (middlewares/db_session.py)
+bot.session.middleware(DbReleaseMiddleware())
+# все исходящие запросы — через очередь с приоритетами (services/outbound.py)
+bot.session.middleware(OutboundMiddleware())
+# запоминает ответы денежных кнопок для дублей (middlewares/idempotency.py)
+bot.session.middleware(ResultRecorder())
+# время и ошибки Bot API по методам — ближе всех к запросу, без ожидания в очереди
+bot.session.middleware(TelegramMetrics())
 dp = Dispatcher()
+# метрики апдейтов — снаружи всех middlewares (app/services/metrics.py)
+dp.update.outer_middleware(update_metrics)
+# одно подключение к БД на апдейт, берётся при первом запросе (middlewares/db_session.py)
+dp.update.outer_middleware(db_session)
+# антифлуд — до фильтров и хендлеров (middlewares/throttling.py)
+dp.callback_query.outer_middleware(throttling)
+dp.message.outer_middleware(throttling)
+# повторы денежных кнопок получают ответ первого нажатия
+dp.callback_query.outer_middleware(idempotency)
+# время хендлеров по имени — после фильтров, когда хендлер уже выбран
+dp.message.middleware(handler_metrics)
+dp.callback_query.middleware(handler_metrics)
@@ -10,6 +10,25 @@ DATABASE_URL = os.getenv("DATABASE_URL") or os.getenv("PGDATABASE_URL")
 
 # --- Telegram BOT ---
 BOT_TOKEN = "8589113961:AAH8bF8umtdtYhkhmBB5oW8NoMBMxI4bLxk"
+# адрес Bot API; пусто — api.telegram.org. Для нагрузочных проверок —
+# локальная замена: http://127.0.0.1:8081 (tools/fake_bot_api.py)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "")
+
+# --- Получение апдейтов ---
+# "polling" — long polling, "webhook" — aiohttp-сервер (app/webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")   # https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")      # X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = int(os.getenv("PORT", "8080"))
+WEBHOOK_MAX_CONCURRENCY = 64      # апдейтов в обработке одновременно
+WEBHOOK_QUEUE_SIZE = 2000         # сверх этого — 503, Telegram пришлёт апдейт повторно
+
+# --- Метрики Prometheus (app/services/metrics.py) ---
+# GET /metrics на своём порту; 0 — сервер метрик не поднимается
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
 
 # --- TON ---
 TON_WALLET_ADDRESS = "UQCzzlkNLsCGqHTUj1zkD_3CVBMoXw-9Od3dRKGgHaBxysYe"
@@ -27,12 +46,111 @@ HISTORY_PAGE_SIZE = 10
 GAME_CANCEL_TTL_SECONDS = 60
 DICE_MIN_BET = 10
 DICE_BET_MIN_CANCEL_AGE = timedelta(minutes=1)
+# открытая игра без соперника автоматически отменяется (ставка возвращается)
+DICE_OPEN_GAME_TTL_SECONDS = 30 * 60
+
+# --- Быстрая игра (кости) ---
+# допуск по ставке в %, 0 — соперник только с точно такой же ставкой
+DICE_QUICK_BET_TOLERANCE_PERCENT = 0
+DICE_QUICK_QUEUE_TIMEOUT_SECONDS = 120
+
+# --- Лобби костей ---
+LOBBY_PAGE_SIZE = 8
+# фильтры по ставке: (от, до) включительно, None — без верхней границы
+LOBBY_BET_FILTERS = [(10, 99), (100, 999), (1000, None)]
 
 # --- Банкир ---
 RAFFLE_TIMER_SECONDS = 60
 RAFFLE_MIN_BET = 10
 RAFFLE_MAX_BETS_PER_ROUND = 10
 RAFFLE_CANCEL_WINDOW_SECONDS = 600  # 10 минут
+# живое меню комнаты: правки сообщений зрителей
+RAFFLE_LIVE_DEBOUNCE_SECONDS = 1          # собрать события в одну правку
+RAFFLE_LIVE_MIN_INTERVAL_SECONDS = 3      # не чаще одной волны правок на комнату
+RAFFLE_LIVE_TIMER_STEP_SECONDS = 10       # шаг обратного отсчёта
+RAFFLE_LIVE_VIEWER_TTL_SECONDS = 10 * 60  # сколько держать меню «живым»
+# журнал раундов (восстановление после перезапуска)
+RAFFLE_JOURNAL_PATH = os.getenv("RAFFLE_JOURNAL_PATH", "data/raffle.journal")
+RAFFLE_JOURNAL_COMPACT_BYTES = 1024 * 1024
+# комнаты с фиксированной ценой доли (₽) — по одной на уровень
+RAFFLE_ROOM_TIERS = [10, 50, 100, 500, 1000]
+# своя комната без ставок удаляется через это время
+RAFFLE_PRIVATE_ROOM_TTL_SECONDS = 30 * 60
+
+# --- Планировщик ---
+SCHEDULER_TICK_SECONDS = 0.1
+# как часто сохранять отложенные задачи в БД
+SCHEDULER_PERSIST_INTERVAL_SECONDS = 5
+SCHEDULER_ROLLUP_INTERVAL_SECONDS = 60
+# незавершённый ввод (ставка, сумма, получатель) сбрасывается через это время
+STATE_INPUT_TTL_SECONDS = 15 * 60
+
+# --- Снимок состояния (тёплый перезапуск) ---
+STATE_SNAPSHOT_PATH = os.getenv("STATE_SNAPSHOT_PATH", "data/state.snapshot")
+STATE_SNAPSHOT_INTERVAL_SECONDS = 30
+# при остановке: сколько ждать идущие партии в кости, прежде чем прервать их
+GAME_SHUTDOWN_DRAIN_SECONDS = 15
+
+# --- Исходящие запросы к Telegram ---
+OUTBOUND_GLOBAL_RATE = 25           # сообщений/сек на весь бот
+OUTBOUND_GLOBAL_BURST = 10
+OUTBOUND_PER_CHAT_INTERVAL = 1.0    # сек между сообщениями в один чат после всплеска
+OUTBOUND_PER_CHAT_BURST = 3
+# длина полос: интерактив, игры, уведомления
+OUTBOUND_LANE_CAPACITY = (1000, 500, 200)
+
+# --- Рассылки (итоги Банкира, возвраты, пополнения) ---
+BROADCAST_CONCURRENCY = 16
+BROADCAST_MAX_RETRIES = 3
+BROADCAST_MAX_RETRY_AFTER = 5        # повторов после 429 на одно сообщение
+BROADCAST_DEADLINE_SECONDS = 300     # не доставлено за это время от начала рассылки — не доставлено
+
+# --- Антифлуд (app/middlewares/throttling.py) ---
+# семейство -> (секунд на одно нажатие, всплеск подряд)
+THROTTLE_FAMILIES = {
+    "rating": (3.0, 2),       # рейтинги и история — тяжёлые запросы к БД
+    "refresh": (0.5, 4),      # обновление лобби / комнаты Банкира
+    "money": (0.5, 3),        # ставки, вступление, отмена
+    "default": (0.3, 6),
+    "message": (0.2, 10),     # текстовые сообщения и кнопки нижнего меню
+}
+# префикс callback_data (до ":") -> семейство; остальные — "default"
+THROTTLE_PREFIXES = {
+    "rating": "rating",
+    "game_rating": "rating",
+    "raffle_rating": "rating",
+    "my_games": "rating",
+    "refresh_games": "refresh",
+    "games_page": "refresh",
+    "game_refresh": "refresh",
+    "menu_games": "refresh",
+    "raffle_refresh": "refresh",
+    "raffle_room": "refresh",
+    "mode_banker": "refresh",
+    "join_confirm": "money",
+    "cancel_game": "money",
+    "create_game": "money",
+    "quick_play": "money",
+    "raffle_quick": "money",
+    "raffle_make_bet": "money",
+    "raffle_cancel": "money",
+    "raffle_private_new": "money",
+}
+# одинаковые нажатия (тот же callback_data) в этом окне — одно выполнение
+THROTTLE_COALESCE_SECONDS = 1.0
+
+# --- Идемпотентность денежных кнопок (app/middlewares/idempotency.py) ---
+# префикс callback_data -> сколько секунд повтор (user, действие, цель)
+# считается дублем и получает ответ первого нажатия
+IDEMPOTENT_ACTIONS = {
+    "join_confirm": 60.0,     # вступление в игру — разовое действие
+    "cancel_game": 60.0,      # отмена ставки — тоже
+    "raffle_quick": 3.0,      # повторная быстрая ставка через пару секунд — осознанная
+}
+# повторная доставка того же callback_query (тот же id)
+IDEMPOTENCY_CALLBACK_TTL_SECONDS = 600
+# сколько дубль ждёт, пока первое нажатие ещё обрабатывается
+IDEMPOTENCY_WAIT_SECONDS = 10.0
 
 # --- Админы ---
 MAIN_ADMIN_ID = 7106398341
@@ -1,24 +1,47 @@
 # app/db/__init__.py
 
-from .pool import init_db, pool
+from .pool import (
+    init_db,
+    close_db,
+    get_storage,
+    open_storage,
+    db_scope,
+    db_scope_release,
+    db_scope_stats,
+)
+from .storage import Storage
 from .users import upsert_user, get_user_registered_at
 from .games import (
     upsert_game,
     get_user_games,
     get_user_dice_games_count,
     get_users_profit_and_games_30_days,
+    get_max_game_id,
+    get_unfinished_games,
+    delete_game,
+    add_queue_entry,
+    delete_queue_entry,
+    get_queue_entries,
 )
 from .raffle import (
     upsert_raffle_round,
     add_raffle_bet,
     get_user_raffle_bets_count,
     get_user_bets_in_raffle,
+    get_max_raffle_round_id,
 )
 from .deposits import add_ton_deposit
 from .transfers import add_transfer
+from .scheduler import load_scheduled_jobs, save_scheduled_jobs
 
 __all__ = [
-    "pool",
+    "close_db",
+    "get_storage",
+    "open_storage",
+    "Storage",
+    "db_scope",
+    "db_scope_release",
+    "db_scope_stats",
     "init_db",
     "upsert_user",
     "get_user_registered_at",
@@ -26,12 +49,21 @@ __all__ = [
     "get_user_games",
     "get_user_dice_games_count",
     "get_users_profit_and_games_30_days",
+    "get_max_game_id",
+    "get_unfinished_games",
+    "delete_game",
+    "add_queue_entry",
+    "delete_queue_entry",
+    "get_queue_entries",
     "upsert_raffle_round",
     "add_raffle_bet",
     "get_user_raffle_bets_count",
     "get_user_bets_in_raffle",
+    "get_max_raffle_round_id",
     "add_ton_deposit",
     "add_transfer",
+    "load_scheduled_jobs",
+    "save_scheduled_jobs",
 ]
 
 
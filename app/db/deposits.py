@@ -1,7 +1,5 @@
 # app/db/deposits.py
-from datetime import datetime, timezone
-
-from .pool import pool
+from .pool import get_storage
 
 
 async def add_ton_deposit(
@@ -12,18 +10,7 @@ async def add_ton_deposit(
     comment: str,
 ):
     """Сохранить факт пополнения через TON."""
-    if not pool:
+    storage = get_storage()
+    if not storage:
         return
-    async with pool.acquire() as db:
-        await db.execute(
-            """
-            INSERT INTO ton_deposits (tx_hash, user_id, ton_amount, coins, comment, at)
-            VALUES ($1, $2, $3, $4, $5, $6)
-        """,
-            tx_hash,
-            user_id,
-            ton_amount,
-            coins,
-            comment,
-            datetime.now(timezone.utc).isoformat(),
-        )
+    await storage.add_ton_deposit(tx_hash, user_id, ton_amount, coins, comment)
@@ -1,127 +1,95 @@
 # app/db/pool.py
 import os
-from datetime import datetime, timezone
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
 
-import asyncpg
+from app.services.user_store import UserStore
 
+from .storage import Storage
 
-# Глобальный пул подключений к PostgreSQL
-pool: asyncpg.Pool | None = None
+
+# Текущее хранилище (после init_db). Модули берут его через get_storage():
+# `from .pool import storage` связал бы имя один раз при импорте, с None.
+storage: Storage | None = None
+
+
+def get_storage() -> Storage | None:
+    return storage
+
+
+def open_storage(dsn: str) -> Storage:
+    """
+    Хранилище по DSN:
+    - postgres://... / postgresql://...  — PostgreSQL (asyncpg)
+    - sqlite:///data/bot.db              — SQLite, путь относительно рабочей папки
+    - sqlite:////var/lib/bot.db          — SQLite, абсолютный путь
+    - sqlite://  или  sqlite://:memory:  — SQLite в памяти
+    Реализации импортируются здесь: второй драйвер ставить не обязательно.
+    """
+    if dsn.startswith(("postgres://", "postgresql://")):
+        from .postgres import PostgresStorage
+        return PostgresStorage(dsn)
+    if dsn.startswith("sqlite://"):
+        from .sqlite import SqliteStorage
+        path = dsn[len("sqlite://"):]
+        if path.startswith("/"):
+            path = path[1:]
+        return SqliteStorage(path or ":memory:")
+    raise Exception(f"Неизвестная схема DATABASE_URL: {dsn.split(':', 1)[0]}")
 
 
 async def init_db(
-    user_balances: Dict[int, int],
-    user_usernames: Dict[int, str],
+    user_store: UserStore,
     processed_ton_tx: set[str],
+    dsn: str | None = None,
 ):
-    """Инициализация пула подключений и создание таблиц + загрузка кэша."""
-    global pool
+    """Подключение к хранилищу, создание таблиц + загрузка кэша."""
+    global storage
 
-    DATABASE_URL = os.environ.get("DATABASE_URL")
+    DATABASE_URL = dsn or os.environ.get("DATABASE_URL")
     if not DATABASE_URL:
         raise Exception(
             "Переменная окружения DATABASE_URL не найдена. "
-            "Подключение к PostgreSQL невозможно."
+            "Укажите PostgreSQL (postgres://...) или SQLite (sqlite:///bot.db)."
         )
 
-    pool = await asyncpg.create_pool(DATABASE_URL)
-
-    async with pool.acquire() as db:
-        # 1. Таблица users
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id BIGINT PRIMARY KEY,
-                username TEXT,
-                balance INTEGER,
-                registered_at TEXT
-            )
-        """
-        )
+    new_storage = open_storage(DATABASE_URL)
+    await new_storage.open()
+    await new_storage.create_schema()
 
-        # 2. Таблица games
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS games (
-                id SERIAL PRIMARY KEY,
-                creator_id BIGINT,
-                opponent_id BIGINT,
-                bet INTEGER,
-                creator_roll INTEGER,
-                opponent_roll INTEGER,
-                winner TEXT,
-                finished INTEGER,
-                created_at TEXT,
-                finished_at TEXT
-            )
-        """
-        )
+    # Загрузка пользователей в память
+    user_store.load(await new_storage.load_users())
 
-        # 3. Таблица raffle_rounds
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS raffle_rounds (
-                id SERIAL PRIMARY KEY,
-                created_at TEXT,
-                finished_at TEXT,
-                winner_id BIGINT,
-                total_bank INTEGER
-            )
-        """
-        )
+    # Загрузка обработанных TON-транзакций
+    processed_ton_tx.update(await new_storage.load_ton_tx())
 
-        # 4. Таблица raffle_bets
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS raffle_bets (
-                id SERIAL PRIMARY KEY,
-                raffle_id INTEGER,
-                user_id BIGINT,
-                amount INTEGER
-            )
-        """
-        )
+    storage = new_storage
 
-        # 5. Таблица ton_deposits
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ton_deposits (
-                tx_hash TEXT PRIMARY KEY,
-                user_id BIGINT,
-                ton_amount REAL,
-                coins INTEGER,
-                comment TEXT,
-                at TEXT
-            )
-        """
-        )
 
-        # 6. Таблица transfers
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS transfers (
-                id SERIAL PRIMARY KEY,
-                from_id BIGINT,
-                to_id BIGINT,
-                amount INTEGER,
-                at TEXT
-            )
-        """
-        )
+async def close_db() -> None:
+    global storage
+    if storage is not None:
+        await storage.close()
+        storage = None
+
+
+@asynccontextmanager
+async def db_scope() -> AsyncIterator[None]:
+    """Одно подключение на апдейт (middlewares/db_session.py)."""
+    if storage is None:
+        yield
+        return
+    async with storage.scope():
+        yield
 
-        # 7. Загрузка пользователей в память
-        records = await db.fetch("SELECT user_id, username, balance FROM users")
-        for record in records:
-            uid = record["user_id"]
-            username = record["username"]
-            balance = record["balance"]
-            user_balances[uid] = balance
-            user_usernames[uid] = username
 
-        # 8. Загрузка обработанных TON-транзакций
-        records = await db.fetch("SELECT tx_hash FROM ton_deposits")
-        for record in records:
-            processed_ton_tx.add(record["tx_hash"])
+async def db_scope_release() -> None:
+    """Отдать подключение апдейта в пул до конца хендлера (перед запросом к Telegram)."""
+    if storage is not None:
+        await storage.release_scope()
 
 
+def db_scope_stats() -> Dict[str, Any]:
+    if storage is None:
+        return Storage().stats()
+    return storage.stats()
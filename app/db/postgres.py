@@ -0,0 +1,152 @@
+# app/db/postgres.py
+"""
+Хранилище на PostgreSQL (asyncpg).
+
+Одно подключение на апдейт: scope() открывает область
+(middlewares/db_session.py — на каждый апдейт), connection() внутри неё
+берёт подключение из пула при первом обращении и дальше отдаёт то же
+самое. Область принадлежит задаче, которая её открыла: фоновые задачи
+(create_task копирует контекст) берут своё подключение — общее уже
+может быть возвращено в пул.
+
+Подключение не держится, пока хендлер ждёт Telegram: release_scope()
+(перед каждым запросом к Bot API и в конце области) отдаёт его в пул,
+следующий запрос к БД возьмёт новое. Так апдейт за время жизни может
+взять из пула несколько подключений, но только по очереди: одновременно
+у области не больше одного, и между ними она пул не занимает.
+
+Синхронизация балансов (change_balance -> upsert_user) внутри области
+не создаёт задач со своими подключениями: она копится в области
+и пишется одним executemany на её подключении перед тем, как его отдать.
+Запись игры или её удаление (Storage._after_deferred_users) сначала
+пишет накопленные балансы в той же транзакции: строка игры со ставкой
+не попадает в БД раньше списания.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import asyncpg
+
+from .storage import Storage
+
+
+class _DbScope:
+    __slots__ = ("owner", "conn", "uses", "users")
+
+    def __init__(self, owner: asyncio.Task | None) -> None:
+        self.owner = owner
+        self.conn: asyncpg.Connection | None = None
+        self.uses = 0
+        # отложенные upsert_user: uid -> (username, balance), последнее значение
+        self.users: Dict[int, Tuple[str | None, int]] = {}
+
+
+_scope: ContextVar[_DbScope | None] = ContextVar("db_scope", default=None)
+
+
+def _drain_users(scope: _DbScope) -> List[Tuple[int, str | None, int]]:
+    """Забрать отложенные балансы области: [(uid, username, balance), ...]."""
+    rows = [(uid, name, balance) for uid, (name, balance) in scope.users.items()]
+    scope.users.clear()
+    return rows
+
+
+class PostgresStorage(Storage):
+    name = "postgres"
+
+    def __init__(self, dsn: str) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.pool: asyncpg.Pool | None = None
+
+    async def open(self) -> None:
+        self.pool = await asyncpg.create_pool(self.dsn)
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+
+    def _migrations(self) -> List[str]:
+        # комнаты Банкира — колонка для уже существующих таблиц
+        return ["ALTER TABLE raffle_rounds ADD COLUMN IF NOT EXISTS room_id INTEGER"]
+
+    @staticmethod
+    def _own_scope() -> _DbScope | None:
+        """Область текущей задачи (чужая, скопированная create_task, не считается)."""
+        scope = _scope.get()
+        if scope is None or scope.owner is not asyncio.current_task():
+            return None
+        return scope
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[asyncpg.Connection]:
+        """Подключение для запроса: общее подключение апдейта или своё из пула."""
+        scope = self._own_scope()
+        if scope is None:
+            async with self.pool.acquire() as db:
+                yield db
+            return
+
+        counters = self.counters
+        if scope.conn is None:
+            started = asyncio.get_running_loop().time()
+            scope.conn = await self.pool.acquire()
+            spent = asyncio.get_running_loop().time() - started
+            counters["acquired"] += 1
+            counters["acquire_wait_total"] += spent
+            counters["acquire_wait_max"] = max(counters["acquire_wait_max"], spent)
+        scope.uses += 1
+        counters["queries"] += 1
+        yield scope.conn
+
+    @asynccontextmanager
+    async def scope(self) -> AsyncIterator[None]:
+        """Область одного подключения; подключение возвращается в пул на выходе."""
+        scope = _DbScope(asyncio.current_task())
+        token = _scope.set(scope)
+        self.counters["scopes"] += 1
+        try:
+            yield
+        finally:
+            await self._release(scope)
+            _scope.reset(token)
+
+    async def _release(self, scope: _DbScope) -> None:
+        """Записать отложенные балансы и вернуть подключение области в пул."""
+        rows = _drain_users(scope)
+        if rows:
+            try:
+                await self.upsert_users(rows)
+            except Exception as e:
+                print("Ошибка синхронизации балансов:", e)
+        if scope.conn is not None:
+            conn, scope.conn = scope.conn, None
+            await self.pool.release(conn)
+
+    async def release_scope(self) -> None:
+        scope = self._own_scope()
+        if scope is None or (scope.conn is None and not scope.users):
+            return
+        self.counters["released_early"] += 1
+        await self._release(scope)
+
+    def take_deferred_users(self) -> List[Tuple[int, str | None, int]]:
+        scope = self._own_scope()
+        return _drain_users(scope) if scope is not None else []
+
+    def defer_upsert_user(self, uid: int, username: str | None, balance: int) -> bool:
+        scope = self._own_scope()
+        if scope is None:
+            return False
+        scope.users[uid] = (username, balance)
+        self.counters["deferred_users"] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "pool_size": self.pool.get_size() if self.pool else 0,
+            "pool_idle": self.pool.get_idle_size() if self.pool else 0,
+        }
@@ -1,72 +1,40 @@
 # app/db/raffle.py
-from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, List, Tuple
 
-from .pool import pool
+from .pool import get_storage
+from .storage import days_ago
 
 
 async def upsert_raffle_round(r: Dict[str, Any]):
-    """Сохранить результат раунда 'Банкир'."""
-    if not pool:
+    """Сохранить результат раунда 'Банкир' (с комнатой, в которой он шёл)."""
+    storage = get_storage()
+    if not storage:
         return
-    async with pool.acquire() as db:
-        await db.execute(
-            """
-            INSERT INTO raffle_rounds (id, created_at, finished_at, winner_id, total_bank)
-            VALUES ($1, $2, $3, $4, $5)
-            ON CONFLICT(id) DO UPDATE SET
-                created_at=EXCLUDED.created_at,
-                finished_at=EXCLUDED.finished_at,
-                winner_id=EXCLUDED.winner_id,
-                total_bank=EXCLUDED.total_bank
-        """,
-            r.get("id"),
-            r["created_at"].isoformat() if r.get("created_at") else None,
-            r["finished_at"].isoformat() if r.get("finished_at") else None,
-            r.get("winner_id"),
-            r.get("total_bank", 0),
-        )
+    await storage.upsert_raffle_round(r)
 
 
 async def add_raffle_bet(raffle_id: int, user_id: int, amount: int):
     """Добавить ставку пользователя в конкретный раунд."""
-    if not pool:
+    storage = get_storage()
+    if not storage:
         return
-    async with pool.acquire() as db:
-        await db.execute(
-            """
-            INSERT INTO raffle_bets (raffle_id, user_id, amount)
-            VALUES ($1, $2, $3)
-        """,
-            raffle_id,
-            user_id,
-            amount,
-        )
+    await storage.add_raffle_bet(raffle_id, user_id, amount)
 
 
 async def get_user_raffle_bets_count(uid: int) -> int:
     """Количество раундов Банкира, где участвовал пользователь."""
-    if not pool:
+    storage = get_storage()
+    if not storage:
         return 0
-    async with pool.acquire() as db:
-        count = await db.fetchval(
-            "SELECT COUNT(DISTINCT raffle_id) FROM raffle_bets WHERE user_id = $1",
-            uid,
-        )
-        return count if count is not None else 0
+    return await storage.get_user_raffle_bets_count(uid)
 
 
 async def get_user_bets_in_raffle(raffle_id: int, user_id: int) -> int:
     """Количество ставок пользователя в конкретном раунде Банкира."""
-    if not pool:
+    storage = get_storage()
+    if not storage:
         return 0
-    async with pool.acquire() as db:
-        count = await db.fetchval(
-            "SELECT COUNT(*) FROM raffle_bets WHERE raffle_id = $1 AND user_id = $2",
-            raffle_id,
-            user_id,
-        )
-        return count if count is not None else 0
+    return await storage.get_user_bets_in_raffle(raffle_id, user_id)
 
 
 async def get_raffle_rounds_and_bets_30_days() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
@@ -75,37 +43,15 @@ async def get_raffle_rounds_and_bets_30_days() -> Tuple[List[Dict[str, Any]], Li
     - возвращает список раундов за последние 30 дней
     - и список всех ставок по этим раундам
     """
-    if not pool:
+    storage = get_storage()
+    if not storage:
         return [], []
-
-    now = datetime.now(timezone.utc)
-    delta_30 = now - timedelta(days=30)
-
-    async with pool.acquire() as db:
-        rounds_records = await db.fetch(
-            """
-            SELECT id, created_at, finished_at, winner_id, total_bank
-            FROM raffle_rounds
-            WHERE finished_at IS NOT NULL AND finished_at >= $1
-        """,
-            delta_30.isoformat(),
-        )
-
-        round_ids = [r["id"] for r in rounds_records]
-        if not round_ids:
-            return [], []
-
-        bets_records = await db.fetch(
-            """
-            SELECT raffle_id, user_id, amount
-            FROM raffle_bets
-            WHERE raffle_id = ANY($1::int[])
-        """,
-            round_ids,
-        )
-
-    rounds = [dict(r) for r in rounds_records]
-    bets = [dict(b) for b in bets_records]
-    return rounds, bets
+    return await storage.get_raffle_rounds_and_bets_since(days_ago(30))
 
 
+async def get_max_raffle_round_id() -> int:
+    """Последний id раунда Банкира в БД (продолжить нумерацию после перезапуска)."""
+    storage = get_storage()
+    if not storage:
+        return 0
+    return await storage.get_max_raffle_round_id()
@@ -0,0 +1,22 @@
+# app/db/scheduler.py
+from typing import Any, Dict, List, Tuple
+
+from .pool import get_storage
+
+
+async def load_scheduled_jobs() -> List[Dict[str, Any]]:
+    """Сохранённые отложенные задачи планировщика."""
+    storage = get_storage()
+    if not storage:
+        return []
+    return await storage.load_scheduled_jobs()
+
+
+async def save_scheduled_jobs(
+    upserts: List[Tuple[str, str, float, str]], deletes: List[str]
+):
+    """Батч изменений: (key, kind, due_at, args_json) на запись и ключи на удаление."""
+    storage = get_storage()
+    if not storage:
+        return
+    await storage.save_scheduled_jobs(upserts, deletes)
@@ -0,0 +1,108 @@
+# app/db/sqlite.py
+"""
+Хранилище на SQLite (aiosqlite): файл или :memory:.
+Для запуска бота и бенчмарков без сервера PostgreSQL.
+
+- одно подключение на процесс; connection() выдаёт его под asyncio.Lock —
+  SQLite всё равно пишет в один поток, а транзакция планировщика
+  не перемешается с чужими запросами
+- запросы общие (app/db/storage.py): параметры $1, $2 ... переписываются
+  в нумерованные ?1, ?2 ..., которые SQLite понимает сам
+- файл — в режиме WAL, чтение не ждёт записи
+"""
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Sequence
+
+import aiosqlite
+
+from .storage import Storage
+
+_PARAM = re.compile(r"\$(\d+)")
+
+
+def _sql(query: str) -> str:
+    return _PARAM.sub(r"?\1", query)
+
+
+class _SqliteConnection:
+    """Те же методы, что у asyncpg.Connection, которыми пользуется Storage."""
+
+    __slots__ = ("_db",)
+
+    def __init__(self, db: aiosqlite.Connection) -> None:
+        self._db = db
+
+    async def execute(self, query: str, *args: Any) -> None:
+        await self._db.execute(_sql(query), args)
+
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+        await self._db.executemany(_sql(query), args)
+
+    async def fetch(self, query: str, *args: Any) -> List[aiosqlite.Row]:
+        async with self._db.execute(_sql(query), args) as cur:
+            return await cur.fetchall()
+
+    async def fetchrow(self, query: str, *args: Any) -> aiosqlite.Row | None:
+        async with self._db.execute(_sql(query), args) as cur:
+            return await cur.fetchone()
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        row = await self.fetchrow(query, *args)
+        return row[0] if row is not None else None
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        await self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            await self._db.execute("ROLLBACK")
+            raise
+        await self._db.execute("COMMIT")
+
+
+class SqliteStorage(Storage):
+    name = "sqlite"
+    SERIAL = "INTEGER PRIMARY KEY"
+
+    def __init__(self, path: str = ":memory:") -> None:
+        super().__init__()
+        self.path = path
+        self._db: aiosqlite.Connection | None = None
+        self._conn: _SqliteConnection | None = None
+        self._lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        # isolation_level=None — автокоммит, транзакции только явные
+        self._db = await aiosqlite.connect(self.path, isolation_level=None)
+        self._db.row_factory = aiosqlite.Row
+        if self.path != ":memory:":
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._db.execute("PRAGMA synchronous=NORMAL")
+        self._conn = _SqliteConnection(self._db)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[_SqliteConnection]:
+        counters = self.counters
+        started = asyncio.get_running_loop().time()
+        async with self._lock:
+            spent = asyncio.get_running_loop().time() - started
+            counters["acquired"] += 1
+            counters["queries"] += 1
+            counters["acquire_wait_total"] += spent
+            counters["acquire_wait_max"] = max(counters["acquire_wait_max"], spent)
+            yield self._conn
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "pool_size": 1,
+            "pool_idle": 0 if self._lock.locked() else 1,
+        }
@@ -0,0 +1,656 @@
+# app/db/storage.py
+"""
+Хранилище: пользователи, игры, Банкир, пополнения, переводы, планировщик.
+
+Storage — общий интерфейс. Запросы написаны один раз, в синтаксисе
+PostgreSQL с параметрами $1, $2 ...; реализации дают подключение
+с методами execute / executemany / fetch / fetchrow / fetchval / transaction:
+
+- PostgresStorage (app/db/postgres.py) — пул asyncpg, одно подключение
+  на апдейт (scope)
+- SqliteStorage (app/db/sqlite.py) — aiosqlite, файл или :memory:,
+  для запуска и бенчмарков без сервера PostgreSQL
+
+Какая реализация — решает DSN (open_storage в app/db/pool.py).
+Модули app/db/users.py, games.py ... — тонкие обёртки над текущим хранилищем.
+
+Даты хранятся строками ISO-8601 в UTC (колонки TEXT), как и раньше:
+сравнение строк одного формата совпадает со сравнением дат.
+"""
+import functools
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.models import DiceGame, WINNER_DB_VALUES
+from app.services.metrics import db_query_errors, db_query_seconds
+
+
+def _timed(query):
+    """Время и ошибки запроса в метриках (bot_db_query_duration_seconds) по имени метода."""
+    name = query.__name__
+
+    @functools.wraps(query)
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await query(self, *args, **kwargs)
+        except Exception:
+            db_query_errors.inc(name)
+            raise
+        finally:
+            db_query_seconds.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def days_ago(days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+class Storage:
+    """Общая часть: схема и запросы. Подключение даёт реализация."""
+
+    name = "base"
+    # тип автоинкрементного первичного ключа в диалекте
+    SERIAL = "SERIAL PRIMARY KEY"
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, Any] = {
+            "scopes": 0,          # открыто областей (апдейтов)
+            "acquired": 0,        # из них взяли подключение
+            "queries": 0,         # обращений к БД внутри областей
+            "acquire_wait_total": 0.0,
+            "acquire_wait_max": 0.0,
+            "released_early": 0,  # подключение отдано до конца апдейта
+            "deferred_users": 0,  # upsert_user, отложенных до конца области
+        }
+
+    # ---------- подключение (реализация) ----------
+
+    async def open(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+    def connection(self):
+        """async with storage.connection() as db: ..."""
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def scope(self) -> AsyncIterator[None]:
+        """Область одного апдейта; по умолчанию ничего не делает."""
+        self.counters["scopes"] += 1
+        yield
+
+    async def release_scope(self) -> None:
+        """Отдать подключение области в пул до её конца; по умолчанию ничего."""
+
+    def defer_upsert_user(self, uid: int, username: str | None, balance: int) -> bool:
+        """
+        Отложить upsert_user до конца области (или до release_scope).
+        False — области нет, вызывающий пишет сам.
+        """
+        return False
+
+    def take_deferred_users(self) -> List[Tuple[int, str | None, int]]:
+        """Забрать отложенные upsert_user текущей области; по умолчанию их нет."""
+        return []
+
+    @asynccontextmanager
+    async def _after_deferred_users(self, db, atomic: bool = False) -> AsyncIterator[None]:
+        """
+        Для записей, которые опираются на уже изменённый баланс (игра со
+        списанной ставкой, удаление игры после возврата): отложенные балансы
+        области пишутся первыми и в той же транзакции. Иначе падение между
+        ними оставило бы в БД игру без списания — и её «вернули» бы при старте.
+        atomic — транзакция нужна и без отложенных балансов (несколько запросов).
+        """
+        rows = self.take_deferred_users()
+        if not rows and not atomic:
+            yield
+            return
+        try:
+            async with db.transaction():
+                if rows:
+                    await self._write_users(db, rows)
+                yield
+        except BaseException:
+            # не записались — остаются отложенными до конца области
+            for uid, username, balance in rows:
+                self.defer_upsert_user(uid, username, balance)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        acquired = self.counters["acquired"]
+        return {
+            "backend": self.name,
+            "queries_per_acquire": (self.counters["queries"] / acquired) if acquired else 0.0,
+            "acquire_wait_avg": (self.counters["acquire_wait_total"] / acquired) if acquired else 0.0,
+            "pool_size": 0,
+            "pool_idle": 0,
+            **self.counters,
+        }
+
+    # ---------- схема ----------
+
+    def _schema(self) -> List[str]:
+        serial = self.SERIAL
+        return [
+            # 1. Таблица users
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id BIGINT PRIMARY KEY,
+                username TEXT,
+                balance INTEGER,
+                registered_at TEXT
+            )
+            """,
+            # 2. Таблица games
+            f"""
+            CREATE TABLE IF NOT EXISTS games (
+                id {serial},
+                creator_id BIGINT,
+                opponent_id BIGINT,
+                bet INTEGER,
+                creator_roll INTEGER,
+                opponent_roll INTEGER,
+                winner TEXT,
+                finished INTEGER,
+                created_at TEXT,
+                finished_at TEXT
+            )
+            """,
+            # 3. Таблица raffle_rounds
+            f"""
+            CREATE TABLE IF NOT EXISTS raffle_rounds (
+                id {serial},
+                created_at TEXT,
+                finished_at TEXT,
+                winner_id BIGINT,
+                total_bank INTEGER,
+                room_id INTEGER
+            )
+            """,
+            # 4. Таблица raffle_bets
+            f"""
+            CREATE TABLE IF NOT EXISTS raffle_bets (
+                id {serial},
+                raffle_id INTEGER,
+                user_id BIGINT,
+                amount INTEGER
+            )
+            """,
+            # 5. Таблица ton_deposits
+            """
+            CREATE TABLE IF NOT EXISTS ton_deposits (
+                tx_hash TEXT PRIMARY KEY,
+                user_id BIGINT,
+                ton_amount REAL,
+                coins INTEGER,
+                comment TEXT,
+                at TEXT
+            )
+            """,
+            # 6. Таблица transfers
+            f"""
+            CREATE TABLE IF NOT EXISTS transfers (
+                id {serial},
+                from_id BIGINT,
+                to_id BIGINT,
+                amount INTEGER,
+                at TEXT
+            )
+            """,
+            # 7. Таблица scheduled_jobs (отложенные задачи планировщика)
+            """
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                key TEXT PRIMARY KEY,
+                kind TEXT,
+                due_at DOUBLE PRECISION,
+                args TEXT
+            )
+            """,
+            # 8. Таблица quick_queue (очередь быстрой игры: ставки уже списаны)
+            """
+            CREATE TABLE IF NOT EXISTS quick_queue (
+                user_id BIGINT PRIMARY KEY,
+                bet INTEGER,
+                enqueued_at TEXT
+            )
+            """,
+        ]
+
+    def _migrations(self) -> List[str]:
+        """Доработки уже существующих таблиц (только там, где они нужны)."""
+        return []
+
+    async def create_schema(self) -> None:
+        async with self.connection() as db:
+            for sql in self._schema() + self._migrations():
+                await db.execute(sql)
+
+    # -------------------------------------------
+    # ЗАГРУЗКА ПРИ СТАРТЕ
+    # -------------------------------------------
+
+    @_timed
+    async def load_users(self) -> List[Tuple[int, str | None, int]]:
+        async with self.connection() as db:
+            records = await db.fetch("SELECT user_id, username, balance FROM users")
+        return [(r["user_id"], r["username"], r["balance"]) for r in records]
+
+    @_timed
+    async def load_ton_tx(self) -> List[str]:
+        async with self.connection() as db:
+            records = await db.fetch("SELECT tx_hash FROM ton_deposits")
+        return [r["tx_hash"] for r in records]
+
+    # -------------------------------------------
+    # ПОЛЬЗОВАТЕЛИ
+    # -------------------------------------------
+
+    @_timed
+    async def upsert_user(
+        self,
+        uid: int,
+        username: str | None,
+        balance: int,
+        registered_at: Optional[datetime] = None,
+    ) -> None:
+        async with self.connection() as db:
+            await db.execute(
+                """
+                INSERT INTO users (user_id, username, balance, registered_at)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    username=EXCLUDED.username,
+                    balance=EXCLUDED.balance
+                """,
+                uid,
+                username,
+                balance,
+                _iso(registered_at) or _now_iso(),
+            )
+
+    @_timed
+    async def upsert_users(self, rows: List[Tuple[int, str | None, int]]) -> None:
+        """Пакетный upsert_user: (uid, username, balance), registered_at — сейчас."""
+        async with self.connection() as db:
+            await self._write_users(db, rows)
+
+    @staticmethod
+    async def _write_users(db, rows: List[Tuple[int, str | None, int]]) -> None:
+        now = _now_iso()
+        await db.executemany(
+            """
+            INSERT INTO users (user_id, username, balance, registered_at)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT(user_id) DO UPDATE SET
+                username=EXCLUDED.username,
+                balance=EXCLUDED.balance
+            """,
+            [(uid, username, balance, now) for uid, username, balance in rows],
+        )
+
+    @_timed
+    async def get_user_registered_at(self, uid: int) -> Optional[datetime]:
+        async with self.connection() as db:
+            row = await db.fetchrow(
+                "SELECT registered_at FROM users WHERE user_id = $1",
+                uid,
+            )
+        if row and row["registered_at"]:
+            try:
+                return datetime.fromisoformat(row["registered_at"])
+            except ValueError:
+                return None
+        return None
+
+    # -------------------------------------------
+    # ИГРЫ В КОСТИ
+    # -------------------------------------------
+
+    @_timed
+    async def upsert_game(self, g: DiceGame, dequeued: Tuple[int, ...] = ()) -> None:
+        """dequeued — игроки быстрой очереди, чьи ставки ушли в эту игру."""
+        async with self.connection() as db, self._after_deferred_users(db, atomic=bool(dequeued)):
+            for uid in dequeued:
+                await db.execute("DELETE FROM quick_queue WHERE user_id = $1", uid)
+            await db.execute(
+                """
+                INSERT INTO games (
+                    id, creator_id, opponent_id, bet,
+                    creator_roll, opponent_roll, winner,
+                    finished, created_at, finished_at
+                ) VALUES (
+                    $1,$2,$3,$4,$5,$6,$7,$8,$9,$10
+                )
+                ON CONFLICT (id) DO UPDATE SET
+                    creator_id = EXCLUDED.creator_id,
+                    opponent_id = EXCLUDED.opponent_id,
+                    bet = EXCLUDED.bet,
+                    creator_roll = EXCLUDED.creator_roll,
+                    opponent_roll = EXCLUDED.opponent_roll,
+                    winner = EXCLUDED.winner,
+                    finished = EXCLUDED.finished,
+                    created_at = EXCLUDED.created_at,
+                    finished_at = EXCLUDED.finished_at
+                """,
+                g.id, g.creator_id, g.opponent_id, g.bet,
+                g.creator_roll, g.opponent_roll, WINNER_DB_VALUES[g.winner],
+                int(g.finished), _iso(g.created_at), _iso(g.finished_at),
+            )
+
+    @_timed
+    async def get_user_games(self, uid: int) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            rows = await db.fetch(
+                """
+                SELECT *
+                FROM games
+                WHERE creator_id = $1 OR opponent_id = $1
+                ORDER BY id DESC
+                """,
+                uid,
+            )
+        return [dict(r) for r in rows]
+
+    @_timed
+    async def get_user_dice_games_count(self, uid: int) -> int:
+        async with self.connection() as db:
+            value = await db.fetchval(
+                """
+                SELECT COUNT(*)
+                FROM games
+                WHERE finished = 1 AND (creator_id = $1 OR opponent_id = $1)
+                """,
+                uid,
+            )
+        return value or 0
+
+    @_timed
+    async def get_finished_games_since(self, since: datetime) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            rows = await db.fetch(
+                """
+                SELECT *
+                FROM games
+                WHERE finished = 1 AND finished_at >= $1
+                """,
+                since.isoformat(),
+            )
+        return [dict(r) for r in rows]
+
+    @_timed
+    async def get_user_ids(self) -> List[int]:
+        async with self.connection() as db:
+            rows = await db.fetch("SELECT user_id FROM users")
+        return [r["user_id"] for r in rows]
+
+    @_timed
+    async def get_all_finished_games(self) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            rows = await db.fetch(
+                """
+                SELECT *
+                FROM games
+                WHERE finished = 1
+                ORDER BY id DESC
+                """
+            )
+        return [dict(r) for r in rows]
+
+    @_timed
+    async def get_max_game_id(self) -> int:
+        async with self.connection() as db:
+            value = await db.fetchval("SELECT COALESCE(MAX(id), 0) FROM games")
+        return int(value)
+
+    @_timed
+    async def get_unfinished_games(self, since: datetime | None) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            if since is None:
+                rows = await db.fetch("SELECT * FROM games WHERE finished = 0 ORDER BY id")
+            else:
+                rows = await db.fetch(
+                    """
+                    SELECT *
+                    FROM games
+                    WHERE finished = 0 AND created_at >= $1
+                    ORDER BY id
+                    """,
+                    since.isoformat(),
+                )
+        return [dict(r) for r in rows]
+
+    @_timed
+    async def delete_game(self, gid: int) -> None:
+        async with self.connection() as db, self._after_deferred_users(db):
+            await db.execute("DELETE FROM games WHERE id = $1", gid)
+
+    # -------------------------------------------
+    # ОЧЕРЕДЬ БЫСТРОЙ ИГРЫ
+    # -------------------------------------------
+
+    @_timed
+    async def add_queue_entry(self, uid: int, bet: int) -> None:
+        async with self.connection() as db, self._after_deferred_users(db):
+            await db.execute(
+                """
+                INSERT INTO quick_queue (user_id, bet, enqueued_at)
+                VALUES ($1, $2, $3)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    bet=EXCLUDED.bet,
+                    enqueued_at=EXCLUDED.enqueued_at
+                """,
+                uid,
+                bet,
+                _now_iso(),
+            )
+
+    @_timed
+    async def delete_queue_entry(self, uid: int) -> None:
+        async with self.connection() as db, self._after_deferred_users(db):
+            await db.execute("DELETE FROM quick_queue WHERE user_id = $1", uid)
+
+    @_timed
+    async def get_queue_entries(self) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            rows = await db.fetch("SELECT user_id, bet, enqueued_at FROM quick_queue")
+        return [dict(r) for r in rows]
+
+    # -------------------------------------------
+    # БАНКИР
+    # -------------------------------------------
+
+    @_timed
+    async def upsert_raffle_round(self, r: Dict[str, Any]) -> None:
+        async with self.connection() as db:
+            await db.execute(
+                """
+                INSERT INTO raffle_rounds (id, room_id, created_at, finished_at, winner_id, total_bank)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT(id) DO UPDATE SET
+                    room_id=EXCLUDED.room_id,
+                    created_at=EXCLUDED.created_at,
+                    finished_at=EXCLUDED.finished_at,
+                    winner_id=EXCLUDED.winner_id,
+                    total_bank=EXCLUDED.total_bank
+                """,
+                r.get("id"),
+                r.get("room_id"),
+                _iso(r.get("created_at")),
+                _iso(r.get("finished_at")),
+                r.get("winner_id"),
+                r.get("total_bank", 0),
+            )
+
+    @_timed
+    async def add_raffle_bet(self, raffle_id: int, user_id: int, amount: int) -> None:
+        async with self.connection() as db:
+            await db.execute(
+                """
+                INSERT INTO raffle_bets (raffle_id, user_id, amount)
+                VALUES ($1, $2, $3)
+                """,
+                raffle_id,
+                user_id,
+                amount,
+            )
+
+    @_timed
+    async def get_user_raffle_bets_count(self, uid: int) -> int:
+        async with self.connection() as db:
+            count = await db.fetchval(
+                "SELECT COUNT(DISTINCT raffle_id) FROM raffle_bets WHERE user_id = $1",
+                uid,
+            )
+        return count if count is not None else 0
+
+    @_timed
+    async def get_user_bets_in_raffle(self, raffle_id: int, user_id: int) -> int:
+        async with self.connection() as db:
+            count = await db.fetchval(
+                "SELECT COUNT(*) FROM raffle_bets WHERE raffle_id = $1 AND user_id = $2",
+                raffle_id,
+                user_id,
+            )
+        return count if count is not None else 0
+
+    @_timed
+    async def get_raffle_rounds_and_bets_since(
+        self, since: datetime
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        async with self.connection() as db:
+            rounds_records = await db.fetch(
+                """
+                SELECT id, created_at, finished_at, winner_id, total_bank
+                FROM raffle_rounds
+                WHERE finished_at IS NOT NULL AND finished_at >= $1
+                """,
+                since.isoformat(),
+            )
+            if not rounds_records:
+                return [], []
+
+            # подзапрос вместо списка id — одинаково для обоих диалектов
+            bets_records = await db.fetch(
+                """
+                SELECT raffle_id, user_id, amount
+                FROM raffle_bets
+                WHERE raffle_id IN (
+                    SELECT id FROM raffle_rounds
+                    WHERE finished_at IS NOT NULL AND finished_at >= $1
+                )
+                """,
+                since.isoformat(),
+            )
+
+        rounds = [dict(r) for r in rounds_records]
+        bets = [dict(b) for b in bets_records]
+        return rounds, bets
+
+    @_timed
+    async def get_max_raffle_round_id(self) -> int:
+        async with self.connection() as db:
+            value = await db.fetchval("SELECT COALESCE(MAX(id), 0) FROM raffle_rounds")
+        return int(value)
+
+    # -------------------------------------------
+    # ПОПОЛНЕНИЯ И ПЕРЕВОДЫ
+    # -------------------------------------------
+
+    @_timed
+    async def add_ton_deposit(
+        self,
+        tx_hash: str,
+        user_id: int,
+        ton_amount: float,
+        coins: int,
+        comment: str,
+    ) -> None:
+        async with self.connection() as db:
+            await db.execute(
+                """
+                INSERT INTO ton_deposits (tx_hash, user_id, ton_amount, coins, comment, at)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                """,
+                tx_hash,
+                user_id,
+                ton_amount,
+                coins,
+                comment,
+                _now_iso(),
+            )
+
+    @_timed
+    async def add_transfer(self, sender_id: int, receiver_id: int, amount: int) -> None:
+        async with self.connection() as db:
+            await db.execute(
+                """
+                INSERT INTO transfers (from_id, to_id, amount, at)
+                VALUES ($1, $2, $3, $4)
+                """,
+                sender_id,
+                receiver_id,
+                amount,
+                _now_iso(),
+            )
+
+    @_timed
+    async def get_user_transfers(self, uid: int) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            rows = await db.fetch(
+                """
+                SELECT * FROM transfers
+                WHERE from_id = $1 OR to_id = $1
+                ORDER BY at DESC
+                """,
+                uid,
+            )
+        return [dict(r) for r in rows]
+
+    # -------------------------------------------
+    # ПЛАНИРОВЩИК
+    # -------------------------------------------
+
+    @_timed
+    async def load_scheduled_jobs(self) -> List[Dict[str, Any]]:
+        async with self.connection() as db:
+            rows = await db.fetch("SELECT key, kind, due_at, args FROM scheduled_jobs")
+        return [dict(r) for r in rows]
+
+    @_timed
+    async def save_scheduled_jobs(
+        self, upserts: List[Tuple[str, str, float, str]], deletes: Iterable[str]
+    ) -> None:
+        async with self.connection() as db:
+            async with db.transaction():
+                if deletes:
+                    await db.executemany(
+                        "DELETE FROM scheduled_jobs WHERE key = $1",
+                        [(key,) for key in deletes],
+                    )
+                if upserts:
+                    await db.executemany(
+                        """
+                        INSERT INTO scheduled_jobs (key, kind, due_at, args)
+                        VALUES ($1, $2, $3, $4)
+                        ON CONFLICT(key) DO UPDATE SET
+                            kind=EXCLUDED.kind,
+                            due_at=EXCLUDED.due_at,
+                            args=EXCLUDED.args
+                        """,
+                        upserts,
+                    )
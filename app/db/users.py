@@ -1,8 +1,8 @@
 # app/db/users.py
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional
 
-from .pool import pool
+from .pool import get_storage
 
 
 async def upsert_user(
@@ -12,40 +12,26 @@ async def upsert_user(
     registered_at: Optional[datetime] = None,
 ):
     """Создать/обновить пользователя в БД."""
-    if not pool:
+    storage = get_storage()
+    if not storage:
         return
-    async with pool.acquire() as db:
-        await db.execute(
-            """
-            INSERT INTO users (user_id, username, balance, registered_at)
-            VALUES ($1, $2, $3, $4)
-            ON CONFLICT(user_id) DO UPDATE SET
-                username=EXCLUDED.username,
-                balance=EXCLUDED.balance
-        """,
-            uid,
-            username,
-            balance,
-            registered_at.isoformat()
-            if registered_at
-            else datetime.now(timezone.utc).isoformat(),
-        )
+    await storage.upsert_user(uid, username, balance, registered_at)
+
+
+def defer_upsert_user(uid: int, username: str | None, balance: int) -> bool:
+    """
+    Внутри области апдейта — отложить upsert_user до её конца (одним пакетом
+    на её подключении). False — области нет, нужно писать самому.
+    """
+    storage = get_storage()
+    if not storage:
+        return False
+    return storage.defer_upsert_user(uid, username, balance)
 
 
 async def get_user_registered_at(uid: int) -> Optional[datetime]:
     """Получить дату регистрации пользователя."""
-    if not pool:
-        return None
-    async with pool.acquire() as db:
-        row = await db.fetchrow(
-            "SELECT registered_at FROM users WHERE user_id = $1",
-            uid,
-        )
-        if row and row["registered_at"]:
-            try:
-                return datetime.fromisoformat(row["registered_at"])
-            except ValueError:
-                return None
+    storage = get_storage()
+    if not storage:
         return None
-
-
+    return await storage.get_user_registered_at(uid)
@@ -3,14 +3,25 @@ from aiogram import types
 from aiogram.filters import Command
 
 from app.bot import dp
-from app.config import ADMIN_IDS, MAIN_ADMIN_ID
+from app.config import ADMIN_IDS, MAIN_ADMIN_ID, BOT_MODE
+from app.db import db_scope_stats
+from app.middlewares import idempotency_stats, throttling_stats
 from app.services.balances import (
     register_user,
     change_balance,
     set_balance,
     get_balance,
 )
+from app.services.broadcast import broadcast_stats
+from app.services.game_lifecycle import lifecycle_stats
+from app.services.matchmaking import matchmaking_stats
+from app.services.outbound import outbound_stats
+from app.services.raffle import raffle_live_stats
+from app.services.raffle_journal import journal_stats
+from app.services.scheduler import scheduler_stats
+from app.services.snapshot import snapshot_stats
 from app.services.ton import get_ton_rub_rate
+from app.webhook import webhook_stats
 from app.utils.formatters import format_rubles
 
 
@@ -83,3 +94,88 @@ async def cmd_adminprofit(m: types.Message):
         f"≈ {ton_equiv:.4f} TON по текущему курсу ({rate:.2f} ₽ за 1 TON).\n"
         "Эти ₽ можно вывести, обменяв TON на рубли."
     )
+
+
+@dp.message(Command("gamestats"))
+async def cmd_gamestats(m: types.Message):
+    register_user(m.from_user)
+    if not is_admin(m.from_user.id):
+        return await m.answer("⛔ Нет прав.")
+    s = lifecycle_stats()
+    q = matchmaking_stats()
+    t = scheduler_stats()
+    b = broadcast_stats()
+    o = outbound_stats()
+    lv = raffle_live_stats()
+    jr = journal_stats()
+    sn = snapshot_stats()
+    w = webhook_stats()
+    th = throttling_stats()
+    idem = idempotency_stats()
+    dbs = db_scope_stats()
+    lane_lines = "\n".join(
+        f"{name}: в очереди {st['depth']}, отправлено {st['sent']}, "
+        f"ожидание ср. {st['wait_avg']:.2f} / макс. {st['wait_max']:.2f} сек., "
+        f"упёрлись в лимит {st['blocked']}"
+        for name, st in o["lanes"]
+    )
+    last = b["recent"][-1] if b["recent"] else None
+    last_line = (
+        f"Последняя: {last['name']} — {last['delivered']}/{last['total']} "
+        f"за {last['duration']:.1f} сек. (задержка ср. {last['latency_avg']:.1f}, "
+        f"макс. {last['latency_max']:.1f} сек.)"
+        if last
+        else "Последняя: —"
+    )
+    await m.answer(
+        "🎲 Игры в памяти\n"
+        f"Всего: {s['live']}\n"
+        f"Ожидают соперника: {s['open']}\n"
+        f"Идут сейчас: {s['in_flight']}\n\n"
+        f"С момента запуска: создано {s['created']}, сыграно {s['finished']}, "
+        f"отменено {s['cancelled']}, истекло {s['expired']}\n\n"
+        "⚡ Быстрая игра\n"
+        f"В очереди: {q['depth']} (корзин: {q['buckets']})\n"
+        f"Дольше всех ждёт: {q['oldest_wait']:.0f} сек.\n"
+        f"Сматчено: {q['matched']}, среднее ожидание {q['avg_wait']:.1f} сек., "
+        f"максимум {q['wait_max']:.1f} сек.\n"
+        f"Таймаутов: {q['timeouts']}, вышли сами: {q['left']}\n\n"
+        "⏱ Планировщик\n"
+        f"Задач: {t['pending']} (сохраняемых: {t['persistent']}, "
+        f"по уровням: {'/'.join(map(str, t['by_level']))})\n"
+        f"Сработало: {t['fired']}, с опозданием: {t['late']} "
+        f"(среднее {t['late_avg']:.2f} сек., максимум {t['late_max']:.2f} сек.)\n"
+        f"За последний интервал: {t['last_interval_fired']} / опоздали {t['last_interval_late']}\n"
+        f"Ошибок в обработчиках: {t['errors']}\n\n"
+        "📣 Рассылки\n"
+        f"Всего: {b['broadcasts']}, доставлено {b['delivered']}, "
+        f"не доставлено {b['failed']}\n"
+        f"Повторов: {b['retries']}, флуд-пауз (429): {b['retry_after']}\n"
+        f"{last_line}\n\n"
+        "📤 Исходящая очередь\n"
+        f"{lane_lines}\n"
+        f"Флуд-пауз (429): {o['retry_after']}, пауза ещё {o['paused_for']:.0f} сек.\n\n"
+        "🎩 Живое меню Банкира\n"
+        f"Зрителей: {lv['viewers']}, волн правок: {lv['passes']}, "
+        f"правок: {lv['edits']}, без изменений: {lv['unchanged']}, ошибок: {lv['failed']}\n"
+        f"Журнал: {jr['size'] // 1024} КБ, записей {jr['records']}, "
+        f"fsync {jr['commits']} (≈{jr['per_commit']:.1f} зап./fsync, "
+        f"ср. {jr['fsync_avg'] * 1000:.1f} мс), ошибок {jr['errors']}\n"
+        f"Снимок состояния: {sn['bytes']} Б, записей {sn['saved']}, "
+        f"макс. {sn['save_max'] * 1000:.1f} мс, ошибок {sn['errors']}\n\n"
+        f"📥 Апдейты ({BOT_MODE})\n"
+        f"Webhook: принято {w['received']}, обработано {w['processed']}, "
+        f"в очереди {w['queued']}, в работе {w['in_flight']}, "
+        f"ср. {w['latency_avg'] * 1000:.0f} мс, ошибок {w['errors']}, "
+        f"переполнений {w['overflow']}, чужой secret {w['bad_secret']}\n"
+        f"Антифлуд: пропущено {th['passed']}, отброшено {th['dropped']} "
+        f"{th['by_family']}, склеено повторов {th['coalesced']}\n"
+        f"Дубли денежных кнопок: выполнено {idem['executed']}, "
+        f"дублей {idem['duplicates']} (ждали {idem['waited']}), "
+        f"отказов {idem['rejected']}, ошибок {idem['failed']}, в кэше {idem['cached']}\n"
+        f"БД ({dbs['backend']}): апдейтов {dbs['scopes']}, подключений {dbs['acquired']}, "
+        f"запросов на подключение {dbs['queries_per_acquire']:.1f}, "
+        f"ожидание {dbs['acquire_wait_avg'] * 1000:.1f} мс (макс {dbs['acquire_wait_max'] * 1000:.0f}), "
+        f"пул {dbs['pool_idle']}/{dbs['pool_size']} свободно, "
+        f"отдано до конца апдейта {dbs['released_early']}, балансов пакетом {dbs['deferred_users']}"
+    )
@@ -10,22 +10,18 @@ from app.config import TON_WALLET_ADDRESS
 from app.services.balances import (
     register_user,
     get_balance,
-    user_usernames,
+    user_store,
+    pending_withdraw_step,
+    temp_withdraw,
+    pending_transfer_step,
+    temp_transfer,
 )
+from app.services.state_ttl import arm_state_ttl
 from app.services.ton import get_ton_rub_rate
 from app.utils.formatters import format_rubles
 from app.utils.keyboards import bottom_menu
 
 
-# ---------- СОСТОЯНИЯ ДЛЯ ВЫВОДА ----------
-pending_withdraw_step: Dict[int, str] = {}
-temp_withdraw: Dict[int, Dict[str, Any]] = {}
-
-# ---------- СОСТОЯНИЯ ДЛЯ ПЕРЕВОДОВ ----------
-pending_transfer_step: Dict[int, str] = {}     # await_username / await_amount
-temp_transfer: Dict[int, Dict[str, Any]] = {}  # target_id, amount
-
-
 # ---------- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----------
 
 async def format_balance_text(uid: int) -> str:
@@ -47,11 +43,7 @@ def resolve_user_by_username(username_str: str) -> Optional[int]:
     if not uname:
         return None
 
-    for uid, stored in user_usernames.items():
-        if stored and stored.lower() == uname:
-            return uid
-
-    return None
+    return user_store.find_username(uname)
 
 
 # ---------- ГЛАВНОЕ МЕНЮ БАЛАНСА ----------
@@ -139,6 +131,7 @@ async def cb_withdraw_menu(callback: CallbackQuery):
 
     pending_withdraw_step[uid] = "amount"
     temp_withdraw[uid] = {}
+    arm_state_ttl(uid)
 
     rate = await get_ton_rub_rate()
     ton_equiv = bal / rate if rate > 0 else 0
@@ -162,6 +155,7 @@ async def cb_transfer_menu(callback: CallbackQuery):
 
     pending_transfer_step[uid] = "await_username"
     temp_transfer[uid] = {}
+    arm_state_ttl(uid)
 
     await callback.message.answer(
         "🔄 Перевод ₽\n"
@@ -2,10 +2,10 @@
 
 from aiogram import F, types
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from datetime import datetime, timezone
 
 from app.bot import dp
 from app.utils.formatters import format_rubles
+from app.utils.keyboards import help_menu_keyboard, mode_select_back_keyboard
 from app.services.games import (
     games,
     pending_bet_input,
@@ -15,26 +15,32 @@ from app.services.games import (
     build_user_stats_and_history,
     build_history_keyboard,
     build_rating_text,
-    play_game
+)
+from app.services.game_lifecycle import (
+    cancel_by_creator,
+    cancel_window_open,
+    join_game,
+    spawn_game,
+)
+from app.services.matchmaking import (
+    pending_quick_bet_input,
+    is_waiting,
+    leave_queue,
 )
 from app.services.raffle import pending_raffle_bet_input
 from app.services.state_reset import reset_user_state
+from app.services.state_ttl import arm_state_ttl
 from app.services.balances import get_balance, change_balance
-from app.config import DICE_MIN_BET, DICE_BET_MIN_CANCEL_AGE
+from app.config import DICE_MIN_BET
 
 
 @dp.callback_query(F.data == "menu_games")
 async def cb_menu_games(callback: CallbackQuery):
     reset_user_state(callback.from_user.id)
 
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="🎲 Кости", callback_data="mode_dice")],
-            [InlineKeyboardButton(text="🎩 Банкир", callback_data="mode_banker")],
-            [InlineKeyboardButton(text="⬅ Назад", callback_data="back_main")],
-        ]
+    await callback.message.answer(
+        "Выберите режим игры:", reply_markup=mode_select_back_keyboard()
     )
-    await callback.message.answer("Выберите режим игры:", reply_markup=kb)
     await callback.answer()
 
 
@@ -55,13 +61,51 @@ async def cb_create_game(callback: CallbackQuery):
     uid = callback.from_user.id
     pending_bet_input[uid] = True
     pending_raffle_bet_input.pop(uid, None)
+    pending_quick_bet_input.pop(uid, None)
+    arm_state_ttl(uid)
+
+    await callback.message.answer(
+        f"Введите ставку (числом, в ₽). Минимум {DICE_MIN_BET} ₽:"
+    )
+    await callback.answer()
+
+
+# ---------------------------------------------------------
+#              БЫСТРАЯ ИГРА (АВТОПОДБОР)
+# ---------------------------------------------------------
+
+@dp.callback_query(F.data == "quick_play")
+async def cb_quick_play(callback: CallbackQuery):
+    uid = callback.from_user.id
+
+    if is_waiting(uid):
+        kb = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="🚪 Выйти из очереди", callback_data="quick_leave")],
+        ])
+        await callback.message.answer(
+            "⚡ Вы уже в очереди быстрой игры. Ожидайте соперника.",
+            reply_markup=kb,
+        )
+        return await callback.answer()
+
+    pending_quick_bet_input[uid] = True
+    pending_bet_input.pop(uid, None)
+    pending_raffle_bet_input.pop(uid, None)
+    arm_state_ttl(uid)
 
     await callback.message.answer(
+        "⚡ Быстрая игра: соперник с такой же ставкой подбирается автоматически.\n"
         f"Введите ставку (числом, в ₽). Минимум {DICE_MIN_BET} ₽:"
     )
     await callback.answer()
 
 
+@dp.callback_query(F.data == "quick_leave")
+async def cb_quick_leave(callback: CallbackQuery):
+    await callback.message.answer(await leave_queue(callback.from_user.id))
+    await callback.answer()
+
+
 # ---------------------------------------------------------
 #             ОТКРЫТИЕ КОНКРЕТНОЙ ИГРЫ
 # ---------------------------------------------------------
@@ -73,7 +117,7 @@ async def cb_game_open(callback: CallbackQuery):
 
     if not g:
         return await callback.answer("Игра не найдена.", show_alert=True)
-    if g["opponent_id"] is not None:
+    if g.opponent_id is not None:
         return await callback.answer("Кто-то уже вступил!", show_alert=True)
 
     kb = InlineKeyboardMarkup(inline_keyboard=[
@@ -83,7 +127,7 @@ async def cb_game_open(callback: CallbackQuery):
 
     await callback.message.answer(
         f"🎲 Игра №{gid}\n"
-        f"💰 Ставка: {format_rubles(g['bet'])} ₽\n\nХотите вступить?",
+        f"💰 Ставка: {format_rubles(g.bet)} ₽\n\nХотите вступить?",
         reply_markup=kb,
     )
     await callback.answer()
@@ -101,15 +145,14 @@ async def cb_game_my(callback: CallbackQuery):
     g = games.get(gid)
     if not g:
         return await callback.answer("Игра не найдена.", show_alert=True)
-    if g["creator_id"] != uid:
+    if g.creator_id != uid:
         return await callback.answer("Это не ваша игра.", show_alert=True)
-    if g["opponent_id"] is not None:
+    if g.opponent_id is not None:
         return await callback.answer("Уже есть соперник.", show_alert=True)
 
     rows = []
-    time_passed = datetime.now(timezone.utc) - g["created_at"]
 
-    if time_passed < DICE_BET_MIN_CANCEL_AGE:
+    if cancel_window_open(g):
         rows.append([
             InlineKeyboardButton(text="❌ Отменить ставку", callback_data=f"cancel_game:{gid}")
         ])
@@ -118,7 +161,7 @@ async def cb_game_my(callback: CallbackQuery):
 
     await callback.message.answer(
         f"🎲 Ваша игра №{gid}\n"
-        f"💰 Ставка: {format_rubles(g['bet'])} ₽\n\nОжидание соперника...",
+        f"💰 Ставка: {format_rubles(g.bet)} ₽\n\nОжидание соперника...",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=rows),
     )
     await callback.answer()
@@ -134,25 +177,12 @@ async def cb_cancel_game(callback: CallbackQuery):
     gid = int(callback.data.split(":")[1])
 
     g = games.get(gid)
-    if not g:
-        return await callback.answer("Игра не найдена.", show_alert=True)
-    if g["creator_id"] != uid:
-        return await callback.answer("Это не ваша игра.", show_alert=True)
-    if g["opponent_id"] is not None:
-        return await callback.answer("Уже есть соперник.", show_alert=True)
-
-    created_at = g["created_at"]
-    if datetime.now(timezone.utc) - created_at > DICE_BET_MIN_CANCEL_AGE:
-        return await callback.answer(
-            "Ставку можно отменить только в течение первой минуты.",
-            show_alert=True,
-        )
-
-    change_balance(uid, g["bet"])
-    del games[gid]
+    error = await cancel_by_creator(gid, uid)
+    if error:
+        return await callback.answer(error, show_alert=True)
 
     await callback.message.answer(
-        f"❌ Ставка №{gid} отменена. {format_rubles(g['bet'])} ₽ возвращены."
+        f"❌ Ставка №{gid} отменена. {format_rubles(g.bet)} ₽ возвращены."
     )
     await send_games_list(callback.message.chat.id, uid)
     await callback.answer()
@@ -170,14 +200,14 @@ async def cb_join_confirm(callback: CallbackQuery):
     g = games.get(gid)
     if not g:
         return await callback.answer("Игра не найдена.", show_alert=True)
-    if g["opponent_id"] is not None:
+    if g.opponent_id is not None:
         return await callback.answer("Кто-то уже вступил!", show_alert=True)
 
-    if get_balance(uid) < g["bet"]:
+    if get_balance(uid) < g.bet:
         return await callback.answer("Недостаточно ₽.", show_alert=True)
 
-    g["opponent_id"] = uid
-    change_balance(uid, -g["bet"])
+    change_balance(uid, -g.bet)
+    join_game(gid, uid)
 
     from app.db.games import upsert_game
     await upsert_game(g)
@@ -185,7 +215,9 @@ async def cb_join_confirm(callback: CallbackQuery):
     await callback.message.answer(f"✅ Вы вступили в игру №{gid}!")
     await callback.answer()
 
-    await play_game(gid)
+    # партия идёт в своей задаче (как из быстрой очереди) и не держит
+    # подключение апдейта к БД, пока крутятся кубики
+    spawn_game(gid)
 
 
 # ---------------------------------------------------------
@@ -208,22 +240,46 @@ async def cb_my_games(callback: CallbackQuery):
 #                    ОБНОВЛЕНИЕ СПИСКА ИГР
 # ---------------------------------------------------------
 
-@dp.callback_query(F.data == "refresh_games")
-async def cb_refresh_games(callback: CallbackQuery):
+def _parse_lobby_position(data: str) -> tuple[int, int]:
+    """refresh_games:<page>:<flt> / games_page:<page>:<flt> → (page, flt)."""
+    parts = data.split(":")
+    try:
+        page = int(parts[1]) if len(parts) > 1 else 0
+        flt = int(parts[2]) if len(parts) > 2 else -1
+    except ValueError:
+        return 0, -1
+    return page, flt
+
+
+async def _edit_games_list(callback: CallbackQuery, page: int, flt: int):
     uid = callback.from_user.id
     try:
         await callback.message.edit_text(
             build_games_text(),
-            reply_markup=build_games_keyboard(uid),
+            reply_markup=build_games_keyboard(uid, page, flt),
         )
     except:
         await callback.message.answer(
             build_games_text(),
-            reply_markup=build_games_keyboard(uid),
+            reply_markup=build_games_keyboard(uid, page, flt),
         )
+
+
+@dp.callback_query(F.data.startswith("refresh_games"))
+async def cb_refresh_games(callback: CallbackQuery):
+    page, flt = _parse_lobby_position(callback.data)
+    await _edit_games_list(callback, page, flt)
     await callback.answer("Обновлено!")
 
 
+@dp.callback_query(F.data.startswith("games_page:"))
+async def cb_games_page(callback: CallbackQuery):
+    """Листание лобби и фильтры по ставке."""
+    page, flt = _parse_lobby_position(callback.data)
+    await _edit_games_list(callback, page, flt)
+    await callback.answer()
+
+
 # ---------------------------------------------------------
 #                    РЕЙТИНГ КОСТЕЙ
 # ---------------------------------------------------------
@@ -2,26 +2,63 @@
 from aiogram import F
 from aiogram.types import CallbackQuery
 
-from app.bot import dp
+from app.bot import bot, dp
 from app.config import RAFFLE_MIN_BET
 from app.services.raffle import (
     pending_raffle_bet_input,
     _process_raffle_bet,
     send_raffle_menu,
+    show_raffle_menu,
     cancel_user_bets,
     build_raffle_rating_text,
+    create_private_room,
+    get_room,
 )
 from app.services.games import pending_bet_input
+from app.services.state_ttl import arm_state_ttl
+
+
+def _parse_room_id(data: str) -> int | None:
+    """room_id из callback_data вида 'raffle_xxx:<room_id>[:...]'."""
+    try:
+        return int(data.split(":")[1])
+    except (ValueError, IndexError):
+        return None
 
 
 @dp.callback_query(F.data == "mode_banker")
 async def cb_mode_banker(callback: CallbackQuery):
-    """Переход в меню Банкира."""
+    """Переход в Банкир — список комнат."""
     await send_raffle_menu(callback.message.chat.id, callback.from_user.id)
     await callback.answer()
 
 
-@dp.callback_query(F.data == "raffle_make_bet")
+@dp.callback_query(F.data.startswith("raffle_room:"))
+async def cb_raffle_room(callback: CallbackQuery):
+    """Вход в комнату: список комнат превращается в живое меню комнаты."""
+    room_id = _parse_room_id(callback.data)
+    await show_raffle_menu(callback.message, callback.from_user.id, room_id)
+    await callback.answer()
+
+
+@dp.callback_query(F.data == "raffle_private_new")
+async def cb_raffle_private_new(callback: CallbackQuery):
+    """Создать свою комнату и выдать ссылку для приглашения."""
+    uid = callback.from_user.id
+    room = create_private_room(uid)
+
+    me = await bot.me()
+    await callback.message.answer(
+        f"🚪 Своя комната №{room['id']} создана.\n"
+        "Цену доли задаст первая ставка.\n\n"
+        "Ссылка для друзей:\n"
+        f"https://t.me/{me.username}?start=room_{room['id']}"
+    )
+    await send_raffle_menu(callback.message.chat.id, uid, room["id"])
+    await callback.answer()
+
+
+@dp.callback_query(F.data.startswith("raffle_make_bet:"))
 async def cb_raffle_make_bet(callback: CallbackQuery):
     """
     Кнопка «Сделать ставку».
@@ -29,13 +66,26 @@ async def cb_raffle_make_bet(callback: CallbackQuery):
     Если раунд уже идёт — просим ввести сумму (кратную базовой ставке).
     """
     uid = callback.from_user.id
-    pending_raffle_bet_input[uid] = True
+    room_id = _parse_room_id(callback.data)
+    room = get_room(room_id) if room_id is not None else None
+    if room is None:
+        await callback.answer("Комната уже закрыта.", show_alert=True)
+        return
+
+    pending_raffle_bet_input[uid] = room_id
     pending_bet_input.pop(uid, None)
+    arm_state_ttl(uid)
+
+    if room["entry_amount"]:
+        hint = f"Сумма должна быть кратной цене доли — {room['entry_amount']} ₽."
+    else:
+        hint = (
+            f"Минимальная первая ставка: {RAFFLE_MIN_BET} ₽.\n"
+            "Если раунд уже идёт, сумма должна быть кратной фиксированной ставке (бот подскажет)."
+        )
 
     await callback.message.answer(
-        "Введите сумму ₽ для участия в Банкире.\n"
-        f"Минимальная первая ставка: {RAFFLE_MIN_BET} ₽.\n"
-        "Если раунд уже идёт, сумма должна быть кратной фиксированной ставке (бот подскажет)."
+        "Введите сумму ₽ для участия в Банкире.\n" + hint
     )
     await callback.answer()
 
@@ -47,28 +97,34 @@ async def cb_raffle_quick(callback: CallbackQuery):
     chat_id = callback.message.chat.id
 
     try:
-        amount = int(callback.data.split(":", 1)[1])
-    except (ValueError, IndexError):
+        _, room_id, amount = callback.data.split(":")
+        room_id, amount = int(room_id), int(amount)
+    except ValueError:
         await callback.answer("Некорректная сумма.", show_alert=True)
         return
 
-    msg_text = await _process_raffle_bet(uid, chat_id, amount)
+    msg_text = await _process_raffle_bet(uid, chat_id, amount, room_id)
     await callback.message.answer(msg_text)
     await callback.answer()
 
 
-@dp.callback_query(F.data == "raffle_refresh")
+@dp.callback_query(F.data.startswith("raffle_refresh:"))
 async def cb_raffle_refresh(callback: CallbackQuery):
-    """Обновление информации о текущем раунде."""
-    await send_raffle_menu(callback.message.chat.id, callback.from_user.id)
+    """Обновление информации о текущем раунде комнаты — правкой того же сообщения."""
+    room_id = _parse_room_id(callback.data)
+    await show_raffle_menu(callback.message, callback.from_user.id, room_id)
     await callback.answer("Обновлено!")
 
 
-@dp.callback_query(F.data == "raffle_cancel")
+@dp.callback_query(F.data.startswith("raffle_cancel:"))
 async def cb_raffle_cancel(callback: CallbackQuery):
-    """Отмена ставок пользователя в текущем раунде (до 10 минут)."""
+    """Отмена ставок пользователя в текущем раунде комнаты (до 10 минут)."""
     uid = callback.from_user.id
-    text = await cancel_user_bets(uid)
+    room_id = _parse_room_id(callback.data)
+    if room_id is None:
+        await callback.answer()
+        return
+    text = await cancel_user_bets(uid, room_id)
     await callback.message.answer(text)
     await callback.answer()
 
@@ -79,5 +135,3 @@ async def cb_raffle_rating(callback: CallbackQuery):
     text = await build_raffle_rating_text(callback.from_user.id)
     await callback.message.answer(text)
     await callback.answer()
-
-
@@ -1,17 +1,17 @@
 # app/handlers/start.py
 from aiogram import F, types
-from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery
 
 from app.bot import dp
 from app.services.balances import register_user, get_balance
-from app.utils.keyboards import bottom_menu
+from app.utils.keyboards import bottom_menu, mode_select_keyboard
 from app.services.games import send_games_list
 from app.services.raffle import send_raffle_menu
 
 
 @dp.message(Command("start"))
-async def cmd_start(m: types.Message):
+async def cmd_start(m: types.Message, command: CommandObject):
     register_user(m.from_user)
     get_balance(m.from_user.id)
     await m.answer(
@@ -20,25 +20,24 @@ async def cmd_start(m: types.Message):
         "Пополняйте TON, играйте — выигрывайте!",
         reply_markup=bottom_menu(),
     )
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="🎲 Кости", callback_data="mode_dice")],
-            [InlineKeyboardButton(text="🎩 Банкир", callback_data="mode_banker")],
-        ]
-    )
-    await m.answer("Выберите режим игры:", reply_markup=kb)
+
+    # приглашение в свою комнату Банкира: /start room_<id>
+    if command.args and command.args.startswith("room_"):
+        try:
+            room_id = int(command.args[len("room_"):])
+        except ValueError:
+            room_id = None
+        if room_id is not None:
+            await send_raffle_menu(m.chat.id, m.from_user.id, room_id)
+            return
+
+    await m.answer("Выберите режим игры:", reply_markup=mode_select_keyboard())
 
 
 @dp.message(F.text == "🕹 Игры")
 async def msg_games(m: types.Message):
     register_user(m.from_user)
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="🎲 Кости", callback_data="mode_dice")],
-            [InlineKeyboardButton(text="🎩 Банкир", callback_data="mode_banker")],
-        ]
-    )
-    await m.answer("Выберите режим игры:", reply_markup=kb)
+    await m.answer("Выберите режим игры:", reply_markup=mode_select_keyboard())
 
 
 @dp.message(F.text == "🎁 Розыгрыш")
@@ -58,9 +57,3 @@ async def msg_support(m: types.Message):
 async def cb_mode_dice(callback: CallbackQuery):
     await send_games_list(callback.message.chat.id, callback.from_user.id)
     await callback.answer()
-
-
-@dp.callback_query(F.data == "mode_banker")
-async def cb_mode_banker(callback: CallbackQuery):
-    await send_raffle_menu(callback.message.chat.id, callback.from_user.id)
-    await callback.answer()
@@ -1,6 +1,4 @@
 # app/handlers/text.py
-from datetime import datetime, timezone
-
 from aiogram import types
 from aiogram.types import Message
 
@@ -8,25 +6,26 @@ from app.bot import dp, bot
 from app.config import DICE_MIN_BET, ADMIN_IDS
 from app.db.games import upsert_game
 from app.db.transfers import add_transfer
-from app.handlers.balance import (
-    pending_withdraw_step,
-    temp_withdraw,
-    pending_transfer_step,
-    temp_transfer,
-    resolve_user_by_username,
-)
+from app.handlers.balance import resolve_user_by_username
 from app.services.balances import (
     register_user,
     get_balance,
     change_balance,
+    pending_withdraw_step,
+    temp_withdraw,
+    pending_transfer_step,
+    temp_transfer,
 )
 from app.services.games import (
-    games,
     pending_bet_input,
-    next_game_id,
+    new_game,
     send_games_list,
 )
+from app.services.game_lifecycle import open_game
+from app.services.matchmaking import pending_quick_bet_input, quick_play
 from app.services.raffle import pending_raffle_bet_input, _process_raffle_bet
+from app.services.outbound import LANE_NOTIFY, outbound_lane
+from app.services.state_ttl import arm_state_ttl
 from app.services.ton import get_ton_rub_rate
 from app.utils.formatters import format_rubles
 
@@ -51,30 +50,25 @@ async def process_text(m: Message):
         if bet > get_balance(uid):
             return await m.answer("Недостаточно ₽ на балансе!")
 
-        global next_game_id
-        gid = next_game_id
-        next_game_id += 1
-
-        games[gid] = {
-            "id": gid,
-            "creator_id": uid,
-            "opponent_id": None,
-            "bet": bet,
-            "creator_roll": None,
-            "opponent_roll": None,
-            "winner": None,
-            "finished": False,
-            "created_at": datetime.now(timezone.utc),
-            "finished_at": None,
-        }
+        g = new_game(uid, bet)
+        gid = g.id
 
         change_balance(uid, -bet)
         pending_bet_input.pop(uid)
+        open_game(g)
 
-        await upsert_game(games[gid])
+        await upsert_game(g)
         await m.answer(f"🎲 Игра №{gid} создана!")
         return await send_games_list(m.chat.id, uid)
 
+    # 1a) Быстрая игра — ввод ставки
+    if pending_quick_bet_input.get(uid):
+        if not text.isdigit():
+            return await m.answer("Введите корректную ставку (число):")
+
+        pending_quick_bet_input.pop(uid, None)
+        return await m.answer(await quick_play(uid, int(text)))
+
     # 2) ВЫВОД TON — шаг 1: сумма
     if pending_withdraw_step.get(uid) == "amount":
         if not text.isdigit():
@@ -91,6 +85,7 @@ async def process_text(m: Message):
 
         temp_withdraw[uid]["amount"] = amount
         pending_withdraw_step[uid] = "details"
+        arm_state_ttl(uid)
 
         rate = await get_ton_rub_rate()
         ton_amount = amount / rate if rate > 0 else 0
@@ -130,11 +125,12 @@ async def process_text(m: Message):
         )
 
         # отправка админу
-        for admin_id in ADMIN_IDS:
-            try:
-                await bot.send_message(admin_id, msg_admin)
-            except:
-                pass
+        with outbound_lane(LANE_NOTIFY):
+            for admin_id in ADMIN_IDS:
+                try:
+                    await bot.send_message(admin_id, msg_admin)
+                except:
+                    pass
 
         await m.answer(
             "✅ Заявка отправлена!\n"
@@ -173,6 +169,7 @@ async def process_text(m: Message):
 
         temp_transfer[uid]["target_id"] = target_id
         pending_transfer_step[uid] = "await_amount"
+        arm_state_ttl(uid)
 
         return await m.answer("Введите сумму ₽ для перевода:")
 
@@ -207,28 +204,29 @@ async def process_text(m: Message):
         )
 
         # получателю
-        try:
-            await bot.send_message(
-                target_id,
-                f"💸 Вам перевели {format_rubles(amount)} ₽ от пользователя ID {uid}.\n"
-                f"Баланс: {format_rubles(get_balance(target_id))} ₽."
-            )
-        except:
-            pass
+        with outbound_lane(LANE_NOTIFY):
+            try:
+                await bot.send_message(
+                    target_id,
+                    f"💸 Вам перевели {format_rubles(amount)} ₽ от пользователя ID {uid}.\n"
+                    f"Баланс: {format_rubles(get_balance(target_id))} ₽."
+                )
+            except:
+                pass
 
         pending_transfer_step.pop(uid, None)
         temp_transfer.pop(uid, None)
         return
 
     # 6) Банкир — ставка
-    if pending_raffle_bet_input.get(uid):
+    if uid in pending_raffle_bet_input:
         if not text.isdigit():
             return await m.answer("Введите сумму числом (₽):")
 
         amount = int(text)
-        pending_raffle_bet_input.pop(uid, None)
+        room_id = pending_raffle_bet_input.pop(uid)
 
-        msg = await _process_raffle_bet(uid, m.chat.id, amount)
+        msg = await _process_raffle_bet(uid, m.chat.id, amount, room_id)
         return await m.answer(msg)
 
     # если ничего не подходит
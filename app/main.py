@@ -2,13 +2,23 @@
 import asyncio
 
 from app.bot import bot, dp
-from app.services.balances import user_balances, user_usernames
-from app.services.ton import processed_ton_tx
-from app.db.pool import init_db
+from app.config import BOT_MODE
+from app.services.balances import user_store
+from app.services.ton import processed_ton_tx, start_ton_worker, stop_ton_worker
+from app.db.pool import init_db, close_db
+from app.services.metrics import start_metrics_server, stop_metrics_server
+from app.services.raffle import restore_raffle_state
+from app.services.snapshot import restore_state, start_snapshots, shutdown_snapshot
+from app.services.scheduler import (
+    start_scheduler,
+    restore_scheduled_jobs,
+    flush_scheduled_jobs,
+)
 
 # Хендлеры просто импортируются, они сами регистрируются внутри dp
 import app.handlers.start
 import app.handlers.games_menu
+import app.handlers.raffle_menu
 import app.handlers.balance
 import app.handlers.admin
 import app.handlers.profile
@@ -17,10 +27,32 @@ import app.handlers.text
 
 async def main():
     # ❗ ВОТ ТАК ДОЛЖНО БЫТЬ
-    await init_db(user_balances, user_usernames, processed_ton_tx)
-
-    print("🚀 Бот запущен!")
-    await dp.start_polling(bot)
+    await init_db(user_store, processed_ton_tx)
+    # сначала раунды Банкира из журнала — их таймеры важнее сохранённых
+    await restore_raffle_state()
+    # игры, очередь, ввод и счётчики id — до polling, чтобы апдейты видели их
+    await restore_state()
+    await restore_scheduled_jobs()
+    start_scheduler()
+    start_snapshots()
+    start_ton_worker()
+    await start_metrics_server()
+
+    print(f"🚀 Бот запущен! ({BOT_MODE})")
+    try:
+        if BOT_MODE == "webhook":
+            from app.webhook import run_webhook
+            await run_webhook()
+        else:
+            # после работы в режиме webhook getUpdates не отдаст апдейты
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await stop_ton_worker()
+        await flush_scheduled_jobs()
+        await shutdown_snapshot()
+        await close_db()
+        await stop_metrics_server()
 
 
 if __name__ == "__main__":
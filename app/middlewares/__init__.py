@@ -0,0 +1,35 @@
+# app/middlewares/__init__.py
+
+from .db_session import DbReleaseMiddleware, DbSessionMiddleware, db_session
+from .idempotency import (
+    IdempotencyMiddleware,
+    ResultRecorder,
+    idempotency,
+    idempotency_stats,
+)
+from .metrics import (
+    HandlerMetricsMiddleware,
+    TelegramMetrics,
+    UpdateMetricsMiddleware,
+    handler_metrics,
+    update_metrics,
+)
+from .throttling import ThrottlingMiddleware, throttling, throttling_stats
+
+__all__ = [
+    "DbReleaseMiddleware",
+    "DbSessionMiddleware",
+    "db_session",
+    "IdempotencyMiddleware",
+    "ResultRecorder",
+    "idempotency",
+    "idempotency_stats",
+    "HandlerMetricsMiddleware",
+    "TelegramMetrics",
+    "UpdateMetricsMiddleware",
+    "handler_metrics",
+    "update_metrics",
+    "ThrottlingMiddleware",
+    "throttling",
+    "throttling_stats",
+]
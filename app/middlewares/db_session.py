@@ -0,0 +1,55 @@
+# app/middlewares/db_session.py
+"""
+Одно подключение к БД на апдейт.
+
+Хендлер, который несколько раз ходит в БД (профиль — три запроса,
+создание игры — upsert_user после каждого change_balance и upsert_game,
+рейтинг — два), раньше брал подключение из пула на каждый запрос.
+Теперь апдейт обрабатывается внутри db_scope(): первое обращение к БД
+берёт подключение, остальные используют его же, после хендлера оно
+возвращается в пул. Апдейты без запросов к БД пул не трогают.
+
+Ответ пользователю может долго ждать в исходящей очереди (outbound.py),
+поэтому перед каждым запросом к Bot API подключение отдаётся в пул
+(DbReleaseMiddleware): следующий запрос к БД возьмёт новое. Апдейт,
+который чередует БД и Telegram, берёт подключение несколько раз,
+но всегда не больше одного сразу — в худшем случае это столько же
+заходов в пул, сколько было до db_scope().
+Синхронизация балансов из change_balance копится в области и пишется
+пакетом на её подключении — см. app/db/postgres.py.
+
+Фоновые задачи, запущенные из хендлера (партия в кости), берут
+подключение сами.
+"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from app.db.pool import db_scope, db_scope_release
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Outer-middleware на update: область одного подключения."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with db_scope():
+            return await handler(event, data)
+
+
+class DbReleaseMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: не держать подключение апдейта, пока ждём Telegram."""
+
+    async def __call__(self, make_request, bot, method):
+        await db_scope_release()
+        return await make_request(bot, method)
+
+
+# регистрируются в app/bot.py
+db_session = DbSessionMiddleware()
@@ -0,0 +1,197 @@
+# app/middlewares/idempotency.py
+"""
+Идемпотентность кнопок, которые двигают деньги (IDEMPOTENT_ACTIONS):
+join_confirm:, cancel_game:, raffle_quick:.
+
+Двойное нажатие или повторная доставка апдейта Telegram'ом не доходит
+до хендлера второй раз — без повторной проверки баланса, записи в БД
+и новых сообщений. Дубль получает ответ первого нажатия.
+
+- ключи в TTL-кэше: id callback_query (повторная доставка) и
+  (user, действие, цель) — двойное нажатие даёт два разных id
+- пока первое нажатие обрабатывается, дубль ждёт его ответа на callback
+  (не дольше IDEMPOTENCY_WAIT_SECONDS); конца хендлера не ждём —
+  join_confirm после ответа ещё играет всю партию
+- результат — то, чем хендлер ответил: текст callback.answer() и
+  первое отправленное сообщение. Их записывает ResultRecorder,
+  middleware сессии бота, по ContextVar текущего нажатия
+- ключ (user, действие, цель) остаётся в кэше на весь TTL, только если
+  хендлер действительно двигал деньги (balance_changes в services/balances.py).
+  Отказ («Недостаточно ₽.», «Игра не найдена.») помнится лишь по id
+  нажатия: пополнив баланс, можно нажать ту же кнопку снова
+- если хендлер упал, результат не кэшируется — повтор выполнится заново
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import AnswerCallbackQuery, EditMessageText, SendMessage
+from aiogram.types import CallbackQuery, TelegramObject
+
+from app.config import (
+    IDEMPOTENT_ACTIONS,
+    IDEMPOTENCY_CALLBACK_TTL_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+from app.services.balances import balance_changes
+from app.services.metrics import register_gauge
+
+_CLEANUP_SIZE = 10000
+# лимит текста в answerCallbackQuery
+_ANSWER_LIMIT = 200
+
+
+class _Result:
+    """Ответ первого нажатия."""
+
+    __slots__ = ("ready", "finished", "text", "show_alert", "message")
+
+    def __init__(self) -> None:
+        self.ready = asyncio.Event()          # callback отвечен или хендлер завершён
+        self.finished = False
+        self.text: str | None = None          # callback.answer(text)
+        self.show_alert = False
+        self.message: str | None = None       # первое сообщение / правка
+
+
+_recording: ContextVar[_Result | None] = ContextVar("idempotency_result", default=None)
+
+
+class ResultRecorder(BaseRequestMiddleware):
+    """Middleware сессии: запоминает ответ хендлера, который сейчас выполняется."""
+
+    async def __call__(self, make_request, bot, method):
+        result = _recording.get()
+        if result is None or result.finished:
+            return await make_request(bot, method)
+
+        if isinstance(method, AnswerCallbackQuery):
+            if method.text:
+                result.text = method.text
+                result.show_alert = bool(method.show_alert)
+            try:
+                return await make_request(bot, method)
+            finally:
+                result.ready.set()
+
+        if isinstance(method, (SendMessage, EditMessageText)) and result.message is None:
+            result.message = method.text
+        return await make_request(bot, method)
+
+
+class IdempotencyMiddleware(BaseMiddleware):
+    """Outer-middleware для callback_query (после антифлуда)."""
+
+    def __init__(self) -> None:
+        # ключ -> (когда истекает, результат)
+        self._cache: Dict[Hashable, Tuple[float, _Result]] = {}
+        self.counters: Dict[str, int] = {
+            "executed": 0,
+            "duplicates": 0,
+            "waited": 0,
+            "failed": 0,
+            "rejected": 0,
+        }
+
+    def _lookup(self, key: Hashable, now: float) -> _Result | None:
+        item = self._cache.get(key)
+        if item is None:
+            return None
+        if item[0] < now:
+            del self._cache[key]
+            return None
+        return item[1]
+
+    def _sweep(self, now: float) -> None:
+        if len(self._cache) > _CLEANUP_SIZE:
+            for k in [k for k, (exp, _) in self._cache.items() if exp < now]:
+                del self._cache[k]
+
+    async def _replay(self, event: CallbackQuery, result: _Result) -> None:
+        if not result.ready.is_set():
+            self.counters["waited"] += 1
+            try:
+                await asyncio.wait_for(result.ready.wait(), IDEMPOTENCY_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+        text = result.text or result.message
+        try:
+            if text:
+                await event.answer(text[:_ANSWER_LIMIT], show_alert=result.show_alert)
+            else:
+                await event.answer()
+        except Exception:
+            pass
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, CallbackQuery) or not event.data:
+            return await handler(event, data)
+        action, _, target = event.data.partition(":")
+        ttl = IDEMPOTENT_ACTIONS.get(action)
+        if ttl is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        id_key = ("id", event.id)
+        op_key = (event.from_user.id, action, target)
+
+        result = self._lookup(id_key, now) or self._lookup(op_key, now)
+        if result is not None:
+            self.counters["duplicates"] += 1
+            await self._replay(event, result)
+            return None
+
+        self._sweep(now)
+        result = _Result()
+        self._cache[id_key] = (now + IDEMPOTENCY_CALLBACK_TTL_SECONDS, result)
+        self._cache[op_key] = (now + ttl, result)
+
+        changes: Dict[int, int] = {}
+        token = _recording.set(result)
+        changes_token = balance_changes.set(changes)
+        try:
+            response = await handler(event, data)
+        except Exception:
+            self.counters["failed"] += 1
+            self._cache.pop(id_key, None)
+            self._cache.pop(op_key, None)
+            raise
+        finally:
+            balance_changes.reset(changes_token)
+            _recording.reset(token)
+            result.finished = True
+            result.ready.set()
+
+        self.counters["executed"] += 1
+        if not any(changes.values()):
+            # деньги не двигались (отказ или откат) — повтор выполнится заново
+            self.counters["rejected"] += 1
+            self._cache.pop(op_key, None)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "cached": len(self._cache)}
+
+
+# один экземпляр на процесс — регистрируется в app/bot.py
+idempotency = IdempotencyMiddleware()
+
+
+def idempotency_stats() -> Dict[str, Any]:
+    return idempotency.stats()
+
+
+register_gauge(
+    "bot_cache_entries",
+    "Записей в кэшах в памяти",
+    lambda: [({"cache": "idempotency"}, len(idempotency._cache))],
+)
@@ -0,0 +1,79 @@
+# app/middlewares/metrics.py
+"""
+Метрики обработки апдейтов и запросов к Bot API (app/services/metrics.py).
+
+- UpdateMetricsMiddleware — outer на update: число апдейтов и полное
+  время обработки (все middlewares + хендлер) по типу апдейта
+- HandlerMetricsMiddleware — inner на message / callback_query: время
+  и исключения по имени функции хендлера (он уже выбран фильтрами)
+- TelegramMetrics — middleware сессии бота: время запроса к Bot API по
+  методу без ожидания в исходящей очереди и ошибки по типу исключения
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.services.metrics import (
+    handler_errors,
+    handler_seconds,
+    telegram_errors,
+    telegram_seconds,
+    update_seconds,
+    updates_total,
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        kind = event.event_type if isinstance(event, Update) else type(event).__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            update_seconds.observe(time.perf_counter() - started, kind)
+            updates_total.inc(kind)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, name)
+
+
+class TelegramMetrics(BaseRequestMiddleware):
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            telegram_seconds.observe(time.perf_counter() - started, name)
+
+
+# регистрируются в app/bot.py
+update_metrics = UpdateMetricsMiddleware()
+handler_metrics = HandlerMetricsMiddleware()
@@ -0,0 +1,148 @@
+# app/middlewares/throttling.py
+"""
+Антифлуд на уровне диспетчера: лишние апдейты отсекаются до хендлеров,
+то есть до запросов в БД, расчёта рейтинга и отправки сообщений.
+
+- у каждого пользователя свой токен-бакет на семейство кнопок
+  (THROTTLE_FAMILIES, семейство по префиксу callback_data — THROTTLE_PREFIXES)
+- одинаковые нажатия (тот же callback_data) в окне THROTTLE_COALESCE_SECONDS
+  выполняются один раз, остальные просто гасятся. Кроме денежных кнопок
+  (IDEMPOTENT_ACTIONS): их дубли пропускаются дальше, и middlewares/
+  idempotency.py отвечает на них ответом первого нажатия
+- лишнему нажатию отвечаем callback.answer() — это дешёвый запрос
+  без chat_id, он идёт мимо исходящей очереди (outbound.py)
+- лишние текстовые сообщения молча пропускаются
+- устаревшие ключи вычищаются, когда словарь вырос вдвое с прошлой
+  чистки (не меньше _CLEANUP_SIZE): полный проход по словарю
+  приходится на столько же вставок, а не на каждый апдейт
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from app.config import (
+    IDEMPOTENT_ACTIONS,
+    THROTTLE_FAMILIES,
+    THROTTLE_PREFIXES,
+    THROTTLE_COALESCE_SECONDS,
+)
+from app.services.metrics import register_gauge
+
+_CLEANUP_SIZE = 10000
+
+
+def _sweep(store: Dict[Tuple[int, str], float], border: float) -> int:
+    """Удалить ключи со временем раньше border; вернуть порог следующей чистки."""
+    for k in [k for k, t in store.items() if t < border]:
+        del store[k]
+    return max(_CLEANUP_SIZE, 2 * len(store))
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Outer-middleware для callback_query и message."""
+
+    def __init__(self) -> None:
+        # (uid, семейство) -> теоретическое время следующего нажатия (GCRA)
+        self._tat: Dict[Tuple[int, str], float] = {}
+        # (uid, callback_data) -> когда последний раз выполнили
+        self._last_run: Dict[Tuple[int, str], float] = {}
+        # размер словаря, при котором его пора чистить
+        self._tat_limit = _CLEANUP_SIZE
+        self._last_run_limit = _CLEANUP_SIZE
+        self.counters: Dict[str, int] = {
+            "passed": 0,
+            "dropped": 0,
+            "coalesced": 0,
+        }
+        self.dropped_by_family: Dict[str, int] = {}
+
+    def _allow(self, uid: int, family: str, now: float) -> bool:
+        interval, burst = THROTTLE_FAMILIES.get(family, THROTTLE_FAMILIES["default"])
+        key = (uid, family)
+        tat = max(self._tat.get(key, 0.0), now)
+        if tat - now > (burst - 1) * interval:
+            return False
+        self._tat[key] = tat + interval
+
+        if len(self._tat) > self._tat_limit:
+            self._tat_limit = _sweep(self._tat, now)
+        return True
+
+    def _coalesced(self, uid: int, data: str, now: float) -> bool:
+        last = self._last_run.get((uid, data))
+        return last is not None and now - last < THROTTLE_COALESCE_SECONDS
+
+    def _mark_run(self, uid: int, data: str, now: float) -> None:
+        self._last_run[(uid, data)] = now
+        if len(self._last_run) > self._last_run_limit:
+            self._last_run_limit = _sweep(self._last_run, now - THROTTLE_COALESCE_SECONDS)
+
+    def _drop(self, family: str) -> None:
+        self.counters["dropped"] += 1
+        self.dropped_by_family[family] = self.dropped_by_family.get(family, 0) + 1
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+
+        if isinstance(event, CallbackQuery):
+            cb_data = event.data or ""
+            action = cb_data.split(":", 1)[0]
+            family = THROTTLE_PREFIXES.get(action, "default")
+            # дубль денежной кнопки должен получить ответ первого нажатия
+            coalesce = action not in IDEMPOTENT_ACTIONS
+
+            if coalesce and self._coalesced(user.id, cb_data, now):
+                self.counters["coalesced"] += 1
+                try:
+                    await event.answer()
+                except Exception:
+                    pass
+                return None
+
+            if not self._allow(user.id, family, now):
+                self._drop(family)
+                try:
+                    await event.answer("⏳ Слишком часто, подождите немного.")
+                except Exception:
+                    pass
+                return None
+
+            if coalesce:
+                self._mark_run(user.id, cb_data, now)
+
+        elif isinstance(event, Message):
+            if not self._allow(user.id, "message", now):
+                self._drop("message")
+                return None
+
+        self.counters["passed"] += 1
+        return await handler(event, data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "by_family": dict(self.dropped_by_family)}
+
+
+# один экземпляр на процесс — регистрируется в app/bot.py
+throttling = ThrottlingMiddleware()
+
+
+def throttling_stats() -> Dict[str, Any]:
+    return throttling.stats()
+
+
+register_gauge(
+    "bot_cache_entries",
+    "Записей в кэшах в памяти",
+    lambda: [({"cache": "throttle_buckets"}, len(throttling._tat))],
+)
@@ -0,0 +1,113 @@
+# app/models.py
+"""
+Модели живых объектов в памяти: игры в кости и раунды Банкира.
+
+Классы со __slots__ (dataclass(slots=True)): у экземпляра нет своего
+__dict__, поля лежат в фиксированных слотах — меньше памяти на объект
+и быстрее доступ к атрибутам, чем к ключам словаря.
+Статусы и победитель — целочисленные enum'ы.
+
+Строки из БД (история, рейтинг) остаются словарями — это отчёты,
+а не живые объекты.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import IntEnum
+from typing import TYPE_CHECKING, Dict, KeysView, List, Tuple
+
+from app.services import clock
+
+if TYPE_CHECKING:
+    from app.services.raffle import WeightedTickets
+
+
+def _utcnow() -> datetime:
+    # через clock: в симуляции игры создаются по виртуальным часам
+    return clock.now()
+
+
+# =====================================================
+#                     КОСТИ
+# =====================================================
+
+class GameStatus(IntEnum):
+    OPEN = 0        # ждёт соперника (в лобби)
+    PLAYING = 1     # соперник есть, идут броски
+    FINISHED = 2    # сыграна, выигрыш выплачен
+
+
+class GameWinner(IntEnum):
+    NONE = 0
+    CREATOR = 1
+    OPPONENT = 2
+    DRAW = 3
+
+
+# в таблице games победитель хранится строкой (как и раньше)
+WINNER_DB_VALUES: Dict[GameWinner, str | None] = {
+    GameWinner.NONE: None,
+    GameWinner.CREATOR: "creator",
+    GameWinner.OPPONENT: "opponent",
+    GameWinner.DRAW: "draw",
+}
+
+
+@dataclass(slots=True, eq=False)
+class DiceGame:
+    id: int
+    creator_id: int
+    bet: int
+    opponent_id: int | None = None
+    creator_roll: int | None = None
+    opponent_roll: int | None = None
+    winner: GameWinner = GameWinner.NONE
+    status: GameStatus = GameStatus.OPEN
+    created_at: datetime = field(default_factory=_utcnow)
+    finished_at: datetime | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status == GameStatus.FINISHED
+
+
+# =====================================================
+#                     БАНКИР
+# =====================================================
+
+class RoundStatus(IntEnum):
+    OPEN = 0        # принимает ставки, таймер не запущен
+    TIMER = 1       # два участника есть, идёт отсчёт до розыгрыша
+    FINISHED = 2    # разыгран или отменён
+
+
+@dataclass(slots=True, eq=False)
+class BankerStake:
+    """Вклад участника в раунд."""
+    shares: int = 0               # количество долей (ставок)
+    amount: int = 0               # вложено ₽
+    last_bet_at: datetime | None = None
+
+
+@dataclass(slots=True, eq=False)
+class BankerRound:
+    id: int
+    room_id: int
+    tickets: "WeightedTickets"            # доли участников (вес = кол-во долей)
+    entry_amount: int | None = None       # цена доли; None — задаёт первая ставка
+    created_at: datetime = field(default_factory=_utcnow)
+    finished_at: datetime | None = None
+    total_bank: int = 0
+    stakes: Dict[int, BankerStake] = field(default_factory=dict)   # user_id -> вклад
+    stake_heap: List[Tuple[int, int]] = field(default_factory=list)  # (-вложено, user_id)
+    winner_id: int | None = None
+    status: RoundStatus = RoundStatus.OPEN
+    draw_at: datetime | None = None       # когда должен быть розыгрыш
+    db_saved: bool = False                # строка раунда уже есть в raffle_rounds
+
+    @property
+    def finished(self) -> bool:
+        return self.status == RoundStatus.FINISHED
+
+    @property
+    def participants(self) -> KeysView[int]:
+        return self.stakes.keys()
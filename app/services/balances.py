@@ -1,21 +1,39 @@
 # app/services/balances.py
 
 import asyncio
+from contextvars import ContextVar
 from typing import Dict, Any
 
-from app.db.users import upsert_user
+from app.db.users import defer_upsert_user, upsert_user
+from app.services.metrics import register_gauge
+from app.services.user_store import BalanceView, UserStore, UsernameView
 
-# Баланс пользователей (кэш в памяти, синхронизируется с БД)
-user_balances: Dict[int, int] = {}
+# Балансы и username всех пользователей (компактно, синхронизируется с БД)
+user_store = UserStore()
 
-# username по user_id (для переводов и отображения)
-user_usernames: Dict[int, str] = {}
+# словареподобные представления того же хранилища:
+# баланс по user_id и username по user_id (для переводов и отображения)
+user_balances: BalanceView = user_store.balances
+user_usernames: UsernameView = user_store.usernames
+
+register_gauge(
+    "bot_cache_entries",
+    "Записей в кэшах в памяти",
+    lambda: [({"cache": "users"}, len(user_store))],
+)
+
+# uid -> на сколько изменился баланс в текущем нажатии кнопки;
+# задаёт middlewares/idempotency.py, вне него — None
+balance_changes: ContextVar[Dict[int, int] | None] = ContextVar("balance_changes", default=None)
 
 # ----- Пополнения -----
 pending_topup: Dict[int, Any] = {}
 
 # ----- Вывод -----
 pending_withdraw: Dict[int, Any] = {}
+# шаг вывода: "amount" / "details"
+pending_withdraw_step: Dict[int, str] = {}
+# временно сохраняем сумму вывода
 temp_withdraw: Dict[int, Any] = {}
 
 # ----- Переводы -----
@@ -66,19 +84,24 @@ def register_user(user) -> None:
 
 def get_balance(uid: int) -> int:
     """Получаем баланс из кэша (он синхронизируется с БД при изменениях)."""
-    return user_balances.get(uid, 0)
+    return user_store.get_balance(uid)
 
 
 def _sync_user_to_db(uid: int) -> None:
-    """Планируем обновление баланса/username в БД в фоне."""
+    """
+    Планируем обновление баланса/username в БД: внутри апдейта — пакетом
+    на его подключении (app/db/postgres.py), иначе в фоне.
+    """
+    username = user_usernames.get(uid)
+    balance = user_balances.get(uid, 0)
+    if defer_upsert_user(uid, username, balance):
+        return
+
     try:
         loop = asyncio.get_running_loop()
     except RuntimeError:
         return
 
-    username = user_usernames.get(uid)
-    balance = user_balances.get(uid, 0)
-
     loop.create_task(
         upsert_user(
             uid=uid,
@@ -90,16 +113,18 @@ def _sync_user_to_db(uid: int) -> None:
 
 def change_balance(uid: int, amount: int) -> None:
     """Изменить баланс на +amount или -amount и сохранить в БД."""
-    current = user_balances.get(uid, 0)
-    new_balance = current + amount
-    user_balances[uid] = new_balance
+    user_store.add_balance(uid, amount)
+
+    changes = balance_changes.get()
+    if changes is not None:
+        changes[uid] = changes.get(uid, 0) + amount
 
     _sync_user_to_db(uid)
 
 
 def set_balance(uid: int, amount: int) -> None:
     """Админская функция — установить баланс напрямую и сохранить в БД."""
-    user_balances[uid] = amount
+    user_store.set_balance(uid, amount)
     _sync_user_to_db(uid)
 
 
@@ -0,0 +1,149 @@
+# app/services/broadcast.py
+"""
+Рассылка однотипных сообщений многим пользователям
+(итоги Банкира, возвраты ставок, уведомления о пополнениях).
+
+- сообщения уходят параллельно (до BROADCAST_CONCURRENCY одновременно)
+  в своей полосе исходящей очереди (outbound.py) — там же общий
+  и поканальный темп отправки
+- RetryAfter (429): очередь встаёт на паузу, сообщение повторяется
+  (до BROADCAST_MAX_RETRY_AFTER раз)
+- сетевые ошибки и 5xx: до BROADCAST_MAX_RETRIES повторов с нарастающей паузой
+- повторы — только пока не истёк BROADCAST_DEADLINE_SECONDS от начала
+  рассылки, дальше сообщение считается недоставленным
+- broadcast_later — рассылка фоновой задачей (ссылка на задачу хранится
+  до её завершения)
+- по каждой рассылке — доставлено / не доставлено / задержка
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Set, Tuple
+
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from app.bot import bot
+from app.config import (
+    BROADCAST_CONCURRENCY,
+    BROADCAST_MAX_RETRIES,
+    BROADCAST_MAX_RETRY_AFTER,
+    BROADCAST_DEADLINE_SECONDS,
+)
+from app.services.outbound import LANE_NOTIFY, outbound_lane
+
+# итоги последних рассылок
+_recent: Deque[Dict[str, Any]] = deque(maxlen=20)
+_totals: Dict[str, int] = {
+    "broadcasts": 0,
+    "delivered": 0,
+    "failed": 0,
+    "retries": 0,
+    "retry_after": 0,
+}
+# фоновые рассылки (broadcast_later) — чтобы задачи не собрал GC
+_background: Set[asyncio.Task] = set()
+
+
+async def _send_one(chat_id: int, text: str, stats: Dict[str, Any]) -> None:
+    attempt = 0
+    flood = 0
+    while True:
+        try:
+            await bot.send_message(chat_id, text)
+        except TelegramRetryAfter:
+            # флуд-контроль: исходящая очередь уже на паузе, сообщение повторяем
+            stats["retry_after"] += 1
+            flood += 1
+            if flood > BROADCAST_MAX_RETRY_AFTER or _expired(stats):
+                stats["failed"] += 1
+                return
+            continue
+        except (TelegramNetworkError, TelegramServerError):
+            attempt += 1
+            if attempt > BROADCAST_MAX_RETRIES or _expired(stats):
+                stats["failed"] += 1
+                return
+            stats["retries"] += 1
+            await asyncio.sleep(2 ** (attempt - 1))
+            continue
+        except Exception:
+            # заблокировал бота, чат не найден и т.п. — повтор не поможет
+            stats["failed"] += 1
+            return
+
+        latency = time.monotonic() - stats["_started"]
+        stats["delivered"] += 1
+        stats["latency_total"] += latency
+        stats["latency_max"] = max(stats["latency_max"], latency)
+        return
+
+
+def _expired(stats: Dict[str, Any]) -> bool:
+    return time.monotonic() - stats["_started"] > BROADCAST_DEADLINE_SECONDS
+
+
+async def broadcast(
+    name: str, messages: Iterable[Tuple[int, str]], lane: int = LANE_NOTIFY
+) -> Dict[str, Any]:
+    """
+    Разослать сообщения [(chat_id, text), ...] в полосе lane.
+    Возвращает статистику рассылки.
+    Ошибки доставки не пробрасываются — они посчитаны в статистике.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in messages:
+        queue.put_nowait(item)
+
+    stats: Dict[str, Any] = {
+        "name": name,
+        "total": queue.qsize(),
+        "delivered": 0,
+        "failed": 0,
+        "retries": 0,
+        "retry_after": 0,
+        "latency_total": 0.0,
+        "latency_max": 0.0,
+        "_started": time.monotonic(),
+    }
+
+    async def worker():
+        with outbound_lane(lane):
+            while not queue.empty():
+                chat_id, text = queue.get_nowait()
+                await _send_one(chat_id, text, stats)
+
+    workers = min(BROADCAST_CONCURRENCY, stats["total"])
+    if workers:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    started = stats.pop("_started")
+    stats["duration"] = time.monotonic() - started
+    delivered = stats["delivered"]
+    stats["latency_avg"] = (stats.pop("latency_total") / delivered) if delivered else 0.0
+
+    _recent.append(stats)
+    _totals["broadcasts"] += 1
+    for k in ("delivered", "failed", "retries", "retry_after"):
+        _totals[k] += stats[k]
+
+    return stats
+
+
+def broadcast_later(
+    name: str, messages: Iterable[Tuple[int, str]], lane: int = LANE_NOTIFY
+) -> asyncio.Task:
+    """Та же рассылка, но фоновой задачей — вызывающий не ждёт доставки."""
+    task = asyncio.create_task(broadcast(name, list(messages), lane))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+def broadcast_stats() -> Dict[str, Any]:
+    """Итоги за время работы и последние рассылки (новые в конце)."""
+    recent: List[Dict[str, Any]] = list(_recent)
+    return {**_totals, "recent": recent}
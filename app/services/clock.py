@@ -0,0 +1,85 @@
+# app/services/clock.py
+"""
+Время и случайность игровой логики (services/games.py, services/raffle.py).
+
+В проде — системные часы и random.Random() без зерна. Симуляция
+(benchmarks/simulate.py) подставляет VirtualClock и Random(seed): тысячи
+раундов проходят без реальных пауз и повторяются от запуска к запуску.
+
+Модули берут часы через функции (clock.now(), clock.sleep(), get_rng()),
+а не связывают объект при импорте — иначе подмена не дошла бы до них.
+Планировщик и «живое» меню Банкира остаются на системном времени.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+
+class Clock:
+    """Системные часы."""
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Виртуальные часы: время стоит, пока его не сдвинут.
+    sleep() сдвигает время на seconds и только уступает цикл событий —
+    паузы (анимация кубиков и т.п.) не стоят ничего. Паузы параллельных
+    задач складываются, а не перекрываются: виртуальное время идёт быстрее
+    настоящего, но только вперёд.
+    """
+
+    def __init__(self, start: datetime | None = None) -> None:
+        self._now = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.slept = 0.0
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        self._now += timedelta(seconds=seconds)
+
+    async def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+        self.slept += seconds
+        await asyncio.sleep(0)
+
+
+_clock: Clock = Clock()
+_rng: random.Random = random.Random()
+
+
+def now() -> datetime:
+    """Текущее время (UTC, с часовым поясом)."""
+    return _clock.now()
+
+
+async def sleep(seconds: float) -> None:
+    await _clock.sleep(seconds)
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def get_rng() -> random.Random:
+    return _rng
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Подменить часы; возвращает прежние."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def set_rng(rng: random.Random) -> random.Random:
+    """Подменить генератор случайных чисел; возвращает прежний."""
+    global _rng
+    previous, _rng = _rng, rng
+    return previous
@@ -0,0 +1,211 @@
+# app/services/game_lifecycle.py
+"""
+Жизненный цикл игр в кости в памяти:
+- открытая игра попадает в games + лобби + получает TTL
+- по истечении TTL открытая игра отменяется, ставка возвращается создателю
+- сыгранная игра после сохранения в БД удаляется из games
+- создатель может отменить ставку в первые DICE_BET_MIN_CANCEL_AGE
+  (по clock.now()) — cancel_by_creator, общий для меню и симуляции
+- отменённая игра (ставка возвращена) удаляется из БД: в таблице games
+  с finished = 0 остаются только игры, за которыми стоят списанные ставки
+- партии идут в своих задачах (spawn_game); при остановке бота
+  stop_games доигрывает их или отменяет до снимка состояния
+"""
+import asyncio
+from typing import Dict, Tuple
+
+from app.config import DICE_BET_MIN_CANCEL_AGE, DICE_OPEN_GAME_TTL_SECONDS
+from app.db.games import delete_game, upsert_game
+from app.db.pool import db_scope
+from app.models import DiceGame, GameStatus
+from app.services.balances import change_balance
+from app.services import clock
+from app.services.broadcast import broadcast
+from app.services.games import games, play_game
+from app.services.outbound import LANE_GAME, outbound_lane
+from app.services.lobby import index_open_game, unindex_open_game, open_games_count
+from app.services.metrics import register_gauge
+from app.services.scheduler import register_handler, schedule, cancel
+from app.utils.formatters import format_rubles
+
+# счётчики за время работы процесса
+_lifecycle_counters: Dict[str, int] = {
+    "created": 0,
+    "finished": 0,
+    "cancelled": 0,
+    "expired": 0,
+    "interrupted": 0,
+}
+
+# идущие партии: gid -> задача start_game
+_playing: Dict[int, asyncio.Task] = {}
+
+
+def _expire_key(gid: int) -> str:
+    return f"game_expire:{gid}"
+
+
+def open_game(g: DiceGame) -> None:
+    """Новая открытая игра: в games, в лобби и таймер автоотмены."""
+    gid = g.id
+    games[gid] = g
+    index_open_game(g)
+    schedule(_expire_key(gid), DICE_OPEN_GAME_TTL_SECONDS, "game_expire", gid)
+    _lifecycle_counters["created"] += 1
+
+
+def restore_open_game(g: DiceGame, ttl: float) -> None:
+    """Открытая игра из снимка после перезапуска: таймер — на оставшееся время."""
+    gid = g.id
+    games[gid] = g
+    index_open_game(g)
+    schedule(_expire_key(gid), max(ttl, 0), "game_expire", gid)
+
+
+def join_game(gid: int, uid: int) -> None:
+    """Соперник вступил — игра уходит из лобби, таймер автоотмены снят."""
+    g = games[gid]
+    g.opponent_id = uid
+    g.status = GameStatus.PLAYING
+    unindex_open_game(gid)
+    cancel(_expire_key(gid))
+
+
+async def cancel_open_game(gid: int) -> DiceGame | None:
+    """Отмена открытой игры создателем (ставка возвращается)."""
+    g = games.pop(gid, None)
+    if g is None:
+        return None
+    unindex_open_game(gid)
+    cancel(_expire_key(gid))
+    change_balance(g.creator_id, g.bet)
+    _lifecycle_counters["cancelled"] += 1
+    await delete_game(gid)
+    return g
+
+
+def cancel_window_open(g: DiceGame) -> bool:
+    """Не вышло ли окно отмены ставки создателем."""
+    return clock.now() - g.created_at <= DICE_BET_MIN_CANCEL_AGE
+
+
+async def cancel_by_creator(gid: int, uid: int) -> str | None:
+    """Отмена ставки создателем: None — отменена, иначе текст отказа."""
+    g = games.get(gid)
+    if not g:
+        return "Игра не найдена."
+    if g.creator_id != uid:
+        return "Это не ваша игра."
+    if g.opponent_id is not None:
+        return "Уже есть соперник."
+    if not cancel_window_open(g):
+        return "Ставку можно отменить только в течение первой минуты."
+    await cancel_open_game(gid)
+    return None
+
+
+async def launch_matched_game(g: DiceGame, dequeued: Tuple[int, ...] = ()) -> None:
+    """
+    Игра из быстрой очереди: соперник уже есть, лобби не нужно. Записи
+    очереди dequeued удаляются в одной транзакции с записью игры.
+    """
+    games[g.id] = g
+    _lifecycle_counters["created"] += 1
+    await upsert_game(g, dequeued)
+    spawn_game(g.id)
+
+
+def spawn_game(gid: int) -> None:
+    """Сыграть партию в своей задаче: апдейт не ждёт, пока крутятся кубики."""
+    task = asyncio.create_task(start_game(gid))
+    _playing[gid] = task
+    task.add_done_callback(lambda _task: _playing.pop(gid, None))
+
+
+async def stop_games(timeout: float) -> int:
+    """
+    Перед снимком при остановке: дождаться идущих партий (не дольше timeout),
+    оставшиеся отменить. Отменённая до выплаты партия попадёт в снимок
+    с соперником и при старте вернёт ставки; после выплаты — сохраняется
+    в БД сыгранной. Возвращает число отменённых партий.
+    """
+    tasks = dict(_playing)
+    if not tasks:
+        return 0
+    _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    for gid, task in tasks.items():
+        if task not in pending:
+            continue
+        _lifecycle_counters["interrupted"] += 1
+        g = games.get(gid)
+        if g is not None and g.finished:
+            # выплата прошла, сохранение в БД прервано — дописываем
+            await upsert_game(g)
+            del games[gid]
+    return len(pending)
+
+
+async def start_game(gid: int) -> None:
+    """Сыграть игру и убрать её из памяти, если она сохранена в БД."""
+    with outbound_lane(LANE_GAME):
+        await play_game(gid)
+
+    g = games.get(gid)
+    if g is not None and g.finished:
+        # play_game сохраняет игру в БД (upsert_game) до рассылки результатов
+        del games[gid]
+        _lifecycle_counters["finished"] += 1
+
+
+async def _expire_open_game(gid: int) -> None:
+    """Автоотмена открытой игры, к которой никто не присоединился."""
+    g = games.get(gid)
+    if g is None or g.opponent_id is not None:
+        return
+
+    del games[gid]
+    unindex_open_game(gid)
+    # возврат и удаление строки игры — одной транзакцией
+    async with db_scope():
+        change_balance(g.creator_id, g.bet)
+        await delete_game(gid)
+    _lifecycle_counters["expired"] += 1
+
+    await broadcast(
+        "game_refund",
+        [
+            (
+                g.creator_id,
+                f"⌛ Игра №{gid} отменена: никто не присоединился.\n"
+                f"Вам возвращено {format_rubles(g.bet)} ₽.",
+            )
+        ],
+    )
+
+
+register_handler("game_expire", _expire_open_game)
+
+
+def lifecycle_stats() -> Dict[str, int]:
+    """live — всего игр в памяти, open — ждут соперника, in_flight — идут сейчас."""
+    live = len(games)
+    open_count = open_games_count()
+    return {
+        "live": live,
+        "open": open_count,
+        "in_flight": live - open_count,
+        **_lifecycle_counters,
+    }
+
+
+def _games_gauge():
+    s = lifecycle_stats()
+    return [({"state": "open"}, s["open"]), ({"state": "in_flight"}, s["in_flight"])]
+
+
+register_gauge("bot_dice_games", "Игры в кости в памяти: ждут соперника / идут", _games_gauge)
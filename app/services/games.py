@@ -1,7 +1,6 @@
 # app/services/games.py
-import asyncio
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -10,7 +9,11 @@ from app.config import (
     HISTORY_LIMIT,
     HISTORY_PAGE_SIZE,
     MAIN_ADMIN_ID,
+    LOBBY_BET_FILTERS,
 )
+from app.models import DiceGame, GameStatus, GameWinner
+from app.services import clock
+from app.services.metrics import register_gauge
 from app.db.games import (
     get_user_games,
     get_users_profit_and_games_30_days,
@@ -18,76 +21,199 @@ from app.db.games import (
     upsert_game,
 )
 from app.services.balances import change_balance, get_balance, user_usernames
+from app.services.lobby import lobby_version, open_games_page, user_open_game_ids
 from app.utils.formatters import format_rubles
 
 # Активные игры и служебные флаги
-games: Dict[int, Dict[str, Any]] = {}
+games: Dict[int, DiceGame] = {}
 pending_bet_input: Dict[int, bool] = {}
 next_game_id: int = 1
 
 
+def new_game(creator_id: int, bet: int) -> DiceGame:
+    """Новая игра в кости с очередным id."""
+    global next_game_id
+    gid = next_game_id
+    next_game_id += 1
+
+    return DiceGame(gid, creator_id, bet)
+
+
 # =====================================================
 #                     МЕНЮ ИГР
 # =====================================================
 
-def build_games_keyboard(uid: int) -> InlineKeyboardMarkup:
+def _bet_filter_label(flt: int) -> str:
+    lo, hi = LOBBY_BET_FILTERS[flt]
+    if hi is None:
+        return f"{format_rubles(lo)}+ ₽"
+    return f"{format_rubles(lo)}–{format_rubles(hi)} ₽"
+
+
+# Нижние строки лобби — не меняются, создаются один раз
+_GAMES_FOOTER_ROWS: List[List[InlineKeyboardButton]] = [
+    # быстрая игра — автоматический подбор соперника
+    [InlineKeyboardButton(text="⚡ Быстрая игра", callback_data="quick_play")],
+    # мои игры / рейтинг
+    [
+        InlineKeyboardButton(text="📋 Мои игры", callback_data="my_games:0"),
+        InlineKeyboardButton(text="🏆 Рейтинг", callback_data="rating"),
+    ],
+    # ВАЖНО: помощь ТОЛЬКО по костям
+    [
+        InlineKeyboardButton(text="🎮 Игры", callback_data="menu_games"),
+        InlineKeyboardButton(text="🐼 Помощь", callback_data="help_dice"),
+    ],
+]
+
+# Кэш отрисованного лобби, действителен для одной версии лобби:
+# (page, flt) -> (клавиатура без отметок «(Вы)», [(номер строки, игра)])
+_lobby_cache: Dict[Tuple[int, int], Tuple[InlineKeyboardMarkup, List[Tuple[int, DiceGame]]]] = {}
+_lobby_cache_version: int = -1
+_LOBBY_CACHE_MAX = 64
+# готовые строки «(Вы)» для своих игр: gid -> строка клавиатуры
+_own_game_rows: Dict[int, List[InlineKeyboardButton]] = {}
+
+register_gauge(
+    "bot_cache_entries",
+    "Записей в кэшах в памяти",
+    lambda: [({"cache": "lobby_pages"}, len(_lobby_cache))],
+)
+
+
+def _render_games_keyboard(
+    page: int, flt: int
+) -> Tuple[InlineKeyboardMarkup, List[Tuple[int, DiceGame]]]:
+    """Общая для всех клавиатура лобби (без персональных отметок)."""
     rows: List[List[InlineKeyboardButton]] = []
 
+    page_games, page, pages = open_games_page(page, flt)
+    if not 0 <= flt < len(LOBBY_BET_FILTERS):
+        flt = -1
+
     # верхний ряд — создать / обновить
     rows.append(
         [
             InlineKeyboardButton(text="✅ Создать игру", callback_data="create_game"),
-            InlineKeyboardButton(text="🔄 Обновить", callback_data="refresh_games"),
+            InlineKeyboardButton(
+                text="🔄 Обновить", callback_data=f"refresh_games:{page}:{flt}"
+            ),
         ]
     )
 
-    # активные игры (без соперника)
-    active = [g for g in games.values() if g.get("opponent_id") is None]
-    active.sort(key=lambda x: x["id"], reverse=True)
-
-    for g in active:
-        txt = f"🎲 Игра №{g['id']} | {format_rubles(g['bet'])} ₽"
-        if g["creator_id"] == uid:
-            rows.append(
-                [
-                    InlineKeyboardButton(
-                        text=f"{txt} (Вы)", callback_data=f"game_my:{g['id']}"
-                    )
-                ]
+    # фильтры по ставке
+    filter_row = [
+        InlineKeyboardButton(
+            text=("• Все •" if flt == -1 else "Все"),
+            callback_data="games_page:0:-1",
+        )
+    ]
+    for i in range(len(LOBBY_BET_FILTERS)):
+        label = _bet_filter_label(i)
+        filter_row.append(
+            InlineKeyboardButton(
+                text=(f"• {label} •" if flt == i else label),
+                callback_data=f"games_page:0:{i}",
             )
-        else:
-            rows.append(
-                [InlineKeyboardButton(text=txt, callback_data=f"game_open:{g['id']}")]
+        )
+    rows.append(filter_row)
+
+    # активные игры (без соперника) — из индекса лобби, только текущая страница
+    game_rows: List[Tuple[int, DiceGame]] = []
+    for g in page_games:
+        txt = f"🎲 Игра №{g.id} | {format_rubles(g.bet)} ₽"
+        game_rows.append((len(rows), g))
+        rows.append(
+            [InlineKeyboardButton(text=txt, callback_data=f"game_open:{g.id}")]
+        )
+
+    # пагинация
+    if pages > 1:
+        nav_row: List[InlineKeyboardButton] = []
+        if page > 0:
+            nav_row.append(
+                InlineKeyboardButton(
+                    text="⬅️", callback_data=f"games_page:{page - 1}:{flt}"
+                )
             )
+        nav_row.append(
+            InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="ignore")
+        )
+        if page < pages - 1:
+            nav_row.append(
+                InlineKeyboardButton(
+                    text="➡️", callback_data=f"games_page:{page + 1}:{flt}"
+                )
+            )
+        rows.append(nav_row)
 
-    # мои игры / рейтинг
-    rows.append(
-        [
-            InlineKeyboardButton(text="📋 Мои игры", callback_data="my_games:0"),
-            InlineKeyboardButton(text="🏆 Рейтинг", callback_data="rating"),
-        ]
-    )
+    rows.extend(_GAMES_FOOTER_ROWS)
 
-    # ВАЖНО: помощь ТОЛЬКО по костям
-    rows.append(
-        [
-            InlineKeyboardButton(text="🎮 Игры", callback_data="menu_games"),
-            InlineKeyboardButton(text="🐼 Помощь", callback_data="help_dice"),
+    return InlineKeyboardMarkup.construct(inline_keyboard=rows), game_rows
+
+
+def _own_game_row(g: DiceGame) -> List[InlineKeyboardButton]:
+    row = _own_game_rows.get(g.id)
+    if row is None:
+        row = [
+            InlineKeyboardButton(
+                text=f"🎲 Игра №{g.id} | {format_rubles(g.bet)} ₽ (Вы)",
+                callback_data=f"game_my:{g.id}",
+            )
         ]
-    )
+        _own_game_rows[g.id] = row
+    return row
 
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def build_games_keyboard(uid: int, page: int = 0, flt: int = -1) -> InlineKeyboardMarkup:
+    """
+    Клавиатура лобби для пользователя uid.
+    Общая часть берётся из кэша по версии лобби,
+    для пользователя подменяются только строки его собственных игр.
+    """
+    global _lobby_cache_version
+
+    version = lobby_version()
+    if version != _lobby_cache_version:
+        _lobby_cache.clear()
+        _own_game_rows.clear()
+        _lobby_cache_version = version
+
+    key = (page, flt)
+    cached = _lobby_cache.get(key)
+    if cached is None:
+        if len(_lobby_cache) >= _LOBBY_CACHE_MAX:
+            _lobby_cache.clear()
+        cached = _render_games_keyboard(page, flt)
+        _lobby_cache[key] = cached
+
+    markup, game_rows = cached
+
+    own = user_open_game_ids(uid)
+    if not own:
+        return markup
+
+    rows = None
+    for row_idx, g in game_rows:
+        if g.id in own:
+            if rows is None:
+                rows = list(markup.inline_keyboard)
+            rows[row_idx] = _own_game_row(g)
+
+    if rows is None:
+        return markup
+    return InlineKeyboardMarkup.construct(inline_keyboard=rows)
 
 
 def build_games_text() -> str:
     return "Создайте игру или выберите уже имеющуюся:"
 
 
-async def send_games_list(chat_id: int, uid: int):
+async def send_games_list(chat_id: int, uid: int, page: int = 0, flt: int = -1):
     await bot.send_message(
         chat_id,
         build_games_text(),
-        reply_markup=build_games_keyboard(uid),
+        reply_markup=build_games_keyboard(uid, page, flt),
     )
 
 
@@ -136,7 +262,7 @@ async def build_user_stats_and_history(
         "day": {"games": 0, "profit": 0},
     }
 
-    now = datetime.now(timezone.utc)
+    now = clock.now()
 
     for g in finished:
         finished_at = g.get("finished_at")
@@ -251,7 +377,7 @@ async def build_rating_text(requesting_uid: int) -> str:
     Строим рейтинг, учитывая, что get_users_profit_and_games_30_days()
     возвращает КОРТЕЖ: (finished_games, all_uids)
     """
-    now = datetime.now(timezone.utc)
+    now = clock.now()
     finished_games, all_uids = await get_users_profit_and_games_30_days()
 
     user_stats: Dict[int, Dict[str, int]] = {}
@@ -347,7 +473,7 @@ async def telegram_roll(uid: int) -> int:
     (Функция оставлена для совместимости, вдруг где-то используется)
     """
     msg = await bot.send_dice(uid, emoji="🎲")
-    await asyncio.sleep(3)  # ждём анимацию
+    await clock.sleep(3)  # ждём анимацию
     return msg.dice.value
 
 
@@ -362,9 +488,9 @@ async def play_game(gid: int):
     if not g:
         return
 
-    c = g["creator_id"]
-    o = g["opponent_id"]
-    bet = g["bet"]
+    c = g.creator_id
+    o = g.opponent_id
+    bet = g.bet
 
     # 🎲 Перебрасываем, пока не будет победитель
     while True:
@@ -372,7 +498,7 @@ async def play_game(gid: int):
         opponent_roll_msg = await bot.send_dice(o, emoji="🎲")
 
         # ждём завершения анимации (2.5–3 секунды)
-        await asyncio.sleep(3)
+        await clock.sleep(3)
 
         cr = creator_roll_msg.dice.value
         orr = opponent_roll_msg.dice.value
@@ -380,24 +506,24 @@ async def play_game(gid: int):
         if cr != orr:
             break  # победитель найден, выходим из цикла (иначе переброс)
 
-    g["creator_roll"] = cr
-    g["opponent_roll"] = orr
-    g["finished"] = True
-    g["finished_at"] = datetime.now(timezone.utc)
+    g.creator_roll = cr
+    g.opponent_roll = orr
+    g.finished_at = clock.now()
 
     bank = bet * 2
     commission = bank // 100
     prize = bank - commission
 
     if cr > orr:
-        winner = "creator"
+        winner = GameWinner.CREATOR
         change_balance(c, prize)
     else:
-        winner = "opponent"
+        winner = GameWinner.OPPONENT
         change_balance(o, prize)
 
     change_balance(MAIN_ADMIN_ID, commission)
-    g["winner"] = winner
+    g.winner = winner
+    g.status = GameStatus.FINISHED
 
     # сохраняем в БД
     await upsert_game(g)
@@ -410,8 +536,8 @@ async def play_game(gid: int):
 
         result_text = (
             "🥳 Поздравляем с победой!"
-            if (winner == "creator" and is_creator)
-            or (winner == "opponent" and not is_creator)
+            if (winner == GameWinner.CREATOR and is_creator)
+            or (winner == GameWinner.OPPONENT and not is_creator)
             else "😔 К сожалению, вы проиграли."
         )
 
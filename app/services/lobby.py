@@ -0,0 +1,120 @@
+# app/services/lobby.py
+"""
+Индекс открытых игр в кости (без соперника) для лобби.
+
+Поддерживается инкрементально при создании / вступлении / отмене игры:
+- по id (для списка «новые сверху»)
+- по ставке (для фильтров по диапазону — bisect вместо полного перебора)
+- по создателю (свои игры пользователя)
+"""
+import bisect
+from typing import Dict, List, Set, Tuple
+
+from app.config import LOBBY_PAGE_SIZE, LOBBY_BET_FILTERS
+from app.models import DiceGame
+
+# gid -> игра (тот же объект, что и в games)
+_open_games: Dict[int, DiceGame] = {}
+# id открытых игр по возрастанию
+_open_ids: List[int] = []
+# (bet, gid) по возрастанию
+_open_by_bet: List[Tuple[int, int]] = []
+# creator_id -> set(gid)
+_open_by_creator: Dict[int, Set[int]] = {}
+
+# Версия лобби: меняется только при изменении набора открытых игр
+_lobby_version: int = 0
+
+
+def _remove_sorted(items: list, value) -> None:
+    i = bisect.bisect_left(items, value)
+    if i < len(items) and items[i] == value:
+        del items[i]
+
+
+def index_open_game(g: DiceGame) -> None:
+    """Добавить игру в лобби (вызывается при создании игры)."""
+    global _lobby_version
+    gid = g.id
+    if gid in _open_games:
+        return
+
+    _open_games[gid] = g
+    bisect.insort(_open_ids, gid)
+    bisect.insort(_open_by_bet, (g.bet, gid))
+    _open_by_creator.setdefault(g.creator_id, set()).add(gid)
+    _lobby_version += 1
+
+
+def unindex_open_game(gid: int) -> None:
+    """Убрать игру из лобби (соперник вступил или игра отменена)."""
+    global _lobby_version
+    g = _open_games.pop(gid, None)
+    if g is None:
+        return
+
+    _remove_sorted(_open_ids, gid)
+    _remove_sorted(_open_by_bet, (g.bet, gid))
+
+    own = _open_by_creator.get(g.creator_id)
+    if own is not None:
+        own.discard(gid)
+        if not own:
+            del _open_by_creator[g.creator_id]
+
+    _lobby_version += 1
+
+
+def lobby_version() -> int:
+    return _lobby_version
+
+
+def user_open_game_ids(uid: int) -> Set[int]:
+    """id открытых игр, созданных пользователем."""
+    return _open_by_creator.get(uid, set())
+
+
+def open_games_count() -> int:
+    return len(_open_ids)
+
+
+def _bet_bounds(flt: int) -> Tuple[int, int]:
+    """Границы среза _open_by_bet для фильтра (индекс в LOBBY_BET_FILTERS)."""
+    lo_bet, hi_bet = LOBBY_BET_FILTERS[flt]
+    lo = bisect.bisect_left(_open_by_bet, (lo_bet, 0))
+    if hi_bet is None:
+        hi = len(_open_by_bet)
+    else:
+        hi = bisect.bisect_left(_open_by_bet, (hi_bet + 1, 0))
+    return lo, hi
+
+
+def open_games_page(
+    page: int, flt: int = -1
+) -> Tuple[List[DiceGame], int, int]:
+    """
+    Страница открытых игр.
+    flt = -1 — все игры (новые сверху), иначе — фильтр по ставке
+    (индекс в LOBBY_BET_FILTERS, игры по возрастанию ставки).
+    Возвращает (игры, номер страницы, всего страниц).
+    """
+    if 0 <= flt < len(LOBBY_BET_FILTERS):
+        lo, hi = _bet_bounds(flt)
+    else:
+        flt = -1
+        lo, hi = 0, len(_open_ids)
+
+    total = hi - lo
+    pages = max(1, (total + LOBBY_PAGE_SIZE - 1) // LOBBY_PAGE_SIZE)
+    page = max(0, min(page, pages - 1))
+
+    start = page * LOBBY_PAGE_SIZE
+    end = min(total, start + LOBBY_PAGE_SIZE)
+
+    if flt == -1:
+        # новые сверху: идём с конца списка id
+        ids = [_open_ids[hi - 1 - i] for i in range(start, end)]
+    else:
+        ids = [gid for _, gid in _open_by_bet[lo + start:lo + end]]
+
+    return [_open_games[gid] for gid in ids], page, pages
@@ -0,0 +1,234 @@
+# app/services/matchmaking.py
+"""
+Быстрая игра в кости: очередь ожидания по «корзинам» ставок.
+
+Игрок ставит сумму в очередь (деньги списываются сразу).
+Если в той же корзине уже кто-то ждёт — берём самого раннего (O(1))
+и сразу запускаем игру, иначе ждём соперника до таймаута (возврат ставки).
+
+Ставка ожидающего есть только в памяти, поэтому каждая запись очереди
+пишется и в БД (quick_queue) вместе со списанием. Из БД запись уходит
+вместе с возвратом (выход, таймаут) или в одной транзакции с записью
+сматченной игры. После падения снимок очереди не годится, и ставки
+возвращаются по quick_queue (services/snapshot.py).
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Set, Tuple
+
+from app.bot import bot
+from app.config import (
+    DICE_MIN_BET,
+    DICE_QUICK_BET_TOLERANCE_PERCENT,
+    DICE_QUICK_QUEUE_TIMEOUT_SECONDS,
+)
+from app.db.games import add_queue_entry, delete_queue_entry
+from app.db.pool import db_scope
+from app.models import GameStatus
+from app.services.balances import change_balance, get_balance
+from app.services.broadcast import broadcast
+from app.services.game_lifecycle import launch_matched_game
+from app.services.games import new_game
+from app.services.scheduler import register_handler, schedule, cancel
+from app.utils.formatters import format_rubles
+
+# ожидание ввода ставки для быстрой игры (используется в handlers/text.py)
+pending_quick_bet_input: Dict[int, bool] = {}
+
+# корзина -> OrderedDict(uid -> (ставка, время постановки)) — старые первыми
+_queues: Dict[int, "OrderedDict[int, Tuple[int, float]]"] = {}
+# uid -> корзина
+_waiting: Dict[int, int] = {}
+# ставка списана, запись очереди ещё пишется в БД
+_enqueuing: Set[int] = set()
+
+_mm_counters: Dict[str, Any] = {
+    "enqueued": 0,
+    "matched": 0,
+    "timeouts": 0,
+    "left": 0,
+    "wait_total": 0.0,   # суммарное ожидание сматченных (сек)
+    "wait_max": 0.0,
+}
+
+
+def bet_bucket(bet: int) -> int:
+    """
+    Корзина ставки. При нулевом допуске — сама ставка (точное совпадение),
+    иначе — геометрические интервалы шириной DICE_QUICK_BET_TOLERANCE_PERCENT.
+    """
+    if DICE_QUICK_BET_TOLERANCE_PERCENT <= 0:
+        return bet
+    return int(math.log(bet) / math.log1p(DICE_QUICK_BET_TOLERANCE_PERCENT / 100))
+
+
+def _timeout_key(uid: int) -> str:
+    return f"quick_timeout:{uid}"
+
+
+def _dequeue(uid: int) -> Tuple[int, float] | None:
+    bucket = _waiting.pop(uid, None)
+    if bucket is None:
+        return None
+    q = _queues[bucket]
+    entry = q.pop(uid)
+    if not q:
+        del _queues[bucket]
+    cancel(_timeout_key(uid))
+    return entry
+
+
+def is_waiting(uid: int) -> bool:
+    return uid in _waiting
+
+
+async def quick_play(uid: int, bet: int) -> str:
+    """Поставить игрока в очередь или сразу найти ему соперника."""
+    if uid in _waiting or uid in _enqueuing:
+        return "Вы уже в очереди быстрой игры. Ожидайте соперника."
+    if bet < DICE_MIN_BET:
+        return f"Минимальная ставка: {DICE_MIN_BET} ₽."
+    if bet > get_balance(uid):
+        return "Недостаточно ₽ на балансе!"
+
+    change_balance(uid, -bet)
+
+    bucket = bet_bucket(bet)
+    q = _queues.get(bucket)
+    dequeued: Tuple[int, ...] = ()
+
+    if not q:
+        # сначала запись в БД (вместе со списанием), потом очередь в памяти:
+        # иначе соперник мог бы сматчить нас и удалить запись раньше, чем она
+        # появится, и после падения ставку вернули бы второй раз
+        _enqueuing.add(uid)
+        try:
+            await add_queue_entry(uid, bet)
+        finally:
+            _enqueuing.discard(uid)
+        dequeued = (uid,)
+        q = _queues.get(bucket)
+
+    if not q:
+        _queues.setdefault(bucket, OrderedDict())[uid] = (bet, time.monotonic())
+        _waiting[uid] = bucket
+        _mm_counters["enqueued"] += 1
+        schedule(
+            _timeout_key(uid), DICE_QUICK_QUEUE_TIMEOUT_SECONDS, "quick_timeout", uid
+        )
+        return (
+            f"⚡ Вы в очереди быстрой игры со ставкой {format_rubles(bet)} ₽.\n"
+            "Игра начнётся автоматически, как только найдётся соперник."
+        )
+
+    # самый ранний игрок в корзине
+    opp_uid = next(iter(q))
+    opp_bet, enqueued_at = _dequeue(opp_uid)
+
+    waited = time.monotonic() - enqueued_at
+    _mm_counters["matched"] += 1
+    _mm_counters["wait_total"] += waited
+    _mm_counters["wait_max"] = max(_mm_counters["wait_max"], waited)
+
+    # при допуске ставки могут отличаться — играем на меньшую, разницу возвращаем
+    game_bet = min(bet, opp_bet)
+    if bet > game_bet:
+        change_balance(uid, bet - game_bet)
+    if opp_bet > game_bet:
+        change_balance(opp_uid, opp_bet - game_bet)
+
+    g = new_game(opp_uid, game_bet)
+    g.opponent_id = uid
+    g.status = GameStatus.PLAYING
+    await launch_matched_game(g, (opp_uid,) + dequeued)
+
+    try:
+        await bot.send_message(
+            opp_uid,
+            f"⚡ Соперник найден! Игра №{g.id}, ставка {format_rubles(game_bet)} ₽.",
+        )
+    except Exception:
+        pass
+
+    return f"⚡ Соперник найден! Игра №{g.id}, ставка {format_rubles(game_bet)} ₽."
+
+
+def restore_waiting(uid: int, bet: int, waited: float) -> None:
+    """Игрок из снимка после перезапуска: ставка уже списана, таймаут — на остаток."""
+    if uid in _waiting:
+        return
+    bucket = bet_bucket(bet)
+    _queues.setdefault(bucket, OrderedDict())[uid] = (bet, time.monotonic() - waited)
+    _waiting[uid] = bucket
+    schedule(
+        _timeout_key(uid),
+        max(DICE_QUICK_QUEUE_TIMEOUT_SECONDS - waited, 0),
+        "quick_timeout",
+        uid,
+    )
+
+
+def waiting_entries() -> List[Tuple[int, int, float]]:
+    """Все ожидающие: (uid, ставка, сколько ждёт, сек)."""
+    now = time.monotonic()
+    return [
+        (uid, bet, now - enqueued_at)
+        for q in _queues.values()
+        for uid, (bet, enqueued_at) in q.items()
+    ]
+
+
+async def leave_queue(uid: int) -> str:
+    entry = _dequeue(uid)
+    if entry is None:
+        return "Вы не стоите в очереди быстрой игры."
+    bet, _ = entry
+    change_balance(uid, bet)
+    _mm_counters["left"] += 1
+    await delete_queue_entry(uid)
+    return f"Вы вышли из очереди. {format_rubles(bet)} ₽ возвращены."
+
+
+async def _queue_timeout(uid: int) -> None:
+    entry = _dequeue(uid)
+    if entry is None:
+        return
+    bet, _ = entry
+    # возврат и удаление записи очереди — одной транзакцией
+    async with db_scope():
+        change_balance(uid, bet)
+        await delete_queue_entry(uid)
+    _mm_counters["timeouts"] += 1
+
+    await broadcast(
+        "quick_refund",
+        [
+            (
+                uid,
+                "⌛ Соперник для быстрой игры не найден.\n"
+                f"Вам возвращено {format_rubles(bet)} ₽.",
+            )
+        ],
+    )
+
+
+register_handler("quick_timeout", _queue_timeout)
+
+
+def matchmaking_stats() -> Dict[str, Any]:
+    """Глубина очереди и время ожидания."""
+    now = time.monotonic()
+    oldest_wait = 0.0
+    for q in _queues.values():
+        _, enqueued_at = next(iter(q.values()))
+        oldest_wait = max(oldest_wait, now - enqueued_at)
+
+    matched = _mm_counters["matched"]
+    return {
+        "depth": len(_waiting),
+        "buckets": len(_queues),
+        "oldest_wait": oldest_wait,
+        "avg_wait": (_mm_counters["wait_total"] / matched) if matched else 0.0,
+        **_mm_counters,
+    }
@@ -0,0 +1,199 @@
+# app/services/metrics.py
+"""
+Метрики бота в текстовом формате Prometheus: GET /metrics на METRICS_PORT
+(отдельный порт — наружу публикуется только webhook).
+
+Без сторонних библиотек и дешёво для прода:
+- счётчик — словарь {метки: число}; счётчик без меток виден
+  со значением 0 ещё до первого inc()
+- гистограмма — фиксированные корзины, observe = bisect + два сложения
+- показатели (gauges) считаются только при запросе /metrics: модули
+  регистрируют функцию register_gauge(...) рядом со своим состоянием,
+  как обработчики планировщика (register_handler); несколько модулей
+  могут добавлять свои ряды в один показатель (bot_cache_entries)
+
+Что пишется (см. middlewares/metrics.py, app/db/storage.py):
+- bot_updates_total / bot_update_duration_seconds — по типу апдейта
+- bot_handler_duration_seconds / bot_handler_errors_total — по имени хендлера
+- bot_db_query_duration_seconds — по запросу (методу Storage)
+- bot_telegram_request_duration_seconds / bot_telegram_errors_total — по методу Bot API
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from aiohttp import web
+
+from app.config import METRICS_HOST, METRICS_PORT
+
+# секунды: от быстрых запросов к кэшу до долгих рассылок
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# значение gauge: число или [(метки, число), ...]
+GaugeValue = float | Iterable[Tuple[Dict[str, str], float]]
+
+_registry: List["Counter | Histogram"] = []
+# имя -> (описание, функции рядов)
+_gauges: Dict[str, Tuple[str, List[Callable[[], GaugeValue]]]] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    __slots__ = ("name", "help", "labelnames", "values")
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        # без меток ряд один — сразу с нулём, чтобы rate()/increase() видели начало
+        self.values: Dict[Tuple, float] = {} if labelnames else {(): 0}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    __slots__ = ("name", "help", "labelnames", "buckets", "series")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # метки -> [счётчики по корзинам (+Inf последней), сумма, количество]
+        self.series: Dict[Tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels(names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels(names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(names, labels)} {count}")
+        return lines
+
+
+def register_gauge(name: str, help: str, fn: Callable[[], GaugeValue]) -> None:
+    """Показатель, который считается при каждом запросе /metrics."""
+    _gauges.setdefault(name, (help, []))[1].append(fn)
+
+
+def _render_gauge(name: str, help: str, fns: List[Callable[[], GaugeValue]]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for fn in fns:
+        try:
+            value = fn()
+        except Exception as e:
+            print(f"Ошибка метрики {name}:", e)
+            continue
+        if isinstance(value, (int, float)):
+            lines.append(f"{name} {value}")
+            continue
+        for labels, v in value:
+            names = tuple(labels)
+            lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {v}")
+    return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for name, (help, fns) in _gauges.items():
+        lines.extend(_render_gauge(name, help, fns))
+    return "\n".join(lines) + "\n"
+
+
+# =====================================================
+#                 МЕТРИКИ БОТА
+# =====================================================
+
+updates_total = Counter("bot_updates_total", "Обработано апдейтов", ("type",))
+update_seconds = Histogram("bot_update_duration_seconds", "Время обработки апдейта", ("type",))
+handler_seconds = Histogram("bot_handler_duration_seconds", "Время работы хендлера", ("handler",))
+handler_errors = Counter("bot_handler_errors_total", "Исключения в хендлерах", ("handler",))
+db_query_seconds = Histogram("bot_db_query_duration_seconds", "Время запроса к БД", ("statement",))
+db_query_errors = Counter("bot_db_query_errors_total", "Ошибки запросов к БД", ("statement",))
+telegram_seconds = Histogram(
+    "bot_telegram_request_duration_seconds", "Время запроса к Bot API", ("method",)
+)
+telegram_errors = Counter("bot_telegram_errors_total", "Ошибки Bot API", ("method", "error"))
+
+_started = time.time()
+register_gauge("bot_uptime_seconds", "Время с запуска процесса", lambda: time.time() - _started)
+
+
+# =====================================================
+#                   HTTP /metrics
+# =====================================================
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        body=render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+def build_metrics_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    return app
+
+
+_runner: web.AppRunner | None = None
+
+
+async def start_metrics_server() -> None:
+    """Поднять /metrics на METRICS_HOST:METRICS_PORT; METRICS_PORT=0 — выключено."""
+    global _runner
+    if not METRICS_PORT or _runner is not None:
+        return
+    _runner = web.AppRunner(build_metrics_app(), access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, METRICS_HOST, METRICS_PORT).start()
+    print(f"📈 Метрики: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+
+async def stop_metrics_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,185 @@
+# app/services/outbound.py
+"""
+Единая очередь исходящих запросов к Telegram с приоритетными полосами.
+
+Подключается как middleware сессии бота (app/bot.py), поэтому через неё
+проходят все bot.send_* / message.answer / edit_* — модули ничего не
+меняют в своих вызовах. Запросы без chat_id (getUpdates, answerCallbackQuery,
+getMe) идут мимо очереди.
+
+- полоса задаётся контекстом: with outbound_lane(LANE_GAME): ...
+  (по умолчанию — интерактивные ответы в хендлерах)
+- раздача: всегда из самой приоритетной непустой полосы,
+  общий токен-бакет OUTBOUND_GLOBAL_RATE / OUTBOUND_GLOBAL_BURST
+- на чат — не больше OUTBOUND_PER_CHAT_BURST подряд, дальше
+  одно сообщение в OUTBOUND_PER_CHAT_INTERVAL
+- полосы ограничены по длине: при переполнении отправитель ждёт (backpressure)
+- 429 RetryAfter от Telegram ставит на паузу всю раздачу
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.config import (
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_GLOBAL_BURST,
+    OUTBOUND_PER_CHAT_INTERVAL,
+    OUTBOUND_PER_CHAT_BURST,
+    OUTBOUND_LANE_CAPACITY,
+)
+
+# Полосы по убыванию приоритета
+LANE_INTERACTIVE = 0   # ответы пользователю на его действие
+LANE_GAME = 1          # броски и итоги игр, итоги Банкира
+LANE_NOTIFY = 2        # уведомления, возвраты, алерты админам
+LANE_NAMES = ("interactive", "game", "notify")
+
+_current_lane: ContextVar[int] = ContextVar("outbound_lane", default=LANE_INTERACTIVE)
+
+_lanes: List[asyncio.Queue] | None = None
+_ready: asyncio.Event | None = None
+_pump_task: asyncio.Task | None = None
+
+# общий бакет и флуд-пауза (time.monotonic)
+_global_tat: float = 0.0
+_paused_until: float = 0.0
+# chat_id -> теоретическое время следующего сообщения (GCRA)
+_chat_tat: Dict[int, float] = {}
+
+_lane_stats: List[Dict[str, Any]] = [
+    {"enqueued": 0, "sent": 0, "blocked": 0, "wait_total": 0.0, "wait_max": 0.0}
+    for _ in LANE_NAMES
+]
+_outbound_counters: Dict[str, int] = {"bypassed": 0, "retry_after": 0}
+
+
+@contextmanager
+def outbound_lane(lane: int):
+    """Все запросы внутри блока идут в полосу lane."""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def _ensure_pump() -> None:
+    global _lanes, _ready, _pump_task
+    if _pump_task is None:
+        _lanes = [asyncio.Queue(maxsize=cap) for cap in OUTBOUND_LANE_CAPACITY]
+        _ready = asyncio.Event()
+        _pump_task = asyncio.create_task(_pump())
+
+
+async def _wait_chat_slot(chat_id: int) -> None:
+    """Темп на чат: короткий всплеск, дальше не чаще OUTBOUND_PER_CHAT_INTERVAL."""
+    now = time.monotonic()
+    tat = max(_chat_tat.get(chat_id, 0.0), now)
+    wait = tat - now - (OUTBOUND_PER_CHAT_BURST - 1) * OUTBOUND_PER_CHAT_INTERVAL
+    _chat_tat[chat_id] = tat + OUTBOUND_PER_CHAT_INTERVAL
+
+    if len(_chat_tat) > 10000:
+        for cid in [c for c, t in _chat_tat.items() if t < now]:
+            del _chat_tat[cid]
+
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+async def _pump():
+    """Выдаёт разрешения на отправку: приоритет полос + общий бакет."""
+    global _global_tat
+    interval = 1 / OUTBOUND_GLOBAL_RATE
+    burst_window = (OUTBOUND_GLOBAL_BURST - 1) * interval
+
+    while True:
+        if all(q.empty() for q in _lanes):
+            _ready.clear()
+            await _ready.wait()
+            continue
+
+        now = time.monotonic()
+        tat = max(_global_tat, now)
+        wait = max(_paused_until - now, tat - now - burst_window)
+        if wait > 0:
+            # за время ожидания могла прийти более приоритетная заявка
+            await asyncio.sleep(wait)
+            continue
+
+        for lane, q in enumerate(_lanes):
+            if q.empty():
+                continue
+            fut, enqueued_at = q.get_nowait()
+            if fut.done():
+                break  # отправитель уже отменён — токен не тратим
+            _global_tat = tat + interval
+            waited = time.monotonic() - enqueued_at
+            st = _lane_stats[lane]
+            st["sent"] += 1
+            st["wait_total"] += waited
+            st["wait_max"] = max(st["wait_max"], waited)
+            fut.set_result(None)
+            break
+
+
+async def _acquire(chat_id: int, lane: int) -> None:
+    _ensure_pump()
+    await _wait_chat_slot(chat_id)
+
+    q = _lanes[lane]
+    st = _lane_stats[lane]
+    if q.full():
+        st["blocked"] += 1
+
+    fut = asyncio.get_running_loop().create_future()
+    await q.put((fut, time.monotonic()))
+    st["enqueued"] += 1
+    _ready.set()
+    await fut
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    """Middleware сессии: каждый запрос с chat_id ждёт своей очереди."""
+
+    async def __call__(self, make_request, bot, method):
+        global _paused_until
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            _outbound_counters["bypassed"] += 1
+            return await make_request(bot, method)
+
+        await _acquire(chat_id, _current_lane.get())
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            _paused_until = max(_paused_until, time.monotonic() + e.retry_after)
+            _outbound_counters["retry_after"] += 1
+            raise
+
+
+def outbound_stats() -> Dict[str, Any]:
+    """Глубина и ожидание по полосам."""
+    lanes: List[Tuple[str, Dict[str, Any]]] = []
+    for lane, name in enumerate(LANE_NAMES):
+        st = _lane_stats[lane]
+        lanes.append(
+            (
+                name,
+                {
+                    "depth": _lanes[lane].qsize() if _lanes else 0,
+                    "wait_avg": (st["wait_total"] / st["sent"]) if st["sent"] else 0.0,
+                    **st,
+                },
+            )
+        )
+    return {
+        "lanes": lanes,
+        "paused_for": max(0.0, _paused_until - time.monotonic()),
+        **_outbound_counters,
+    }
@@ -1,10 +1,13 @@
 # app/services/raffle.py
 import asyncio
+import heapq
 import random
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Set, List
+from typing import Dict, Any, List, Tuple
 
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 
 from app.bot import bot
 from app.config import (
@@ -12,102 +15,546 @@ from app.config import (
     RAFFLE_MAX_BETS_PER_ROUND,
     RAFFLE_TIMER_SECONDS,
     RAFFLE_CANCEL_WINDOW_SECONDS,
+    RAFFLE_ROOM_TIERS,
+    RAFFLE_PRIVATE_ROOM_TTL_SECONDS,
+    RAFFLE_LIVE_DEBOUNCE_SECONDS,
+    RAFFLE_LIVE_MIN_INTERVAL_SECONDS,
+    RAFFLE_LIVE_TIMER_STEP_SECONDS,
+    RAFFLE_LIVE_VIEWER_TTL_SECONDS,
+    RAFFLE_JOURNAL_COMPACT_BYTES,
     MAIN_ADMIN_ID,
 )
+from app.models import BankerRound, BankerStake, RoundStatus
 from app.db.raffle import upsert_raffle_round, add_raffle_bet, get_raffle_rounds_and_bets_30_days
+from app.services import clock
 from app.services.balances import change_balance, get_balance, user_usernames
+from app.services.broadcast import broadcast_later
+from app.services.metrics import register_gauge
+from app.services.outbound import LANE_GAME, outbound_lane
+from app.services.raffle_journal import (
+    JournalError,
+    journal_write,
+    journal_sync,
+    read_journal,
+    rewrite_journal,
+    journal_size,
+)
+from app.services.scheduler import register_handler, schedule, cancel, scheduled_due
 from app.utils.formatters import format_rubles
 
 
-# Текущее состояние розыгрыша
-raffle_round: Dict[str, Any] | None = None
-raffle_task: asyncio.Task | None = None
+# Комнаты Банкира: у каждой свой раунд, таймер и запись в БД.
+# room_id -> {
+#     "id": int,
+#     "entry_amount": int | None,   # цена доли уровня; None — задаёт первая ставка
+#     "private": bool,              # своя комната (по ссылке), живёт один раунд
+#     "owner_id": int | None,
+#     "round": BankerRound | None,  # текущий раунд комнаты
+# }
+# Таймер розыгрыша — задача планировщика "raffle_draw:<room_id>".
+raffle_rooms: Dict[int, Dict[str, Any]] = {}
+next_room_id: int = 1
 next_raffle_id: int = 1
 
-# ожидание ввода суммы для Банкира (используется в handlers/text.py)
-pending_raffle_bet_input: Dict[int, bool] = {}
+# ожидание ввода суммы для Банкира: user_id -> room_id (используется в handlers/text.py)
+pending_raffle_bet_input: Dict[int, int] = {}
+
+# пауза между повторами записи журнала, когда решение уже принято
+_JOURNAL_RETRY_SECONDS = 1.0
 
 
-def _ensure_raffle_round() -> Dict[str, Any]:
+class WeightedTickets:
     """
-    Гарантирует наличие текущего раунда.
-    Если раунд завершён или отсутствует — создаёт новый.
+    «Билеты» раунда: у каждого участника вес = количество его долей.
+    Веса хранятся в дереве Фенвика по слотам участников, поэтому
+    добавление, отмена, розыгрыш и шанс участника — O(log n)
+    независимо от общего числа долей.
     """
-    global raffle_round, next_raffle_id
-
-    if raffle_round is None or raffle_round.get("finished"):
-        raffle_round = {
-            "id": next_raffle_id,
-            "created_at": datetime.now(timezone.utc),
-            "finished_at": None,
-
-            # фиксированная ставка за 1 «долю» (share)
-            "entry_amount": None,            # int | None
-
-            # банк и ставки
-            "total_bank": 0,                 # общая сумма в банке
-            "tickets": [],                   # список user_id, по 1 на каждую ставку
-            "participants": set(),           # set(user_id)
-            "user_bets": {},                 # user_id -> количество ставок (долей)
-            "user_last_bet_at": {},          # user_id -> datetime последней ставки
-
-            # итог
-            "winner_id": None,
-            "finished": False,
-            "draw_at": None,                 # datetime, когда должен быть розыгрыш
-        }
+
+    __slots__ = ("_tree", "_weights", "_owners", "_slots", "_free", "total")
+
+    def __init__(self) -> None:
+        self._tree: List[int] = [0]               # 1-based дерево Фенвика
+        self._weights: List[int] = [0]            # вес по слоту
+        self._owners: List[int | None] = [None]   # user_id по слоту
+        self._slots: Dict[int, int] = {}          # user_id -> слот
+        self._free: List[int] = []                # освободившиеся слоты
+        self.total: int = 0                       # всего долей
+
+    def __len__(self) -> int:
+        return self.total
+
+    def _prefix(self, i: int) -> int:
+        s = 0
+        tree = self._tree
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    def _update(self, i: int, delta: int) -> None:
+        tree = self._tree
+        n = len(tree) - 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def _new_slot(self, uid: int) -> int:
+        if self._free:
+            i = self._free.pop()
+        else:
+            # новый узел покрывает (i - lowbit(i), i] — берём сумму уже
+            # существующей части диапазона
+            i = len(self._tree)
+            self._tree.append(self._prefix(i - 1) - self._prefix(i - (i & -i)))
+            self._weights.append(0)
+            self._owners.append(None)
+        self._owners[i] = uid
+        self._slots[uid] = i
+        return i
+
+    def add(self, uid: int, shares: int) -> None:
+        """Добавить пользователю shares долей."""
+        i = self._slots.get(uid)
+        if i is None:
+            i = self._new_slot(uid)
+        self._weights[i] += shares
+        self._update(i, shares)
+        self.total += shares
+
+    def remove(self, uid: int) -> int:
+        """Убрать все доли пользователя. Возвращает, сколько их было."""
+        i = self._slots.pop(uid, None)
+        if i is None:
+            return 0
+        w = self._weights[i]
+        self._update(i, -w)
+        self._weights[i] = 0
+        self._owners[i] = None
+        self._free.append(i)
+        self.total -= w
+        return w
+
+    def weight(self, uid: int) -> int:
+        i = self._slots.get(uid)
+        return self._weights[i] if i is not None else 0
+
+    def chance(self, uid: int) -> float:
+        """Вероятность победы пользователя (0..1)."""
+        return self.weight(uid) / self.total if self.total else 0.0
+
+    def draw(self, rng: random.Random) -> int:
+        """Случайный победитель пропорционально долям."""
+        if self.total <= 0:
+            raise ValueError("нет билетов")
+
+        target = rng.randrange(self.total)
+        # спуск по дереву: ищем первый слот, где префиксная сумма > target
+        tree = self._tree
+        n = len(tree) - 1
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return self._owners[pos + 1]
+
+
+# =====================================================
+#                  РЕЕСТР КОМНАТ
+# =====================================================
+
+def _create_room(
+    entry_amount: int | None,
+    private: bool = False,
+    owner_id: int | None = None,
+    room_id: int | None = None,
+) -> Dict[str, Any]:
+    """room_id задаётся только при восстановлении из журнала."""
+    global next_room_id
+
+    if room_id is None:
+        room_id = next_room_id
+    room = {
+        "id": room_id,
+        "entry_amount": entry_amount,
+        "private": private,
+        "owner_id": owner_id,
+        "round": None,
+    }
+    raffle_rooms[room_id] = room
+    next_room_id = max(next_room_id, room_id + 1)
+    return room
+
+
+def get_room(room_id: int) -> Dict[str, Any] | None:
+    return raffle_rooms.get(room_id)
+
+
+def public_rooms() -> List[Dict[str, Any]]:
+    return [room for room in raffle_rooms.values() if not room["private"]]
+
+
+def create_private_room(owner_id: int) -> Dict[str, Any]:
+    """Своя комната: цену доли задаёт первая ставка, вход по ссылке."""
+    room = _create_room(None, private=True, owner_id=owner_id)
+    journal_write({"t": "room", "room": room["id"], "owner": owner_id})
+    _arm_private_room_expiry(room["id"])
+    return room
+
+
+def _arm_private_room_expiry(room_id: int) -> None:
+    # пустая комната удаляется, если в ней так и не начался раунд
+    schedule(
+        f"raffle_room_expire:{room_id}",
+        RAFFLE_PRIVATE_ROOM_TTL_SECONDS,
+        "raffle_room_expire",
+        room_id,
+        persist=True,
+    )
+
+
+async def _expire_private_room(room_id: int) -> None:
+    room = raffle_rooms.get(room_id)
+    if room is None:
+        return
+    r = room["round"]
+    if r is None or r.finished or not r.tickets:
+        del raffle_rooms[room_id]
+        journal_write({"t": "room_close", "room": room_id})
+    elif r.draw_at is None:
+        # один игрок ещё ждёт соперника — проверим комнату позже;
+        # после запуска таймера комнату закроет розыгрыш
+        _arm_private_room_expiry(room_id)
+
+
+register_handler("raffle_room_expire", _expire_private_room)
+
+
+def room_title(room: Dict[str, Any]) -> str:
+    if room["private"]:
+        return f"Своя комната №{room['id']}"
+    return f"Комната {format_rubles(room['entry_amount'])} ₽"
+
+
+# Комнаты по уровням ставок создаются при запуске
+for _tier in RAFFLE_ROOM_TIERS:
+    _create_room(_tier)
+
+
+def _ensure_raffle_round(room: Dict[str, Any], restore: bool = False) -> BankerRound:
+    """
+    Гарантирует наличие текущего раунда в комнате.
+    Если раунд завершён или отсутствует — создаёт новый
+    (restore=True — раунд из журнала, повторно в журнал не пишется).
+    """
+    global next_raffle_id
+
+    raffle_round = room["round"]
+    if raffle_round is None or raffle_round.finished:
+        raffle_round = BankerRound(
+            next_raffle_id,
+            room["id"],
+            WeightedTickets(),
+            entry_amount=room["entry_amount"],
+        )
+        room["round"] = raffle_round
         next_raffle_id += 1
+        if not restore:
+            journal_write(_round_open_record(raffle_round))
 
     return raffle_round
 
 
-def build_raffle_text(uid: int) -> str:
+# Агрегаты раунда обновляются при ставке/отмене,
+# поэтому текст раунда строится без прохода по участникам.
+
+def _round_add_stake(
+    r: BankerRound, uid: int, shares: int, amount: int, at: datetime
+) -> BankerStake:
+    r.total_bank += amount
+    stake = r.stakes.get(uid)
+    if stake is None:
+        stake = r.stakes[uid] = BankerStake()
+    stake.shares += shares
+    stake.amount += amount
+    stake.last_bet_at = at
+    heapq.heappush(r.stake_heap, (-stake.amount, uid))
+    r.tickets.add(uid, shares)
+    return stake
+
+
+def _round_remove_stake(r: BankerRound, uid: int) -> int:
+    """Убрать все доли участника. Возвращает его вклад."""
+    stake = r.stakes.pop(uid, None)
+    amount = stake.amount if stake else 0
+    r.tickets.remove(uid)
+    r.total_bank = max(0, r.total_bank - amount)
+    return amount
+
+
+def _round_undo_stake(r: BankerRound, uid: int, shares: int, amount: int) -> bool:
+    """Откатить одну ставку участника. False — его вклада в раунде уже нет."""
+    stake = r.stakes.get(uid)
+    if stake is None:
+        return False
+    r.total_bank = max(0, r.total_bank - amount)
+    stake.shares -= shares
+    stake.amount -= amount
+    r.tickets.remove(uid)
+    if stake.shares <= 0:
+        del r.stakes[uid]
+    else:
+        r.tickets.add(uid, stake.shares)
+        heapq.heappush(r.stake_heap, (-stake.amount, uid))
+    return True
+
+
+def _round_max_stake(r: BankerRound) -> int:
+    """Самый крупный вклад в раунде (амортизированно O(log n))."""
+    heap = r.stake_heap
+    stakes = r.stakes
+    while heap:
+        stake = stakes.get(heap[0][1])
+        if stake is not None and stake.amount == -heap[0][0]:
+            break
+        heapq.heappop(heap)
+    return -heap[0][0] if heap else 0
+
+
+def _chance_percent(amount: int, total_bank: int) -> int:
+    return round(amount * 100 / total_bank) if total_bank > 0 else 0
+
+
+# =====================================================
+#                  ЖУРНАЛ РАУНДОВ
+# =====================================================
+
+def _round_open_record(r: BankerRound) -> Dict[str, Any]:
+    return {
+        "t": "open",
+        "id": r.id,
+        "room": r.room_id,
+        "entry": r.entry_amount,
+        "at": r.created_at.isoformat(),
+    }
+
+
+def _journal_snapshot() -> List[Dict[str, Any]]:
+    """Минимальный набор событий, из которого восстанавливается текущее состояние."""
+    records: List[Dict[str, Any]] = []
+    for room in raffle_rooms.values():
+        if room["private"]:
+            records.append({"t": "room", "room": room["id"], "owner": room["owner_id"]})
+        r = room["round"]
+        if r is None or r.finished:
+            continue
+        records.append(_round_open_record(r))
+        for uid, stake in r.stakes.items():
+            records.append(
+                {
+                    "t": "bet",
+                    "id": r.id,
+                    "uid": uid,
+                    "shares": stake.shares,
+                    "amount": stake.amount,
+                    "at": stake.last_bet_at.timestamp(),
+                }
+            )
+        if r.draw_at is not None:
+            records.append({"t": "timer", "id": r.id, "draw_at": r.draw_at.timestamp()})
+    return records
+
+
+def _replay(records: List[Dict[str, Any]]) -> Dict[int, BankerRound]:
+    """Применить события журнала. Возвращает открытые раунды: id -> раунд."""
+    global next_raffle_id
+
+    rounds: Dict[int, BankerRound] = {}
+    for rec in records:
+        t = rec["t"]
+        if t == "room":
+            if rec["room"] not in raffle_rooms:
+                _create_room(None, private=True, owner_id=rec["owner"], room_id=rec["room"])
+        elif t == "room_close":
+            raffle_rooms.pop(rec["room"], None)
+        elif t == "open":
+            room = raffle_rooms.get(rec["room"])
+            if room is None:
+                continue
+            room["round"] = None
+            r = _ensure_raffle_round(room, restore=True)
+            r.id = rec["id"]
+            next_raffle_id = max(next_raffle_id, rec["id"] + 1)
+            r.created_at = datetime.fromisoformat(rec["at"])
+            r.entry_amount = rec["entry"]
+            r.db_saved = True
+            rounds[r.id] = r
+        elif t == "bet":
+            r = rounds.get(rec["id"])
+            if r is None:
+                continue
+            if r.entry_amount is None:
+                r.entry_amount = rec["amount"] // rec["shares"]
+            _round_add_stake(
+                r,
+                rec["uid"],
+                rec["shares"],
+                rec["amount"],
+                datetime.fromtimestamp(rec["at"], timezone.utc),
+            )
+        elif t == "cancel":
+            r = rounds.get(rec["id"])
+            if r is not None:
+                _round_remove_stake(r, rec["uid"])
+        elif t == "undo":
+            # ставка не подтвердилась (сбой записи) — деньги уже возвращены
+            r = rounds.get(rec["id"])
+            if r is not None:
+                _round_undo_stake(r, rec["uid"], rec["shares"], rec["amount"])
+                if rec["timer"]:
+                    r.draw_at = None
+                    r.status = RoundStatus.OPEN
+        elif t == "timer":
+            r = rounds.get(rec["id"])
+            if r is not None:
+                r.draw_at = datetime.fromtimestamp(rec["draw_at"], timezone.utc)
+                r.status = RoundStatus.TIMER
+        elif t == "draw":
+            # итог записан до выплат — раунд окончательно закрыт,
+            # повторно он не разыгрывается
+            r = rounds.pop(rec["id"], None)
+            if r is None:
+                continue
+            room = raffle_rooms.get(r.room_id)
+            if room is not None and room["round"] is r:
+                room["round"] = None
+                if room["private"]:
+                    del raffle_rooms[room["id"]]
+    return rounds
+
+
+async def restore_raffle_state() -> int:
+    """
+    При старте: восстановить открытые раунды из журнала, перевзвести их
+    таймеры и переписать журнал компактно. Возвращает число раундов.
     """
-    Текст состояния игры «Банкир» для пользователя uid.
+    rounds = _replay(read_journal())
+    now = clock.now()
+
+    for r in rounds.values():
+        room_id = r.room_id
+        if r.draw_at is not None:
+            schedule(
+                f"raffle_draw:{room_id}",
+                max(0.0, (r.draw_at - now).total_seconds()),
+                "raffle_draw",
+                room_id,
+                r.id,
+                persist=True,
+            )
+
+    for room in raffle_rooms.values():
+        r = room["round"]
+        if room["private"] and (r is None or not r.tickets):
+            _arm_private_room_expiry(room["id"])
+
+    await rewrite_journal(_journal_snapshot)
+    return len(rounds)
+
+
+# =====================================================
+#                  СПИСОК КОМНАТ
+# =====================================================
+
+def build_rooms_text() -> str:
+    return (
+        "🎩 Игра «Банкир»\n\n"
+        "Выберите комнату по цене доли или создайте свою.\n"
+        "В каждой комнате — свой банк и свой таймер."
+    )
+
+
+def build_rooms_keyboard() -> InlineKeyboardMarkup:
+    rows: List[List[InlineKeyboardButton]] = []
+
+    for room in public_rooms():
+        r = room["round"]
+        if r and not r.finished and r.tickets:
+            stats = f" · 👥 {len(r.participants)} · 💰 {format_rubles(r.total_bank)} ₽"
+        else:
+            stats = ""
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=f"{room_title(room)}{stats}",
+                    callback_data=f"raffle_room:{room['id']}",
+                )
+            ]
+        )
+
+    rows.append(
+        [InlineKeyboardButton(text="➕ Своя комната", callback_data="raffle_private_new")]
+    )
+    rows.append(
+        [
+            InlineKeyboardButton(text="🎮 Игры", callback_data="menu_games"),
+            InlineKeyboardButton(text="🐼 Помощь", callback_data="help_banker"),
+        ]
+    )
+    rows.append(
+        [InlineKeyboardButton(text="🏆 Рейтинг Банкира", callback_data="raffle_rating")]
+    )
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def build_raffle_text(room_id: int, uid: int) -> str:
+    """
+    Текст состояния комнаты «Банкир» для пользователя uid.
     Как на твоём примере: участники, банк, твой вклад, шанс и таймер.
     """
-    r = raffle_round
+    room = raffle_rooms.get(room_id)
+    if room is None:
+        return "Комната не найдена — возможно, раунд в ней уже завершён."
+
+    r = room["round"]
 
-    if not r or r.get("finished") or not r.get("tickets"):
+    if not r or r.finished or not r.tickets:
+        if room["entry_amount"]:
+            price_line = f"Цена доли в этой комнате: {format_rubles(room['entry_amount'])} ₽.\n"
+        else:
+            price_line = f"Минимальная первая ставка: {RAFFLE_MIN_BET} ₽.\n"
         return (
+            f"🎩 {room_title(room)}\n\n"
             "🏁 Розыгрыш начнётся когда будет как минимум два участника.\n\n"
             "🧑‍🦳 Станьте первым, кто сделает ставку.\n\n"
-            f"Минимальная первая ставка: {RAFFLE_MIN_BET} ₽.\n"
+            f"{price_line}"
             f"Можно сделать до {RAFFLE_MAX_BETS_PER_ROUND} ставок за раунд.\n\n"
             "Чем больше вы положили в банк, тем выше шанс на победу.\n"
             "После появления 2 участников запускается таймер на 60 секунд.\n"
             "По его истечении случайный участник забирает весь банк (минус 1% комиссии)."
         )
 
-    entry_amount: int = r["entry_amount"]
-    total_bank: int = r["total_bank"]
-    participants: Set[int] = r["participants"]
-    user_bets: Dict[int, int] = r["user_bets"]
+    entry_amount: int = r.entry_amount
+    total_bank: int = r.total_bank
+    participants = r.participants
 
-    user_shares = user_bets.get(uid, 0)
-    user_amount = user_shares * entry_amount
+    stake = r.stakes.get(uid)
+    user_shares = stake.shares if stake else 0
+    user_amount = stake.amount if stake else 0
 
     # шансы в процентах
-    if total_bank > 0 and user_amount > 0:
-        user_chance = round((user_amount / total_bank) * 100)
-    else:
-        user_chance = 0
-
-    # шанс победителя ≈ максимальная доля
-    if total_bank > 0 and participants:
-        biggest_uid = max(
-            participants,
-            key=lambda u: user_bets.get(u, 0) * entry_amount,
-        )
-        biggest_amount = user_bets.get(biggest_uid, 0) * entry_amount
-        winner_chance = round((biggest_amount / total_bank) * 100)
-    else:
-        winner_chance = 0
+    user_chance = _chance_percent(user_amount, total_bank)
+    top_amount = _round_max_stake(r)
 
     timer_line = ""
-    draw_at = r.get("draw_at")
+    draw_at = r.draw_at
     if draw_at:
-        seconds_left = int((draw_at - datetime.now(timezone.utc)).total_seconds())
+        seconds_left = int((draw_at - clock.now()).total_seconds())
         if seconds_left < 0:
             seconds_left = 0
         timer_line = f"\n⏳ До окончания раунда: {seconds_left} сек."
@@ -117,10 +564,12 @@ def build_raffle_text(uid: int) -> str:
             timer_line = f"\nОжидаем ещё {need} участника(ов) для запуска таймера."
 
     text_lines = [
-        "🎩 Игра «Банкир» — текущий раунд\n",
+        f"🎩 Игра «Банкир» — {room_title(room)}\n",
         f"👥 Участников: {len(participants)}",
         f"💰 Банк: {format_rubles(total_bank)} ₽",
         f"💵 Фиксированная ставка за 1 долю: {format_rubles(entry_amount)} ₽",
+        f"🏅 Самый крупный вклад: {format_rubles(top_amount)} ₽ "
+        f"(шанс {_chance_percent(top_amount, total_bank)}%)",
         timer_line,
         "",
     ]
@@ -136,7 +585,7 @@ def build_raffle_text(uid: int) -> str:
     return "\n".join(text_lines)
 
 
-def build_raffle_menu_keyboard(uid: int) -> InlineKeyboardMarkup:
+def build_raffle_menu_keyboard(room_id: int, uid: int) -> InlineKeyboardMarkup:
     """
     Клавиатура как в твоём примере:
     - Сделать ставку
@@ -144,13 +593,19 @@ def build_raffle_menu_keyboard(uid: int) -> InlineKeyboardMarkup:
     - Игры / Помощь
     + динамические быстрые суммы, если уже известна entry_amount
     """
-    r = raffle_round
+    room = raffle_rooms.get(room_id)
+    r = room["round"] if room else None
 
     rows: List[List[InlineKeyboardButton]] = []
 
     # Быстрые суммы, если уже есть фиксированная ставка
-    if r and not r.get("finished") and r.get("entry_amount"):
-        entry_amount: int = r["entry_amount"]
+    entry_amount: int | None = None
+    if room and room["entry_amount"]:
+        entry_amount = room["entry_amount"]
+    elif r and not r.finished and r.entry_amount:
+        entry_amount = r.entry_amount
+
+    if entry_amount:
         # 1, 3, 7 долей — как 25 / 75 / 175 RUB на твоём скрине
         quick_amounts = [
             entry_amount * 1,
@@ -160,7 +615,7 @@ def build_raffle_menu_keyboard(uid: int) -> InlineKeyboardMarkup:
         quick_buttons = [
             InlineKeyboardButton(
                 text=f"{format_rubles(a)} ₽",
-                callback_data=f"raffle_quick:{a}",
+                callback_data=f"raffle_quick:{room_id}:{a}",
             )
             for a in quick_amounts
         ]
@@ -168,23 +623,23 @@ def build_raffle_menu_keyboard(uid: int) -> InlineKeyboardMarkup:
 
     # Кнопка «Сделать ставку»
     rows.append(
-        [InlineKeyboardButton(text="💰 Сделать ставку", callback_data="raffle_make_bet")]
+        [InlineKeyboardButton(text="💰 Сделать ставку", callback_data=f"raffle_make_bet:{room_id}")]
     )
 
     # Кнопка отмены ставок в текущем раунде
     rows.append(
-        [InlineKeyboardButton(text="♻ Отменить мои ставки", callback_data="raffle_cancel")]
+        [InlineKeyboardButton(text="♻ Отменить мои ставки", callback_data=f"raffle_cancel:{room_id}")]
     )
 
     # Обновить
     rows.append(
-        [InlineKeyboardButton(text="🔄 Обновить", callback_data="raffle_refresh")]
+        [InlineKeyboardButton(text="🔄 Обновить", callback_data=f"raffle_refresh:{room_id}")]
     )
 
-    # Игры / Помощь
+    # Другие комнаты / Помощь
     rows.append(
         [
-            InlineKeyboardButton(text="🎮 Игры", callback_data="menu_games"),
+            InlineKeyboardButton(text="🚪 Комнаты", callback_data="mode_banker"),
             InlineKeyboardButton(text="🐼 Помощь", callback_data="help_banker"),
         ]
     )
@@ -197,22 +652,192 @@ def build_raffle_menu_keyboard(uid: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-async def send_raffle_menu(chat_id: int, uid: int):
-    await bot.send_message(
+# =====================================================
+#                  ЖИВОЕ МЕНЮ КОМНАТЫ
+# =====================================================
+# Меню комнаты у каждого зрителя — одно сообщение, которое бот правит сам:
+# ставка / отмена / таймер -> одна отложенная «волна» правок на комнату
+# (не чаще RAFFLE_LIVE_MIN_INTERVAL_SECONDS), неизменившийся текст не шлём.
+
+# room_id -> {uid: [chat_id, message_id, последний текст, время регистрации]}
+_viewers: Dict[int, Dict[int, list]] = {}
+# uid -> room_id (живое меню у пользователя одно)
+_viewer_room: Dict[int, int] = {}
+_live_last_pass: Dict[int, float] = {}
+_live_counters: Dict[str, int] = {"passes": 0, "edits": 0, "unchanged": 0, "failed": 0}
+
+
+def _register_viewer(room_id: int, uid: int, msg: Message, text: str) -> None:
+    old_room = _viewer_room.get(uid)
+    if old_room is not None and old_room != room_id:
+        _viewers.get(old_room, {}).pop(uid, None)
+    _viewers.setdefault(room_id, {})[uid] = [
+        msg.chat.id,
+        msg.message_id,
+        text,
+        time.monotonic(),
+    ]
+    _viewer_room[uid] = room_id
+
+
+def _drop_viewer(room_id: int, uid: int) -> None:
+    _viewers.get(room_id, {}).pop(uid, None)
+    if _viewer_room.get(uid) == room_id:
+        del _viewer_room[uid]
+
+
+def _touch_room(room_id: int, delay: float = RAFFLE_LIVE_DEBOUNCE_SECONDS) -> None:
+    """Запланировать волну правок (события за delay сливаются в одну)."""
+    if not _viewers.get(room_id):
+        return
+    delay = max(
+        delay,
+        _live_last_pass.get(room_id, 0.0) + RAFFLE_LIVE_MIN_INTERVAL_SECONDS - time.monotonic(),
+    )
+    key = f"raffle_live:{room_id}"
+    due = scheduled_due(key)
+    if due is not None and due <= time.time() + delay:
+        return  # волна уже запланирована не позже
+    schedule(key, delay, "raffle_live", room_id)
+
+
+async def _edit_viewer(room_id: int, uid: int, v: list, text: str, markup) -> None:
+    try:
+        await bot.edit_message_text(
+            text, chat_id=v[0], message_id=v[1], reply_markup=markup
+        )
+    except (TelegramBadRequest, TelegramForbiddenError) as e:
+        if "not modified" in str(e):
+            v[2] = text
+            return
+        # сообщение удалено / чат недоступен — больше не правим
+        _live_counters["failed"] += 1
+        _drop_viewer(room_id, uid)
+        return
+    except Exception:
+        # 429 / сеть: зритель остаётся, правка повторится следующей волной
+        _live_counters["failed"] += 1
+        _touch_room(room_id, RAFFLE_LIVE_TIMER_STEP_SECONDS)
+        return
+    # текст запоминаем только после успешной правки
+    v[2] = text
+    _live_counters["edits"] += 1
+
+
+async def _live_pass(room_id: int) -> None:
+    viewers = _viewers.get(room_id)
+    if not viewers:
+        _viewers.pop(room_id, None)
+        return
+
+    _live_last_pass[room_id] = time.monotonic()
+    _live_counters["passes"] += 1
+    room = raffle_rooms.get(room_id)
+    now = time.monotonic()
+
+    edits = []
+    for uid, v in list(viewers.items()):
+        if now - v[3] > RAFFLE_LIVE_VIEWER_TTL_SECONDS:
+            _drop_viewer(room_id, uid)
+            continue
+        text = build_raffle_text(room_id, uid)
+        if text == v[2]:
+            _live_counters["unchanged"] += 1
+            continue
+        markup = build_raffle_menu_keyboard(room_id, uid) if room else build_rooms_keyboard()
+        edits.append(_edit_viewer(room_id, uid, v, text, markup))
+
+    if edits:
+        with outbound_lane(LANE_GAME):
+            await asyncio.gather(*edits)
+
+    if room is None:
+        # своя комната закрыта — последняя правка показала это зрителям
+        for uid in list(viewers):
+            _drop_viewer(room_id, uid)
+        _viewers.pop(room_id, None)
+        _live_last_pass.pop(room_id, None)
+        return
+
+    r = room["round"]
+    if r and r.draw_at and not r.finished:
+        # обратный отсчёт
+        _touch_room(room_id, RAFFLE_LIVE_TIMER_STEP_SECONDS)
+
+
+register_handler("raffle_live", _live_pass)
+
+
+def raffle_live_stats() -> Dict[str, int]:
+    return {"viewers": len(_viewer_room), **_live_counters}
+
+
+def _banker_gauge():
+    participants = {"public": 0, "private": 0}
+    for room in raffle_rooms.values():
+        r = room["round"]
+        if r is not None and not r.finished:
+            participants["private" if room["private"] else "public"] += len(r.participants)
+    return [({"room": kind}, n) for kind, n in participants.items()]
+
+
+register_gauge("bot_banker_participants", "Участники незавершённых раундов Банкира", _banker_gauge)
+register_gauge(
+    "bot_cache_entries",
+    "Записей в кэшах в памяти",
+    lambda: [({"cache": "banker_viewers"}, len(_viewer_room))],
+)
+
+
+async def send_raffle_menu(chat_id: int, uid: int, room_id: int | None = None):
+    """Меню комнаты, а без room_id (или если комнаты уже нет) — список комнат."""
+    if room_id is None or room_id not in raffle_rooms:
+        await bot.send_message(
+            chat_id,
+            build_rooms_text(),
+            reply_markup=build_rooms_keyboard(),
+        )
+        return
+
+    text = build_raffle_text(room_id, uid)
+    msg = await bot.send_message(
         chat_id,
-        build_raffle_text(uid),
-        reply_markup=build_raffle_menu_keyboard(uid),
+        text,
+        reply_markup=build_raffle_menu_keyboard(room_id, uid),
     )
+    _register_viewer(room_id, uid, msg, text)
+    _touch_room(room_id)
+
+
+async def show_raffle_menu(message: Message, uid: int, room_id: int | None = None):
+    """То же меню, но правкой уже показанного сообщения (кнопки «Обновить», вход в комнату)."""
+    if room_id is None or room_id not in raffle_rooms:
+        text, markup = build_rooms_text(), build_rooms_keyboard()
+    else:
+        text, markup = build_raffle_text(room_id, uid), build_raffle_menu_keyboard(room_id, uid)
 
+    try:
+        await message.edit_text(text, reply_markup=markup)
+    except Exception as e:
+        if "not modified" not in str(e):
+            # старое сообщение уже нельзя править — пришлём новое
+            return await send_raffle_menu(message.chat.id, uid, room_id)
 
-async def _process_raffle_bet(uid: int, chat_id: int, amount: int) -> str:
+    if room_id in raffle_rooms:
+        _register_viewer(room_id, uid, message, text)
+        _touch_room(room_id)
+
+
+async def _process_raffle_bet(uid: int, chat_id: int, amount: int, room_id: int) -> str:
     """
-    Обработка ставки пользователя:
-    - первая ставка задаёт entry_amount
-    - далее сумма должна быть кратна entry_amount
+    Обработка ставки пользователя в комнате room_id:
+    - в комнате уровня цена доли фиксирована, в своей комнате её задаёт первая ставка
+    - сумма должна быть кратна entry_amount
     - максимум RAFFLE_MAX_BETS_PER_ROUND долей на игрока
     """
-    global raffle_task
+    room = raffle_rooms.get(room_id)
+    if room is None:
+        return "Комната не найдена — возможно, раунд в ней уже завершён."
 
     if amount < RAFFLE_MIN_BET:
         return f"Минимальная сумма первой ставки: {format_rubles(RAFFLE_MIN_BET)} ₽."
@@ -225,15 +850,15 @@ async def _process_raffle_bet(uid: int, chat_id: int, amount: int) -> str:
             f"ставка: {format_rubles(amount)} ₽."
         )
 
-    r = _ensure_raffle_round()
+    r = _ensure_raffle_round(room)
 
-    if r["entry_amount"] is None:
+    if r.entry_amount is None:
         # первая ставка в раунде задаёт entry_amount и ровно 1 долю
         entry_amount = amount
         shares_to_add = 1
-        r["entry_amount"] = entry_amount
+        r.entry_amount = entry_amount
     else:
-        entry_amount: int = r["entry_amount"]
+        entry_amount: int = r.entry_amount
         if amount % entry_amount != 0:
             return (
                 "Сумма должна быть кратной фиксированной ставке за 1 долю — "
@@ -245,7 +870,8 @@ async def _process_raffle_bet(uid: int, chat_id: int, amount: int) -> str:
             return "Сумма слишком мала."
 
     # проверка лимита долей на игрока
-    current_shares = r["user_bets"].get(uid, 0)
+    current = r.stakes.get(uid)
+    current_shares = current.shares if current else 0
     if current_shares + shares_to_add > RAFFLE_MAX_BETS_PER_ROUND:
         return (
             f"Нельзя сделать более {RAFFLE_MAX_BETS_PER_ROUND} ставок в одном раунде.\n"
@@ -255,53 +881,92 @@ async def _process_raffle_bet(uid: int, chat_id: int, amount: int) -> str:
     # списываем деньги
     change_balance(uid, -amount)
 
-    # обновляем состояние раунда
-    r["total_bank"] += amount
-    r["participants"].add(uid)
-    r["user_bets"][uid] = current_shares + shares_to_add
-    r["user_last_bet_at"][uid] = datetime.now(timezone.utc)
-
-    # добавляем «билеты» в список
-    for _ in range(shares_to_add):
-        r["tickets"].append(uid)
+    # обновляем состояние раунда (банк, вклад, индекс вкладов, «билеты»)
+    stake = _round_add_stake(r, uid, shares_to_add, amount, clock.now())
+    timer_started = False
 
-    # пишем в БД поштучные суммы (как есть)
-    await add_raffle_bet(r["id"], uid, amount)
+    journal_write(
+        {
+            "t": "bet",
+            "id": r.id,
+            "uid": uid,
+            "shares": shares_to_add,
+            "amount": amount,
+            "at": stake.last_bet_at.timestamp(),
+        }
+    )
 
     # запускаем таймер, если это второй участник
-    if len(r["participants"]) >= 2 and r.get("draw_at") is None:
-        r["draw_at"] = datetime.now(timezone.utc) + timedelta(
+    if len(r.participants) >= 2 and r.draw_at is None:
+        r.draw_at = clock.now() + timedelta(
             seconds=RAFFLE_TIMER_SECONDS
         )
-        raffle_task = asyncio.create_task(raffle_draw_worker(r["id"]))
+        r.status = RoundStatus.TIMER
+        timer_started = True
+        journal_write({"t": "timer", "id": r.id, "draw_at": r.draw_at.timestamp()})
+        schedule(
+            f"raffle_draw:{room_id}",
+            RAFFLE_TIMER_SECONDS,
+            "raffle_draw",
+            room_id,
+            r.id,
+            persist=True,
+        )
+        cancel(f"raffle_room_expire:{room_id}")
+
+    # ставка подтверждается только после записи в журнал
+    # (одна запись на диск на все ставки, пришедшие одновременно)
+    try:
+        await journal_sync()
+    except JournalError:
+        if not r.finished:
+            _rollback_bet(room, r, uid, shares_to_add, amount, timer_started)
+            return "⚠ Не удалось сохранить ставку, деньги возвращены. Попробуйте ещё раз."
+        # раунд уже разыгран вместе с этой ставкой — её итог в журнале
+        # после неё, откатывать нельзя
+        await _sync_until_durable()
+
+    # строка раунда создаётся при открытии, чтобы ставки ссылались на неё
+    if not r.db_saved:
+        r.db_saved = True
+        await upsert_raffle_round(
+            {
+                "id": r.id,
+                "room_id": room_id,
+                "created_at": r.created_at,
+                "finished_at": None,
+                "winner_id": None,
+                "total_bank": 0,
+            }
+        )
+
+    # пишем в БД поштучные суммы (как есть)
+    await add_raffle_bet(r.id, uid, amount)
+
+    _touch_room(room_id)
 
     # текст ответа пользователю
-    entry_amount = r["entry_amount"]
-    total_bets = len(r["tickets"])
-    user_shares = r["user_bets"][uid]
-    total_bank = r["total_bank"]
+    user_shares = stake.shares
+    total_bank = r.total_bank
 
     # шанс пользователя
-    user_amount = user_shares * entry_amount
-    if total_bank > 0:
-        user_chance = round((user_amount / total_bank) * 100)
-    else:
-        user_chance = 0
+    user_amount = stake.amount
+    user_chance = _chance_percent(user_amount, total_bank)
 
     timer_line = ""
-    draw_at = r.get("draw_at")
+    draw_at = r.draw_at
     if draw_at:
-        seconds_left = int((draw_at - datetime.now(timezone.utc)).total_seconds())
+        seconds_left = int((draw_at - clock.now()).total_seconds())
         if seconds_left < 0:
             seconds_left = 0
         timer_line = f"\n⏳ До окончания: ~{seconds_left} сек."
     else:
-        need = max(0, 2 - len(r["participants"]))
+        need = max(0, 2 - len(r.participants))
         timer_line = f"\nОжидаем ещё {need} участника(ов) для запуска таймера."
 
     return (
-        "✅ Ставка в игре «Банкир» принята!\n\n"
-        f"👥 Участников: {len(r['participants'])}\n"
+        f"✅ Ставка в игре «Банкир» принята! ({room_title(room)})\n\n"
+        f"👥 Участников: {len(r.participants)}\n"
         f"💰 Банк: {format_rubles(total_bank)} ₽\n"
         f"🪙 Вы положили: {format_rubles(user_amount)} ₽ ({user_shares}/{RAFFLE_MAX_BETS_PER_ROUND})\n"
         f"🎲 Ваш шанс: {user_chance}%"
@@ -309,134 +974,178 @@ async def _process_raffle_bet(uid: int, chat_id: int, amount: int) -> str:
     )
 
 
-async def raffle_draw_worker(raffle_id: int):
+def _rollback_bet(
+    room: Dict[str, Any], r: BankerRound, uid: int, shares: int, amount: int, timer_started: bool
+) -> None:
+    """Ставка не записалась в журнал: убрать её из раунда и вернуть деньги."""
+    if not _round_undo_stake(r, uid, shares, amount):
+        return  # вклад уже снят отменой вместе с этой суммой
+
+    room_id = room["id"]
+    if timer_started and len(r.participants) < 2:
+        r.draw_at = None
+        r.status = RoundStatus.OPEN
+        cancel(f"raffle_draw:{room_id}")
+    else:
+        timer_started = False
+    if room["private"] and not r.tickets:
+        _arm_private_room_expiry(room_id)
+
+    # запись ставки осталась в буфере и уйдёт при следующем flush — следом за ней
+    journal_write(
+        {"t": "undo", "id": r.id, "uid": uid, "shares": shares, "amount": amount, "timer": timer_started}
+    )
+    change_balance(uid, amount)
+    _touch_room(room_id)
+
+
+async def _raffle_draw_due(room_id: int, raffle_id: int):
     """
-    Фоновая задача: ждёт RAFFLE_TIMER_SECONDS и запускает розыгрыш.
+    Дедлайн планировщика: таймер раунда истёк — запускаем розыгрыш.
     """
-    global raffle_round, raffle_task
-    await asyncio.sleep(RAFFLE_TIMER_SECONDS)
-
-    r = raffle_round
-    if not r or r.get("finished") or r.get("id") != raffle_id:
+    room = raffle_rooms.get(room_id)
+    if room is None:
         return
+    r = room["round"]
+    if not r or r.finished or r.id != raffle_id:
+        return
+
+    await perform_raffle_draw(room_id)
+
 
-    await perform_raffle_draw()
-    raffle_task = None
+register_handler("raffle_draw", _raffle_draw_due)
 
 
-async def perform_raffle_draw():
+async def perform_raffle_draw(room_id: int):
     """
-    Сам розыгрыш:
-    - если участников < 2 — возврат ставок
-    - иначе случайный победитель по билетам (tickets)
+    Розыгрыш в комнате room_id.
+    Итог (победитель или возврат) сначала записывается в журнал и на диск,
+    потом выплаты и БД, рассылка итогов — в фоне: после падения раунд
+    с записанным итогом не разыгрывается повторно.
+    Своя (приватная) комната после розыгрыша закрывается.
     """
-    global raffle_round
-    r = raffle_round
-    if not r or r.get("finished"):
+    room = raffle_rooms.get(room_id)
+    if room is None:
+        return
+    r = room["round"]
+    if not r or r.finished:
         return
 
-    participants: Set[int] = r["participants"]
-    tickets: List[int] = r["tickets"]
-    entry_amount: int | None = r["entry_amount"]
-    total_bank: int = r["total_bank"]
+    # решение принимается сразу, до первого await: новые ставки уже идут
+    # в следующий раунд, отмены в этот раунд не принимаются
+    record = _decide_round(r)
+    journal_write(record)
+    if room["private"]:
+        raffle_rooms.pop(room_id, None)
+    _touch_room(room_id)
 
-    if not tickets or not entry_amount:
-        # Нечего разыгрывать
-        r["finished"] = True
-        r["finished_at"] = datetime.now(timezone.utc)
-        await upsert_raffle_round(
-            {
-                "created_at": r["created_at"],
-                "finished_at": r["finished_at"],
-                "winner_id": None,
-                "total_bank": 0,
-            }
-        )
-        return
+    await _sync_until_durable()
+    await _settle_round(r, record)
 
-    # если участников меньше 2 — отменяем раунд и возвращаем всем деньги
-    if len(participants) < 2:
-        for uid, shares in r["user_bets"].items():
-            refund_amount = shares * entry_amount
-            if refund_amount > 0:
-                change_balance(uid, refund_amount)
-                try:
-                    await bot.send_message(
-                        uid,
-                        "⚠ Розыгрыш «Банкир» отменён: недостаточно участников.\n"
-                        f"Вам возвращено {format_rubles(refund_amount)} ₽.",
-                    )
-                except Exception:
-                    pass
+    if journal_size() > RAFFLE_JOURNAL_COMPACT_BYTES:
+        await rewrite_journal(_journal_snapshot)
 
-        r["finished"] = True
-        r["finished_at"] = datetime.now(timezone.utc)
-        r["winner_id"] = None
+
+async def _sync_until_durable() -> None:
+    """Решение уже принято в памяти — ждём, пока его событие будет на диске."""
+    while True:
+        try:
+            await journal_sync()
+            return
+        except JournalError:
+            await asyncio.sleep(_JOURNAL_RETRY_SECONDS)
+
+
+def _decide_round(r: BankerRound) -> Dict[str, Any]:
+    """
+    Итог раунда (без выплат) и его запись для журнала:
+    - нет долей — раунд просто закрывается
+    - участников < 2 — возврат ставок ("refund": true)
+    - иначе случайный победитель по билетам (tickets), вес = доли
+    """
+    r.status = RoundStatus.FINISHED
+    r.finished_at = clock.now()
+    record: Dict[str, Any] = {"t": "draw", "id": r.id, "winner": None, "refund": False}
+
+    if not r.tickets or not r.entry_amount:
+        # Нечего разыгрывать
+        return record
+
+    if len(r.participants) < 2:
+        # отменяем раунд и возвращаем всем деньги
+        record["refund"] = True
+        return record
+
+    r.winner_id = r.tickets.draw(clock.get_rng())
+    record["winner"] = r.winner_id
+    return record
+
+
+async def _settle_round(r: BankerRound, record: Dict[str, Any]) -> None:
+    """Выплаты, строка раунда в БД и рассылка по записанному итогу."""
+    participants = r.participants
+    entry_amount: int | None = r.entry_amount
+    total_bank: int = r.total_bank
+    winner_uid: int | None = record["winner"]
+
+    if winner_uid is None:
+        refunds: List[Tuple[int, str]] = []
+        if record["refund"]:
+            for uid, stake in r.stakes.items():
+                refund_amount = stake.shares * entry_amount
+                if refund_amount > 0:
+                    change_balance(uid, refund_amount)
+                    refunds.append(
+                        (
+                            uid,
+                            "⚠ Розыгрыш «Банкир» отменён: недостаточно участников.\n"
+                            f"Вам возвращено {format_rubles(refund_amount)} ₽.",
+                        )
+                    )
 
         await upsert_raffle_round(
             {
-                "created_at": r["created_at"],
-                "finished_at": r["finished_at"],
+                "id": r.id,
+                "room_id": r.room_id,
+                "created_at": r.created_at,
+                "finished_at": r.finished_at,
                 "winner_id": None,
                 "total_bank": 0,
             }
         )
+        if refunds:
+            broadcast_later(f"raffle_refund:{r.id}", refunds)
         return
 
-    # случайный победитель по «билетам»
-    winner_uid = random.choice(tickets)
     commission = total_bank // 100
     prize = total_bank - commission
 
-    # рассчитываем статистику по ставкам
-    user_bets: Dict[int, int] = r["user_bets"]
-    per_user_amount: Dict[int, int] = {
-        uid: shares * entry_amount for uid, shares in user_bets.items()
-    }
-
-    # прибыль/убыток по пользователям (используется для рейтинга)
-    # winner: prize - свой вклад
-    # остальные: - свой вклад
-    profit_by_user: Dict[int, int] = {}
-    for uid, put_amount in per_user_amount.items():
-        if uid == winner_uid:
-            profit_by_user[uid] = prize - put_amount
-        else:
-            profit_by_user[uid] = -put_amount
+    # статистика по ставкам уже посчитана в раунде
+    stakes: Dict[int, BankerStake] = r.stakes
+    winner_chance = _chance_percent(stakes[winner_uid].amount, total_bank)
 
     # выплаты
     change_balance(winner_uid, prize)
     change_balance(MAIN_ADMIN_ID, commission)
 
-    r["finished"] = True
-    r["finished_at"] = datetime.now(timezone.utc)
-    r["winner_id"] = winner_uid
-
     await upsert_raffle_round(
         {
-            "created_at": r["created_at"],
-            "finished_at": r["finished_at"],
+            "id": r.id,
+            "room_id": r.room_id,
+            "created_at": r.created_at,
+            "finished_at": r.finished_at,
             "winner_id": winner_uid,
             "total_bank": total_bank,
         }
     )
 
-    # сообщения участникам
-    for uid in participants:
-        put_amount = per_user_amount.get(uid, 0)
-        shares = user_bets.get(uid, 0)
-
-        if total_bank > 0 and put_amount > 0:
-            user_chance = round((put_amount / total_bank) * 100)
-        else:
-            user_chance = 0
+    # сообщения участникам — одной рассылкой
+    results: List[Tuple[int, str]] = []
+    for uid, stake in stakes.items():
+        put_amount = stake.amount
+        shares = stake.shares
 
-        if total_bank > 0:
-            winner_chance = round(
-                (per_user_amount.get(winner_uid, 0) / total_bank) * 100
-            )
-        else:
-            winner_chance = 0
+        user_chance = _chance_percent(put_amount, total_bank)
 
         if uid == winner_uid:
             result_text = (
@@ -457,53 +1166,45 @@ async def perform_raffle_draw():
             f"💼 Баланс: {format_rubles(get_balance(uid))} ₽"
         )
 
-        try:
-            await bot.send_message(uid, msg)
-        except Exception:
-            pass
+        results.append((uid, msg))
+
+    broadcast_later(f"raffle:{r.id}", results, lane=LANE_GAME)
 
 
-async def cancel_user_bets(uid: int) -> str:
+async def cancel_user_bets(uid: int, room_id: int) -> str:
     """
-    Отмена ставок пользователя в текущем раунде (если прошло не более 10 минут
-    с его последней ставки).
+    Отмена ставок пользователя в текущем раунде комнаты (если прошло не более
+    10 минут с его последней ставки).
     """
-    r = raffle_round
-    if not r or r.get("finished") or not r.get("tickets"):
+    room = raffle_rooms.get(room_id)
+    r = room["round"] if room else None
+    if not r or r.finished or not r.tickets:
         return "Сейчас нет активного розыгрыша с вашими ставками."
 
-    user_bets: Dict[int, int] = r["user_bets"]
-    last_bet_at: Dict[int, datetime] = r["user_last_bet_at"]
-
-    if uid not in user_bets or user_bets[uid] <= 0:
+    stake = r.stakes.get(uid)
+    if stake is None or stake.shares <= 0:
         return "У вас нет активных ставок в текущем раунде."
 
-    last_time = last_bet_at.get(uid)
+    last_time = stake.last_bet_at
     if not last_time:
         return "Не удалось определить время ставки. Отмена невозможна."
 
-    delta = datetime.now(timezone.utc) - last_time
+    delta = clock.now() - last_time
     if delta.total_seconds() > RAFFLE_CANCEL_WINDOW_SECONDS:
         return "Ставку можно отменить только в течение 10 минут после последней ставки."
 
-    shares = user_bets[uid]
-    entry_amount: int = r["entry_amount"]
-    refund_amount = shares * entry_amount
-
-    # возвращаем деньги
+    # убираем доли пользователя из раунда (в розыгрыш они уже не попадут),
+    # деньги возвращаем только после записи отмены на диск
+    refund_amount = _round_remove_stake(r, uid)
+    journal_write({"t": "cancel", "id": r.id, "uid": uid})
+    await _sync_until_durable()
     change_balance(uid, refund_amount)
 
-    # убираем билеты пользователя
-    r["tickets"] = [u for u in r["tickets"] if u != uid]
-    r["total_bank"] -= refund_amount
-    if r["total_bank"] < 0:
-        r["total_bank"] = 0
-
-    # убираем пользователя из структуры
-    del user_bets[uid]
-    last_bet_at.pop(uid, None)
-    if uid in r["participants"]:
-        r["participants"].remove(uid)
+    if room["private"] and not r.tickets:
+        # своя комната опустела — снова ждёт первую ставку не дольше TTL
+        _arm_private_room_expiry(room_id)
+
+    _touch_room(room_id)
 
     return (
         f"♻ Ваши ставки в текущем раунде отменены.\n"
@@ -0,0 +1,231 @@
+# app/services/raffle_journal.py
+"""
+Журнал событий раундов Банкира (write-ahead log) в файле.
+
+Каждое событие (открытие раунда, ставка, отмена, таймер, розыгрыш) —
+одна JSON-строка. Запись групповая: события копятся в буфере,
+один фоновый flush пишет всю пачку одним write + fsync, и все, кто
+ждал journal_sync(), получают подтверждение разом.
+
+Если запись не удалась, недописанный хвост файла обрезается, пачка
+остаётся в буфере и уйдёт следующим flush, а ждущие journal_sync()
+получают JournalError — событие ещё не надёжно.
+
+При старте журнал читается целиком (read_journal) — по нему
+raffle.py восстанавливает открытые раунды, а затем журнал
+переписывается компактно, только с живым состоянием (rewrite_journal).
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List
+
+from app.config import RAFFLE_JOURNAL_PATH
+
+_buf: List[str] = []
+_waiters: List[asyncio.Future] = []
+_flush_task: asyncio.Task | None = None
+_lock: asyncio.Lock | None = None
+_fd: int | None = None
+
+_journal_counters: Dict[str, Any] = {
+    "records": 0,
+    "commits": 0,
+    "fsync_total": 0.0,
+    "fsync_max": 0.0,
+    "errors": 0,
+    "rewrites": 0,
+}
+
+
+class JournalError(Exception):
+    """События не записаны на диск (ошибка write / fsync)."""
+
+
+def _open() -> int:
+    global _fd
+    if _fd is None:
+        folder = os.path.dirname(RAFFLE_JOURNAL_PATH)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        _fd = os.open(RAFFLE_JOURNAL_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    return _fd
+
+
+def _close() -> None:
+    global _fd
+    if _fd is not None:
+        try:
+            os.close(_fd)
+        except OSError:
+            pass
+        _fd = None
+
+
+def _write_sync(data: bytes) -> None:
+    fd = _open()
+    start = os.lseek(fd, 0, os.SEEK_END)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    except OSError:
+        # обрезаем то, что успело попасть в файл, — повтор пачки не задвоит события
+        try:
+            os.ftruncate(fd, start)
+        except OSError:
+            pass
+        _close()
+        raise
+
+
+def _kick() -> None:
+    global _flush_task, _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+def journal_write(record: Dict[str, Any]) -> None:
+    """Добавить событие в буфер. Надёжно записано — после journal_sync()."""
+    _buf.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    _journal_counters["records"] += 1
+    _kick()
+
+
+async def journal_sync() -> None:
+    """
+    Дождаться, пока всё записанное до этого момента окажется на диске.
+    JournalError — запись не удалась (события остались в буфере до
+    следующей попытки).
+    """
+    fut = asyncio.get_running_loop().create_future()
+    _waiters.append(fut)
+    _kick()
+    await fut
+
+
+async def _flush_loop() -> None:
+    """Пока есть что писать — пишем пачками (group commit)."""
+    while _buf or _waiters:
+        # дать соседним корутинам дописать свои события в эту же пачку
+        await asyncio.sleep(0)
+        async with _lock:
+            data = "".join(_buf)
+            waiters = _waiters[:]
+            _buf.clear()
+            _waiters.clear()
+
+            started = time.monotonic()
+            error = None
+            try:
+                if data:
+                    await asyncio.to_thread(_write_sync, data.encode("utf-8"))
+            except Exception as e:
+                error = e
+                _journal_counters["errors"] += 1
+                print("Ошибка записи журнала Банкира:", e)
+                # пачка не записана — вернуть её в начало буфера для повтора
+                _buf.insert(0, data)
+            spent = time.monotonic() - started
+
+        if error is not None:
+            # и тех, кто встал в очередь, пока шла запись: их события тоже
+            # в буфере, а после return этот цикл их уже не обслужит
+            waiters += _waiters
+            _waiters.clear()
+            for w in waiters:
+                if not w.done():
+                    w.set_exception(JournalError(str(error)))
+            # повтор — при следующем journal_write / journal_sync
+            return
+
+        _journal_counters["commits"] += 1
+        _journal_counters["fsync_total"] += spent
+        _journal_counters["fsync_max"] = max(_journal_counters["fsync_max"], spent)
+        for w in waiters:
+            if not w.done():
+                w.set_result(None)
+
+
+def read_journal() -> List[Dict[str, Any]]:
+    """Все события журнала по порядку. Оборванная последняя строка отбрасывается."""
+    if not os.path.exists(RAFFLE_JOURNAL_PATH):
+        return []
+    records: List[Dict[str, Any]] = []
+    with open(RAFFLE_JOURNAL_PATH, "r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break  # процесс упал посреди записи — дальше ничего нет
+    return records
+
+
+async def rewrite_journal(snapshot: Callable[[], List[Dict[str, Any]]]) -> None:
+    """
+    Заменить журнал компактной версией: snapshot() возвращает события,
+    из которых восстанавливается текущее состояние. Буфер при этом
+    не нужен — его события уже отражены в состоянии.
+    """
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+
+    async with _lock:
+        records = snapshot()
+        data = "".join(
+            json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records
+        )
+        pending = _buf[:]
+        waiters = _waiters[:]
+        _buf.clear()
+        _waiters.clear()
+
+        def _replace():
+            tmp = RAFFLE_JOURNAL_PATH + ".tmp"
+            folder = os.path.dirname(RAFFLE_JOURNAL_PATH)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            _close()
+            os.replace(tmp, RAFFLE_JOURNAL_PATH)
+
+        try:
+            await asyncio.to_thread(_replace)
+            _journal_counters["rewrites"] += 1
+        except Exception as e:
+            _journal_counters["errors"] += 1
+            print("Ошибка сжатия журнала Банкира:", e)
+            # старый журнал на месте — буфер допишется в него обычным flush
+            _buf[:0] = pending
+            _waiters[:0] = waiters
+            _kick()
+            return
+
+    for w in waiters:
+        if not w.done():
+            w.set_result(None)
+
+
+def journal_size() -> int:
+    try:
+        return os.path.getsize(RAFFLE_JOURNAL_PATH)
+    except OSError:
+        return 0
+
+
+def journal_stats() -> Dict[str, Any]:
+    commits = _journal_counters["commits"]
+    return {
+        "size": journal_size(),
+        "per_commit": (_journal_counters["records"] / commits) if commits else 0.0,
+        "fsync_avg": (_journal_counters["fsync_total"] / commits) if commits else 0.0,
+        **_journal_counters,
+    }
@@ -0,0 +1,367 @@
+# app/services/scheduler.py
+"""
+Планировщик дедлайнов на иерархическом колесе таймеров.
+
+Все отложенные действия бота (розыгрыши Банкира, автоотмена игр,
+таймауты очереди, TTL временных состояний, периодические сводки)
+живут в одном фоновом таске, без отдельного asyncio.sleep на каждое.
+
+- время дискретно: тик = SCHEDULER_TICK_SECONDS
+- _LEVELS уровней по 64 слота; уровень L покрывает 64**(L+1) тиков
+- вставка и отмена — O(1) (слот — dict key -> задача),
+  при переходе через границу уровня слот «осыпается» на уровень ниже
+- задача идентифицируется ключом (например "game_expire:15"),
+  выполняется обработчиком, зарегистрированным по виду (kind)
+- задачи с persist=True периодически сохраняются в БД
+  и восстанавливаются после перезапуска (restore_scheduled_jobs)
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from app.config import (
+    SCHEDULER_TICK_SECONDS,
+    SCHEDULER_PERSIST_INTERVAL_SECONDS,
+    SCHEDULER_ROLLUP_INTERVAL_SECONDS,
+)
+from app.db.scheduler import load_scheduled_jobs, save_scheduled_jobs
+
+_WHEEL_BITS = 6
+_WHEEL_SIZE = 1 << _WHEEL_BITS
+_WHEEL_MASK = _WHEEL_SIZE - 1
+_LEVELS = 4
+# дальше этого горизонта задача «паркуется» в последнем слоте верхнего уровня
+_MAX_SPAN = 1 << (_WHEEL_BITS * _LEVELS)
+
+# поля задачи (список, чтобы перекладывать между слотами без копирования)
+_DUE, _TICK, _KIND, _ARGS, _LEVEL, _SLOT, _PERSIST = range(7)
+
+# kind -> обработчик
+_handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+# key -> [due_ts, due_tick, kind, args, level, slot, persist]
+_jobs: Dict[str, list] = {}
+
+# _wheel[level][slot] -> {key: задача}
+_wheel: List[List[Dict[str, list]]] = [
+    [{} for _ in range(_WHEEL_SIZE)] for _ in range(_LEVELS)
+]
+
+# последний обработанный тик
+_current_tick: int = int(time.time() / SCHEDULER_TICK_SECONDS)
+
+# key -> интервал (сек) для периодических задач
+_periodic: Dict[str, float] = {}
+
+# изменения сохраняемых задач с последнего сброса в БД:
+# key -> (due_ts, kind, args) или None (удалить)
+_persist_dirty: Dict[str, tuple | None] = {}
+
+_wakeup: asyncio.Event | None = None
+_next_wake_tick: int = 0
+_task: asyncio.Task | None = None
+
+_stats: Dict[str, Any] = {
+    "scheduled": 0,
+    "cancelled": 0,
+    "fired": 0,
+    "late": 0,          # сработали позже дедлайна больше чем на тик
+    "late_total": 0.0,  # суммарное опоздание (сек)
+    "late_max": 0.0,
+    "errors": 0,
+}
+_fired_by_kind: Dict[str, int] = {}
+
+# сводки за последние интервалы: (время, сработало, опоздало, макс. опоздание)
+_rollups: Deque[tuple] = deque(maxlen=60)
+_rollup_prev: Dict[str, Any] = {"fired": 0, "late": 0, "late_max": 0.0}
+
+
+def register_handler(kind: str, handler: Callable[..., Awaitable[Any]]) -> None:
+    _handlers[kind] = handler
+
+
+# =====================================================
+#                  КОЛЕСО
+# =====================================================
+
+def _place(key: str, job: list, min_tick: int) -> None:
+    """Положить задачу в слот колеса (не раньше min_tick)."""
+    tick = max(job[_TICK], min_tick)
+    delta = tick - _current_tick
+    if delta >= _MAX_SPAN:
+        tick = _current_tick + _MAX_SPAN - 1
+        delta = _MAX_SPAN - 1
+
+    level = 0
+    while delta >= 1 << (_WHEEL_BITS * (level + 1)):
+        level += 1
+
+    slot = (tick >> (_WHEEL_BITS * level)) & _WHEEL_MASK
+    job[_LEVEL] = level
+    job[_SLOT] = slot
+    _wheel[level][slot][key] = job
+
+
+def _unplace(key: str, job: list) -> None:
+    _wheel[job[_LEVEL]][job[_SLOT]].pop(key, None)
+
+
+def _advance(tick: int) -> None:
+    """Обработать тик: осыпать верхние уровни и выполнить созревшие задачи."""
+    global _current_tick
+    _current_tick = tick
+
+    for level in range(_LEVELS - 1, 0, -1):
+        shift = _WHEEL_BITS * level
+        if tick & ((1 << shift) - 1):
+            continue
+        slot = (tick >> shift) & _WHEEL_MASK
+        bucket = _wheel[level][slot]
+        if bucket:
+            _wheel[level][slot] = {}
+            for key, job in bucket.items():
+                _place(key, job, tick)
+
+    slot = tick & _WHEEL_MASK
+    bucket = _wheel[0][slot]
+    if not bucket:
+        return
+    _wheel[0][slot] = {}
+
+    for key, job in bucket.items():
+        if job[_TICK] > tick:
+            # «припаркованная» дальняя задача — ещё не время
+            _place(key, job, tick + 1)
+            continue
+        del _jobs[key]
+        _fire(key, job)
+
+
+def _next_event_tick() -> int:
+    """Ближайший тик, на котором что-то может произойти."""
+    boundary = (_current_tick | _WHEEL_MASK) + 1
+    level0 = _wheel[0]
+    for tick in range(_current_tick + 1, boundary):
+        if level0[tick & _WHEEL_MASK]:
+            return tick
+    return boundary
+
+
+# =====================================================
+#                  API
+# =====================================================
+
+def schedule(
+    key: str, delay_seconds: float, kind: str, *args, persist: bool = False
+) -> None:
+    """
+    Запланировать (или перенести) задачу key через delay_seconds.
+    persist=True — задача переживёт перезапуск (аргументы должны быть JSON).
+    """
+    _schedule_at(key, time.time() + delay_seconds, kind, args, persist)
+
+
+def _schedule_at(key: str, due: float, kind: str, args: tuple, persist: bool) -> None:
+    old = _jobs.get(key)
+    if old is not None:
+        _unplace(key, old)
+
+    job = [due, math.ceil(due / SCHEDULER_TICK_SECONDS), kind, args, 0, 0, persist]
+    _jobs[key] = job
+    _place(key, job, _current_tick + 1)
+    _stats["scheduled"] += 1
+
+    if persist:
+        _persist_dirty[key] = (due, kind, args)
+    elif old is not None and old[_PERSIST]:
+        _persist_dirty[key] = None
+
+    # разбудить воркер, если новый дедлайн раньше текущего сна
+    if _wakeup is not None and job[_TICK] < _next_wake_tick:
+        _wakeup.set()
+
+
+def schedule_periodic(key: str, interval_seconds: float, kind: str, *args) -> None:
+    """Повторять задачу каждые interval_seconds (первый запуск — через интервал)."""
+    _periodic[key] = interval_seconds
+    schedule(key, interval_seconds, kind, *args)
+
+
+def cancel(key: str) -> bool:
+    """Отменить задачу (O(1))."""
+    _periodic.pop(key, None)
+    job = _jobs.pop(key, None)
+    if job is None:
+        return False
+    _unplace(key, job)
+    if job[_PERSIST]:
+        _persist_dirty[key] = None
+    _stats["cancelled"] += 1
+    return True
+
+
+def scheduled_due(key: str) -> float | None:
+    """Время срабатывания задачи (time.time()) или None, если её нет."""
+    job = _jobs.get(key)
+    return job[_DUE] if job is not None else None
+
+
+def pending_count() -> int:
+    return len(_jobs)
+
+
+def _fire(key: str, job: list) -> None:
+    due, kind, args = job[_DUE], job[_KIND], job[_ARGS]
+
+    late = max(0.0, time.time() - due)
+    _stats["fired"] += 1
+    _fired_by_kind[kind] = _fired_by_kind.get(kind, 0) + 1
+    if late > SCHEDULER_TICK_SECONDS:
+        _stats["late"] += 1
+        _stats["late_total"] += late
+        _stats["late_max"] = max(_stats["late_max"], late)
+
+    if job[_PERSIST]:
+        _persist_dirty[key] = None
+
+    interval = _periodic.get(key)
+    if interval is not None:
+        # следующий запуск от дедлайна, а не от факта — без дрейфа
+        _schedule_at(key, max(due + interval, time.time()), kind, args, job[_PERSIST])
+
+    asyncio.create_task(_run_job(key, kind, args))
+
+
+async def _run_job(key: str, kind: str, args: tuple) -> None:
+    handler = _handlers.get(kind)
+    if handler is None:
+        print(f"Планировщик: нет обработчика для {kind} ({key})")
+        return
+    try:
+        await handler(*args)
+    except Exception as e:
+        _stats["errors"] += 1
+        print(f"Ошибка в задаче планировщика {key}:", e)
+
+
+async def scheduler_worker():
+    """Фоновая задача: крутит колесо и выполняет задачи по мере наступления дедлайнов."""
+    global _wakeup, _next_wake_tick, _current_tick
+    _wakeup = asyncio.Event()
+
+    while True:
+        now_tick = int(time.time() / SCHEDULER_TICK_SECONDS)
+
+        if not _jobs:
+            # колесо пустое — догонять нечего
+            _current_tick = max(_current_tick, now_tick)
+        while _current_tick < now_tick:
+            _advance(_current_tick + 1)
+
+        _wakeup.clear()
+        if _jobs:
+            _next_wake_tick = _next_event_tick()
+            timeout = max(0.0, _next_wake_tick * SCHEDULER_TICK_SECONDS - time.time())
+        else:
+            _next_wake_tick = 1 << 62
+            timeout = None
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+# =====================================================
+#                  СОХРАНЕНИЕ В БД
+# =====================================================
+
+async def flush_scheduled_jobs() -> None:
+    """Сбросить накопленные изменения сохраняемых задач в БД одним батчем."""
+    if not _persist_dirty:
+        return
+    dirty = dict(_persist_dirty)
+    _persist_dirty.clear()
+
+    upserts = []
+    deletes = []
+    for key, value in dirty.items():
+        if value is None:
+            deletes.append(key)
+        else:
+            due, kind, args = value
+            upserts.append((key, kind, due, json.dumps(list(args))))
+
+    try:
+        await save_scheduled_jobs(upserts, deletes)
+    except Exception as e:
+        # не потерять изменения — вернуть то, что не перезаписано новыми
+        for key, value in dirty.items():
+            _persist_dirty.setdefault(key, value)
+        print("Ошибка сохранения задач планировщика:", e)
+
+
+async def restore_scheduled_jobs() -> int:
+    """Загрузить сохранённые задачи после перезапуска. Просроченные сработают сразу."""
+    rows = await load_scheduled_jobs()
+    for row in rows:
+        if row["key"] in _jobs:
+            continue
+        _schedule_at(
+            row["key"], row["due_at"], row["kind"], tuple(json.loads(row["args"])), True
+        )
+    # только что загружены из БД — перезаписывать нечего
+    for row in rows:
+        _persist_dirty.pop(row["key"], None)
+    return len(rows)
+
+
+# =====================================================
+#                  МЕТРИКИ
+# =====================================================
+
+async def _rollup() -> None:
+    """Периодическая сводка: сколько задач сработало и опоздало за интервал."""
+    fired = _stats["fired"] - _rollup_prev["fired"]
+    late = _stats["late"] - _rollup_prev["late"]
+    _rollups.append((time.time(), fired, late, _stats["late_max"]))
+    _rollup_prev["fired"] = _stats["fired"]
+    _rollup_prev["late"] = _stats["late"]
+
+
+register_handler("scheduler_flush", flush_scheduled_jobs)
+register_handler("scheduler_rollup", _rollup)
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    """Очередь задач, срабатывания и опоздания."""
+    by_level = [sum(len(slot) for slot in level) for level in _wheel]
+    late = _stats["late"]
+    last_fired, last_late = (_rollups[-1][1], _rollups[-1][2]) if _rollups else (0, 0)
+    return {
+        "pending": len(_jobs),
+        "persistent": sum(1 for job in _jobs.values() if job[_PERSIST]),
+        "periodic": len(_periodic),
+        "by_level": by_level,
+        "late_avg": (_stats["late_total"] / late) if late else 0.0,
+        "last_interval_fired": last_fired,
+        "last_interval_late": last_late,
+        "fired_by_kind": dict(_fired_by_kind),
+        **_stats,
+    }
+
+
+def start_scheduler() -> None:
+    global _task
+    if _task is None:
+        schedule_periodic(
+            "scheduler_flush", SCHEDULER_PERSIST_INTERVAL_SECONDS, "scheduler_flush"
+        )
+        schedule_periodic(
+            "scheduler_rollup", SCHEDULER_ROLLUP_INTERVAL_SECONDS, "scheduler_rollup"
+        )
+        _task = asyncio.create_task(scheduler_worker())
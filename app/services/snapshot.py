@@ -0,0 +1,369 @@
+# app/services/snapshot.py
+"""
+Снимок живого состояния в памяти для тёплого перезапуска.
+
+Что в снимке:
+- открытые и идущие игры в кости (games), очередь быстрой игры
+- счётчики next_game_id / next_raffle_id
+- незавершённый ввод пользователей (pending_* и temp_*)
+
+Формат — заголовок (struct) + zlib(JSON). Словари ввода хранятся
+списками пар [uid, значение]: ключи JSON — только строки. Пишется
+во временный файл с fsync и атомарно подменяет старый.
+
+- периодически (STATE_SNAPSHOT_INTERVAL_SECONDS) — «грязный» снимок
+- при остановке бота — идущие партии доигрываются (не дольше
+  GAME_SHUTDOWN_DRAIN_SECONDS), затем «чистый» снимок
+- при старте (до polling) снимок читается и сразу удаляется, чтобы
+  не применить его дважды. Игры и очередь восстанавливаются только
+  из чистого снимка: после падения балансы в БД могли уйти дальше снимка,
+  и повторное открытие игры создало бы деньги из воздуха
+- после падения (снимок грязный или его нет) ставки по недоигранным
+  играм возвращаются по строкам БД с finished = 0: отменённые
+  и истёкшие игры из БД удаляются, так что такая строка — списанная
+  и не выплаченная ставка. Так же — ставки из очереди быстрой игры
+  (таблица quick_queue, см. services/matchmaking.py)
+- id продолжаются с MAX(id) из БД, даже если снимка нет
+
+Раунды Банкира сюда не входят — у них свой журнал (raffle_journal.py).
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from app.config import (
+    DICE_OPEN_GAME_TTL_SECONDS,
+    GAME_SHUTDOWN_DRAIN_SECONDS,
+    STATE_SNAPSHOT_PATH,
+    STATE_SNAPSHOT_INTERVAL_SECONDS,
+)
+from app.db.games import (
+    delete_game,
+    delete_queue_entry,
+    get_max_game_id,
+    get_queue_entries,
+    get_unfinished_games,
+)
+from app.db.pool import db_scope
+from app.db.raffle import get_max_raffle_round_id
+from app.models import DiceGame
+from app.services import games as games_mod
+from app.services import raffle as raffle_mod
+from app.services.balances import (
+    change_balance,
+    pending_withdraw_step,
+    temp_withdraw,
+    pending_transfer_step,
+    temp_transfer,
+)
+from app.services.broadcast import broadcast_later
+from app.services.game_lifecycle import restore_open_game, stop_games
+from app.services.games import games, pending_bet_input
+from app.services.matchmaking import (
+    pending_quick_bet_input,
+    restore_waiting,
+    waiting_entries,
+)
+from app.services.raffle import pending_raffle_bet_input, raffle_rooms
+from app.services.scheduler import register_handler, schedule_periodic, cancel
+from app.services.state_ttl import arm_state_ttl
+from app.utils.formatters import format_rubles
+
+_MAGIC = b"DSNP"
+_VERSION = 2
+# magic, версия, чистый ли снимок, время записи, crc32 тела
+_HEADER = struct.Struct("<4sBBdI")
+
+# имя -> словарь незавершённого ввода (uid -> значение)
+_PENDING: Dict[str, Dict[int, Any]] = {
+    "bet": pending_bet_input,
+    "quick_bet": pending_quick_bet_input,
+    "raffle_bet": pending_raffle_bet_input,
+    "withdraw_step": pending_withdraw_step,
+    "withdraw": temp_withdraw,
+    "transfer_step": pending_transfer_step,
+    "transfer": temp_transfer,
+}
+
+_snapshot_counters: Dict[str, Any] = {
+    "saved": 0,
+    "bytes": 0,
+    "save_max": 0.0,
+    "errors": 0,
+    "restored_games": 0,
+    "refunded_games": 0,
+    "refunded_unfinished": 0,
+    "refunded_waiting": 0,
+    "interrupted_games": 0,
+    "restored_waiting": 0,
+    "restored_inputs": 0,
+    "load_time": 0.0,
+}
+
+
+# =====================================================
+#                  ЗАПИСЬ
+# =====================================================
+
+def _collect() -> Dict[str, Any]:
+    """Состояние в простых типах JSON."""
+    game_rows = []
+    for g in games.values():
+        if g.finished:
+            continue
+        game_rows.append(
+            (
+                g.id,
+                g.creator_id,
+                g.opponent_id or 0,
+                g.bet,
+                g.created_at.timestamp(),
+            )
+        )
+
+    return {
+        "next_game_id": games_mod.next_game_id,
+        "next_raffle_id": raffle_mod.next_raffle_id,
+        "games": game_rows,
+        "waiting": waiting_entries(),
+        "pending": {name: list(d.items()) for name, d in _PENDING.items()},
+    }
+
+
+def _encode(state: Dict[str, Any], clean: bool) -> bytes:
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+    body = zlib.compress(raw.encode("utf-8"), 6)
+    return _HEADER.pack(_MAGIC, _VERSION, int(clean), time.time(), zlib.crc32(body)) + body
+
+
+def _write_file(data: bytes) -> None:
+    folder = os.path.dirname(STATE_SNAPSHOT_PATH)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = STATE_SNAPSHOT_PATH + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, STATE_SNAPSHOT_PATH)
+
+
+async def save_snapshot(clean: bool = False) -> None:
+    """Снять состояние (синхронно, без await) и записать файл в потоке."""
+    started = time.monotonic()
+    try:
+        data = _encode(_collect(), clean)
+        await asyncio.to_thread(_write_file, data)
+    except Exception as e:
+        _snapshot_counters["errors"] += 1
+        print("Ошибка записи снимка состояния:", e)
+        return
+
+    spent = time.monotonic() - started
+    _snapshot_counters["saved"] += 1
+    _snapshot_counters["bytes"] = len(data)
+    _snapshot_counters["save_max"] = max(_snapshot_counters["save_max"], spent)
+
+
+async def _periodic_snapshot() -> None:
+    await save_snapshot(clean=False)
+
+
+register_handler("state_snapshot", _periodic_snapshot)
+
+
+def start_snapshots() -> None:
+    schedule_periodic("state_snapshot", STATE_SNAPSHOT_INTERVAL_SECONDS, "state_snapshot")
+
+
+async def shutdown_snapshot() -> None:
+    """
+    Чистый снимок при остановке; периодический больше не перезапишет его.
+    Сначала доигрываем идущие партии: снимок не должен поймать игру
+    между выплатой и сохранением в БД.
+    """
+    cancel("state_snapshot")
+    _snapshot_counters["interrupted_games"] = await stop_games(GAME_SHUTDOWN_DRAIN_SECONDS)
+    await save_snapshot(clean=True)
+
+
+# =====================================================
+#                  ВОССТАНОВЛЕНИЕ
+# =====================================================
+
+def _read_file() -> tuple[bool, float, Dict[str, Any]] | None:
+    try:
+        with open(STATE_SNAPSHOT_PATH, "rb") as fh:
+            data = fh.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, clean, saved_at, crc = _HEADER.unpack_from(data)
+    body = data[_HEADER.size:]
+    if magic != _MAGIC or version != _VERSION or zlib.crc32(body) != crc:
+        print("Снимок состояния повреждён или другой версии — пропускаем")
+        return None
+    return bool(clean), saved_at, json.loads(zlib.decompress(body).decode("utf-8"))
+
+
+def _restart_refund_text(gid: int, bet: int) -> str:
+    return (
+        f"♻️ Игра №{gid} прервана перезапуском бота.\n"
+        f"Вам возвращено {format_rubles(bet)} ₽."
+    )
+
+
+async def _restore_games(rows) -> list:
+    """Открытые игры — обратно в лобби; прерванные на полпути — возврат ставок."""
+    refunds = []
+    for gid, creator_id, opponent_id, bet, created_ts in rows:
+        if not opponent_id:
+            g = DiceGame(
+                gid, creator_id, bet, created_at=datetime.fromtimestamp(created_ts, timezone.utc)
+            )
+            age = time.time() - created_ts
+            restore_open_game(g, DICE_OPEN_GAME_TTL_SECONDS - age)
+            _snapshot_counters["restored_games"] += 1
+            continue
+
+        # броски не досмотрены — игра не состоялась, обоим возвращаем ставку
+        text = _restart_refund_text(gid, bet)
+        for uid in (creator_id, opponent_id):
+            change_balance(uid, bet)
+            refunds.append((uid, text))
+        _snapshot_counters["refunded_games"] += 1
+        await delete_game(gid)
+    return refunds
+
+
+async def _refund_unfinished(since: datetime | None) -> list:
+    """
+    После падения: ставки по строкам БД с finished = 0 (игры, созданные
+    после since; None — все) возвращаются создателю и сопернику, строки
+    удаляются. Возврат и удаление пишутся одной транзакцией (db_scope).
+    """
+    refunds = []
+    for row in await get_unfinished_games(since):
+        gid, bet = row["id"], row["bet"]
+        text = _restart_refund_text(gid, bet)
+        for uid in (row["creator_id"], row["opponent_id"]):
+            if uid:
+                change_balance(uid, bet)
+                refunds.append((uid, text))
+        await delete_game(gid)
+        _snapshot_counters["refunded_unfinished"] += 1
+    return refunds
+
+
+async def _refund_queue() -> list:
+    """После падения: ставки из очереди быстрой игры (quick_queue) — обратно."""
+    refunds = []
+    for row in await get_queue_entries():
+        uid, bet = row["user_id"], row["bet"]
+        change_balance(uid, bet)
+        await delete_queue_entry(uid)
+        refunds.append(
+            (
+                uid,
+                "♻️ Быстрая игра прервана перезапуском бота.\n"
+                f"Вам возвращено {format_rubles(bet)} ₽.",
+            )
+        )
+        _snapshot_counters["refunded_waiting"] += 1
+    return refunds
+
+
+async def restore_state() -> None:
+    """
+    Вызывается при старте до polling (после восстановления раундов Банкира):
+    id из БД и снимка, затем игры, очередь и незавершённый ввод.
+    """
+    started = time.monotonic()
+
+    try:
+        snap = await asyncio.to_thread(_read_file)
+    except Exception as e:
+        print("Ошибка чтения снимка состояния:", e)
+        snap = None
+
+    max_game_id = await get_max_game_id()
+    max_raffle_id = await get_max_raffle_round_id()
+    state = snap[2] if snap else {}
+
+    games_mod.next_game_id = max(
+        games_mod.next_game_id, max_game_id + 1, state.get("next_game_id", 1)
+    )
+    raffle_mod.next_raffle_id = max(
+        raffle_mod.next_raffle_id, max_raffle_id + 1, state.get("next_raffle_id", 1)
+    )
+
+    if snap is None or not snap[0]:
+        # падение: живые на тот момент игры созданы не раньше чем за TTL
+        # до последнего снимка. Без снимка время падения неизвестно
+        # (бот мог лежать дольше TTL) — возвращаем по всем строкам
+        since = None
+        if snap is not None:
+            since = datetime.fromtimestamp(snap[1], timezone.utc) - timedelta(
+                seconds=DICE_OPEN_GAME_TTL_SECONDS
+            )
+        async with db_scope():
+            unfinished = await _refund_unfinished(since)
+            unfinished += await _refund_queue()
+        if unfinished:
+            print(
+                f"♻️ После падения возвращены ставки: игр {_snapshot_counters['refunded_unfinished']}, "
+                f"из очереди {_snapshot_counters['refunded_waiting']}"
+            )
+            broadcast_later("restart_refund", unfinished)
+    if snap is None:
+        return
+
+    clean, saved_at, state = snap
+    refunds = []
+    if clean:
+        refunds = await _restore_games(state["games"])
+        for uid, bet, waited in state["waiting"]:
+            restore_waiting(uid, bet, waited + time.time() - saved_at)
+            _snapshot_counters["restored_waiting"] += 1
+    # грязный снимок: очередь уже возвращена по quick_queue (_refund_queue)
+
+    restored = set()
+    for name, saved in state["pending"].items():
+        target = _PENDING.get(name)
+        if target is None:
+            continue
+        for uid, value in saved:
+            if name == "raffle_bet" and value not in raffle_rooms:
+                continue
+            target[uid] = value
+            restored.add(uid)
+    for uid in restored:
+        arm_state_ttl(uid)
+    _snapshot_counters["restored_inputs"] = len(restored)
+
+    try:
+        os.remove(STATE_SNAPSHOT_PATH)
+    except OSError:
+        pass
+
+    _snapshot_counters["load_time"] = time.monotonic() - started
+    print(
+        f"♻️ Снимок состояния: игр {_snapshot_counters['restored_games']}, "
+        f"возвратов {_snapshot_counters['refunded_games']}, "
+        f"в очереди {_snapshot_counters['restored_waiting']}, "
+        f"ввод {len(restored)} польз. за {_snapshot_counters['load_time'] * 1000:.0f} мс"
+    )
+
+    if refunds:
+        broadcast_later("restart_refund", refunds)
+
+
+def snapshot_stats() -> Dict[str, Any]:
+    return dict(_snapshot_counters)
@@ -10,9 +10,6 @@
 from app.services.balances import (
     pending_transfer_step,
     temp_transfer,
-)
-
-from app.handlers.balance import (
     pending_withdraw_step,
     temp_withdraw,
 )
@@ -25,6 +22,13 @@ from app.services.raffle import (
     pending_raffle_bet_input,
 )
 
+from app.services.matchmaking import (
+    pending_quick_bet_input,
+)
+
+from app.services.metrics import register_gauge
+from app.services.scheduler import register_handler
+
 
 def reset_user_state(uid: int):
     """Полная очистка временных состояний пользователя."""
@@ -39,7 +43,29 @@ def reset_user_state(uid: int):
 
     # --- игры (ставка) ---
     pending_bet_input.pop(uid, None)
+    pending_quick_bet_input.pop(uid, None)
 
     # --- банкир ---
     pending_raffle_bet_input.pop(uid, None)
 
+
+async def _expire_user_state(uid: int):
+    """Дедлайн из arm_state_ttl: пользователь бросил ввод на полпути."""
+    reset_user_state(uid)
+
+
+register_handler("state_ttl", _expire_user_state)
+
+
+def _pending_gauge():
+    return [
+        ({"kind": "transfer"}, len(pending_transfer_step)),
+        ({"kind": "withdraw"}, len(pending_withdraw_step)),
+        ({"kind": "dice_bet"}, len(pending_bet_input)),
+        ({"kind": "quick_bet"}, len(pending_quick_bet_input)),
+        ({"kind": "banker_bet"}, len(pending_raffle_bet_input)),
+    ]
+
+
+register_gauge("bot_pending_states", "Пользователи с незавершённым вводом", _pending_gauge)
+
@@ -0,0 +1,15 @@
+# app/services/state_ttl.py
+"""
+TTL временных состояний ввода (ставка, сумма вывода, получатель перевода).
+
+Каждый шаг ввода переносит дедлайн пользователя; если он так и не
+дописал ввод — по дедлайну состояние сбрасывается (см. state_reset.py).
+Отдельный модуль, чтобы его можно было импортировать из хендлеров
+без циклического импорта через state_reset.
+"""
+from app.config import STATE_INPUT_TTL_SECONDS
+from app.services.scheduler import schedule
+
+
+def arm_state_ttl(uid: int) -> None:
+    schedule(f"state_ttl:{uid}", STATE_INPUT_TTL_SECONDS, "state_ttl", uid)
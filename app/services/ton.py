@@ -1,8 +1,9 @@
 # app/services/ton.py
 import asyncio
 import re
+import time
 from datetime import datetime, timezone
-from typing import Dict, Set
+from typing import Dict, List, Set, Tuple
 
 import aiohttp
 
@@ -14,8 +15,9 @@ from app.config import (
 )
 from app.db.deposits import add_ton_deposit
 from app.services.balances import change_balance, get_balance
+from app.services.broadcast import broadcast_later
+from app.services.metrics import Counter, register_gauge
 from app.utils.formatters import format_rubles
-from app.bot import bot
 
 
 # Кэш курса TON→RUB
@@ -27,6 +29,32 @@ _ton_rate_cache: Dict[str, float | datetime] = {
 # Список обработанных транзакций
 processed_ton_tx: Set[str] = set()
 
+# запуск воркера и последний успешный опрос tonapi (time.time());
+# 0 — воркер не запущен / ещё не опрашивал
+_ton_worker: Dict[str, float] = {"started": 0.0, "last_poll": 0.0}
+ton_worker_errors = Counter("bot_ton_worker_errors_total", "Ошибки опроса в ton_deposit_worker")
+_ton_task: asyncio.Task | None = None
+
+
+def _ton_worker_lag():
+    # до первого успешного опроса — время с запуска воркера:
+    # если tonapi недоступен с самого старта, отставание всё равно растёт
+    last = _ton_worker["last_poll"] or _ton_worker["started"]
+    return time.time() - last if last else []
+
+
+register_gauge(
+    "bot_ton_worker_lag_seconds",
+    "Сколько секунд назад ton_deposit_worker последний раз успешно опросил tonapi "
+    "(до первого опроса — с запуска воркера)",
+    _ton_worker_lag,
+)
+register_gauge(
+    "bot_cache_entries",
+    "Записей в кэшах в памяти",
+    lambda: [({"cache": "ton_tx"}, len(processed_ton_tx))],
+)
+
 
 async def get_ton_rub_rate() -> float:
     """Возвращает кэшированный курс TON → RUB."""
@@ -57,6 +85,7 @@ async def ton_deposit_worker():
         print("TON_WALLET_ADDRESS не указан — пополнения отключены.")
         return
 
+    _ton_worker["started"] = time.time()
     url = (
         f"https://tonapi.io/v2/blockchain/accounts/"
         f"{TON_WALLET_ADDRESS}/transactions?limit=50"
@@ -69,6 +98,7 @@ async def ton_deposit_worker():
                     data = await resp.json()
 
             tx_list = data.get("transactions") or data.get("data") or []
+            notifications: List[Tuple[int, str]] = []
 
             for tx in tx_list:
                 tx_hash = tx.get("hash") or tx.get("transaction_id") or ""
@@ -120,9 +150,9 @@ async def ton_deposit_worker():
                 # Запись в БД
                 await add_ton_deposit(tx_hash, user_id, ton_amount, coins, comment)
 
-                # Уведомления
-                try:
-                    await bot.send_message(
+                # Уведомления (уйдут одной рассылкой после разбора пачки)
+                notifications.append(
+                    (
                         user_id,
                         "💎 <b>Пополнение через TON успешно!</b>\n\n"
                         f"Получено: {ton_amount:.4f} TON\n"
@@ -130,11 +160,9 @@ async def ton_deposit_worker():
                         f"Зачислено: {format_rubles(coins)} ₽\n"
                         f"Текущий баланс: {format_rubles(get_balance(user_id))} ₽",
                     )
-                except:
-                    pass
-
-                try:
-                    await bot.send_message(
+                )
+                notifications.append(
+                    (
                         MAIN_ADMIN_ID,
                         "💎 <b>Новое пополнение TON</b>\n"
                         f"User ID: {user_id}\n"
@@ -142,10 +170,35 @@ async def ton_deposit_worker():
                         f"TON: {ton_amount:.4f}\n"
                         f"₽: {format_rubles(coins)}",
                     )
-                except:
-                    pass
+                )
+
+            if notifications:
+                # в фоне — чтобы пачка уведомлений не задерживала следующий опрос
+                broadcast_later("ton_deposits", notifications)
+
+            _ton_worker["last_poll"] = time.time()
 
         except Exception as e:
+            ton_worker_errors.inc()
             print("Ошибка в ton_deposit_worker:", e)
 
         await asyncio.sleep(20)
+
+
+def start_ton_worker() -> None:
+    """Запустить опрос пополнений в фоне (ссылка на задачу хранится здесь)."""
+    global _ton_task
+    if _ton_task is None or _ton_task.done():
+        _ton_task = asyncio.create_task(ton_deposit_worker())
+
+
+async def stop_ton_worker() -> None:
+    global _ton_task
+    if _ton_task is None:
+        return
+    _ton_task.cancel()
+    try:
+        await _ton_task
+    except asyncio.CancelledError:
+        pass
+    _ton_task = None
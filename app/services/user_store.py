@@ -0,0 +1,323 @@
+# app/services/user_store.py
+"""
+Компактное хранилище пользователей в памяти: баланс и username.
+
+Вместо двух dict (по ~100+ байт на пользователя в каждом: ключ-int,
+значение-int/str, ячейка хеш-таблицы) — плоские массивы:
+
+- строка пользователя: _uids / _balances (array('q')),
+  _name_off / _name_len — где лежит username в общем буфере
+- username — UTF-8 байты в одном bytearray (offset-кодирование);
+  при смене имени старые байты становятся «мусором», буфер
+  уплотняется, когда мусора больше половины
+- индекс uid -> строка: открытая адресация с линейным пробированием
+  по array('i') (номер строки или -1), фибоначчиево хеширование,
+  заполнение не выше 2/3
+
+Удаления нет — пользователи только добавляются (как и раньше в dict).
+Для старого кода есть словареподобные представления balances / usernames.
+"""
+from array import array
+from collections.abc import Mapping
+from typing import Iterator, Tuple
+
+_EMPTY = -1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class UserStore:
+    __slots__ = (
+        "_uids",
+        "_balances",
+        "_name_off",
+        "_name_len",
+        "_names",
+        "_garbage",
+        "_table",
+        "_bits",
+        "balances",
+        "usernames",
+    )
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._uids = array("q")
+        self._balances = array("q")
+        self._name_off = array("i")      # -1 — username нет
+        self._name_len = array("H")
+        self._names = bytearray()
+        self._garbage = 0                # байт старых имён в _names
+        bits = max(4, (capacity * 3 // 2).bit_length())
+        self._bits = bits
+        self._table = array("i", [_EMPTY]) * (1 << bits)
+        self.balances = BalanceView(self)
+        self.usernames = UsernameView(self)
+
+    def __len__(self) -> int:
+        return len(self._uids)
+
+    # ---------- индекс ----------
+    # пробирование написано прямо в методах: на горячем пути
+    # (get_balance / change_balance) лишний вызов функции заметен
+
+    def find(self, uid: int) -> int:
+        """Номер строки пользователя или -1."""
+        table = self._table
+        uids = self._uids
+        mask = len(table) - 1
+        i = ((uid * _GOLDEN) & _MASK64) >> (64 - self._bits)
+        while True:
+            row = table[i]
+            if row == _EMPTY or uids[row] == uid:
+                return row
+            i = (i + 1) & mask
+
+    def _rebuild_index(self, bits: int) -> None:
+        table = array("i", [_EMPTY]) * (1 << bits)
+        mask = len(table) - 1
+        shift = 64 - bits
+        for row, uid in enumerate(self._uids):
+            i = ((uid * _GOLDEN) & _MASK64) >> shift
+            while table[i] != _EMPTY:
+                i = (i + 1) & mask
+            table[i] = row
+        self._table = table
+        self._bits = bits
+
+    def row(self, uid: int) -> int:
+        """Строка пользователя; новая (баланс 0, без имени), если её не было."""
+        table = self._table
+        uids = self._uids
+        mask = len(table) - 1
+        i = ((uid * _GOLDEN) & _MASK64) >> (64 - self._bits)
+        while True:
+            row = table[i]
+            if row == _EMPTY:
+                break
+            if uids[row] == uid:
+                return row
+            i = (i + 1) & mask
+
+        row = len(uids)
+        uids.append(uid)
+        self._balances.append(0)
+        self._name_off.append(-1)
+        self._name_len.append(0)
+        if (row + 1) * 3 > len(table) * 2:
+            self._rebuild_index(self._bits + 1)
+        else:
+            table[i] = row
+        return row
+
+    def load(self, rows) -> None:
+        """
+        Массовая загрузка при старте: [(uid, username, balance), ...]
+        с уникальными uid (первичный ключ users).
+        В пустое хранилище строки дописываются подряд, а индекс строится
+        один раз в конце; в непустое — по одной, как обычно.
+        """
+        if len(self._uids):
+            for uid, username, balance in rows:
+                self.set_balance(uid, balance)
+                self.set_username(uid, username)
+            return
+
+        uids, balances = self._uids, self._balances
+        offs, lens, names = self._name_off, self._name_len, self._names
+        for uid, username, balance in rows:
+            uids.append(uid)
+            balances.append(balance)
+            if username:
+                data = username.encode()
+                offs.append(len(names))
+                lens.append(len(data))
+                names += data
+            else:
+                offs.append(-1)
+                lens.append(0)
+        self._rebuild_index(max(self._bits, (len(uids) * 3 // 2).bit_length()))
+
+    # ---------- баланс ----------
+
+    def get_balance(self, uid: int) -> int:
+        table = self._table
+        uids = self._uids
+        mask = len(table) - 1
+        i = ((uid * _GOLDEN) & _MASK64) >> (64 - self._bits)
+        while True:
+            row = table[i]
+            if row == _EMPTY:
+                return 0
+            if uids[row] == uid:
+                return self._balances[row]
+            i = (i + 1) & mask
+
+    def set_balance(self, uid: int, amount: int) -> None:
+        self._balances[self.row(uid)] = amount
+
+    def add_balance(self, uid: int, delta: int) -> int:
+        """Изменить баланс на delta, вернуть новый."""
+        row = self.row(uid)
+        value = self._balances[row] + delta
+        self._balances[row] = value
+        return value
+
+    # ---------- username ----------
+
+    def get_username(self, uid: int) -> str | None:
+        row = self.find(uid)
+        if row == _EMPTY:
+            return None
+        return self._name_at(row)
+
+    def _name_at(self, row: int) -> str | None:
+        off = self._name_off[row]
+        if off < 0:
+            return None
+        return self._names[off:off + self._name_len[row]].decode()
+
+    def set_username(self, uid: int, username: str | None) -> None:
+        row = self.row(uid)
+        old_off = self._name_off[row]
+        old_len = self._name_len[row]
+
+        if username is None:
+            if old_off >= 0:
+                self._garbage += old_len
+            self._name_off[row] = -1
+            self._name_len[row] = 0
+            return
+
+        data = username.encode()
+        if old_off >= 0 and self._names[old_off:old_off + old_len] == data:
+            return
+        if old_off >= 0 and len(data) <= old_len:
+            # короче или такой же длины — пишем на место старого
+            self._names[old_off:old_off + len(data)] = data
+            self._garbage += old_len - len(data)
+        else:
+            if old_off >= 0:
+                self._garbage += old_len
+            self._name_off[row] = len(self._names)
+            self._names += data
+        self._name_len[row] = len(data)
+
+        if self._garbage > 4096 and self._garbage * 2 > len(self._names):
+            self._compact_names()
+
+    def _compact_names(self) -> None:
+        names = bytearray()
+        offs = self._name_off
+        lens = self._name_len
+        old = self._names
+        for row in range(len(offs)):
+            off = offs[row]
+            if off >= 0:
+                offs[row] = len(names)
+                names += old[off:off + lens[row]]
+        self._names = names
+        self._garbage = 0
+
+    def find_username(self, username: str) -> int | None:
+        """
+        uid по username без учёта регистра (полный проход, как раньше по dict).
+        Username в Telegram — только ASCII, поэтому хватает bytes.lower().
+        """
+        target = username.lower().encode()
+        size = len(target)
+        names = self._names
+        offs = self._name_off
+        lens = self._name_len
+        for row in range(len(offs)):
+            # сначала сравнение длины — декодировать почти ничего не нужно
+            if lens[row] == size and offs[row] >= 0:
+                off = offs[row]
+                if names[off:off + size].lower() == target:
+                    return self._uids[row]
+        return None
+
+    # ---------- обход и память ----------
+
+    def uids(self) -> Iterator[int]:
+        return iter(self._uids)
+
+    def memory_bytes(self) -> int:
+        """Сколько занимают массивы и буфер имён (без служебных заголовков)."""
+        total = len(self._names) + len(self._table) * self._table.itemsize
+        for arr in (self._uids, self._balances, self._name_off, self._name_len):
+            total += len(arr) * arr.itemsize
+        return total
+
+
+class BalanceView(Mapping):
+    """user_balances как словарь uid -> баланс (для старого кода и init_db)."""
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: UserStore) -> None:
+        self._store = store
+
+    def __getitem__(self, uid: int) -> int:
+        row = self._store.find(uid)
+        if row == _EMPTY:
+            raise KeyError(uid)
+        return self._store._balances[row]
+
+    def __setitem__(self, uid: int, amount: int) -> None:
+        self._store.set_balance(uid, amount)
+
+    def __contains__(self, uid) -> bool:
+        return self._store.find(uid) != _EMPTY
+
+    def get(self, uid: int, default=None):
+        row = self._store.find(uid)
+        return self._store._balances[row] if row != _EMPTY else default
+
+    def __iter__(self) -> Iterator[int]:
+        return self._store.uids()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._store._uids, self._store._balances)
+
+
+class UsernameView(Mapping):
+    """user_usernames как словарь uid -> username (только пользователи с именем)."""
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: UserStore) -> None:
+        self._store = store
+
+    def __getitem__(self, uid: int) -> str:
+        name = self._store.get_username(uid)
+        if name is None:
+            raise KeyError(uid)
+        return name
+
+    def __setitem__(self, uid: int, username: str | None) -> None:
+        self._store.set_username(uid, username)
+
+    def __contains__(self, uid) -> bool:
+        return self._store.get_username(uid) is not None
+
+    def get(self, uid: int, default=None):
+        name = self._store.get_username(uid)
+        return name if name is not None else default
+
+    def __iter__(self) -> Iterator[int]:
+        store = self._store
+        return (uid for row, uid in enumerate(store._uids) if store._name_off[row] >= 0)
+
+    def __len__(self) -> int:
+        return sum(1 for off in self._store._name_off if off >= 0)
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        store = self._store
+        return (
+            (uid, store._name_at(row))
+            for row, uid in enumerate(store._uids)
+            if store._name_off[row] >= 0
+        )
@@ -7,92 +7,137 @@ from aiogram.types import (
 )
 
 
+# Все клавиатуры ниже статичные: создаются один раз при импорте,
+# функции просто возвращают готовый объект.
+
+
 # ============================
 #   ГЛАВНОЕ НИЖНЕЕ МЕНЮ
 # ============================
 
+_BOTTOM_MENU = ReplyKeyboardMarkup(
+    keyboard=[
+        [
+            KeyboardButton(text="🕹 Игры"),
+            KeyboardButton(text="💼 Баланс"),
+        ],
+        [
+            KeyboardButton(text="🎁 Розыгрыш"),
+            KeyboardButton(text="👤 Профиль"),
+        ],
+        [KeyboardButton(text="🌐 Поддержка")],
+    ],
+    resize_keyboard=True,
+)
+
+
 def bottom_menu() -> ReplyKeyboardMarkup:
     """Главное меню, которое всегда под сообщениями."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [
-                KeyboardButton(text="🕹 Игры"),
-                KeyboardButton(text="💼 Баланс"),
-            ],
-            [
-                KeyboardButton(text="🎁 Розыгрыш"),
-                KeyboardButton(text="👤 Профиль"),
-            ],
-            [KeyboardButton(text="🌐 Поддержка")],
-        ],
-        resize_keyboard=True,
-    )
+    return _BOTTOM_MENU
+
+
+# ============================
+#   ВЫБОР РЕЖИМА ИГРЫ
+# ============================
+
+_MODE_SELECT = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🎲 Кости", callback_data="mode_dice")],
+    [InlineKeyboardButton(text="🎩 Банкир", callback_data="mode_banker")],
+])
+
+_MODE_SELECT_WITH_BACK = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🎲 Кости", callback_data="mode_dice")],
+    [InlineKeyboardButton(text="🎩 Банкир", callback_data="mode_banker")],
+    [InlineKeyboardButton(text="⬅ Назад", callback_data="back_main")],
+])
+
+
+def mode_select_keyboard() -> InlineKeyboardMarkup:
+    """Выбор режима: Кости / Банкир."""
+    return _MODE_SELECT
+
+
+def mode_select_back_keyboard() -> InlineKeyboardMarkup:
+    """Выбор режима с кнопкой «Назад» (из меню игр)."""
+    return _MODE_SELECT_WITH_BACK
 
 
 # ============================
 #   МЕНЮ ИГР (КОСТИ)
 # ============================
 
+_GAMES_MENU = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="✔️ Создать игру", callback_data="game_create"),
+        InlineKeyboardButton(text="🔄 Обновить", callback_data="game_refresh"),
+    ],
+    [
+        InlineKeyboardButton(text="📝 Мои игры", callback_data="game_my"),
+        InlineKeyboardButton(text="🏆 Рейтинг", callback_data="game_rating"),
+    ],
+    [
+        InlineKeyboardButton(text="🎮 Игры", callback_data="menu_games"),
+        InlineKeyboardButton(text="🐼 Помощь", callback_data="help_menu"),
+    ],
+    [
+        InlineKeyboardButton(text="⬅ Назад", callback_data="menu_start"),
+    ],
+])
+
+
 def games_menu_keyboard() -> InlineKeyboardMarkup:
     """Меню раздела 'Игры' (кости)."""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="✔️ Создать игру", callback_data="game_create"),
-            InlineKeyboardButton(text="🔄 Обновить", callback_data="game_refresh"),
-        ],
-        [
-            InlineKeyboardButton(text="📝 Мои игры", callback_data="game_my"),
-            InlineKeyboardButton(text="🏆 Рейтинг", callback_data="game_rating"),
-        ],
-        [
-            InlineKeyboardButton(text="🎮 Игры", callback_data="menu_games"),
-            InlineKeyboardButton(text="🐼 Помощь", callback_data="help_menu"),
-        ],
-        [
-            InlineKeyboardButton(text="⬅ Назад", callback_data="menu_start"),
-        ],
-    ])
+    return _GAMES_MENU
 
 
 # ============================
 #   МЕНЮ РОЗЫГРЫША (БАНКИР)
 # ============================
 
+_RAFFLE_HELP = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🐼 Помощь", callback_data="help_menu")]
+])
+
+
 def raffle_help_button() -> InlineKeyboardMarkup:
     """Одна кнопка помощи — универсальная."""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🐼 Помощь", callback_data="help_menu")]
-    ])
+    return _RAFFLE_HELP
 
 
 # ============================
 #   МЕНЮ БАЛАНСА
 # ============================
 
+_BALANCE_MENU = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="💳 Пополнить", callback_data="balance_deposit"),
+    ],
+    [
+        InlineKeyboardButton(text="🐼 Помощь", callback_data="help_menu"),
+    ],
+    [
+        InlineKeyboardButton(text="⬅ Назад", callback_data="menu_start"),
+    ],
+])
+
+
 def balance_menu_keyboard() -> InlineKeyboardMarkup:
     """Меню управления балансом."""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="💳 Пополнить", callback_data="balance_deposit"),
-        ],
-        [
-            InlineKeyboardButton(text="🐼 Помощь", callback_data="help_menu"),
-        ],
-        [
-            InlineKeyboardButton(text="⬅ Назад", callback_data="menu_start"),
-        ],
-    ])
+    return _BALANCE_MENU
 
 
 # ============================
 #   МЕНЮ ПОМОЩИ
 # ============================
 
+_HELP_MENU = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🎲 Кости", callback_data="help_dice")],
+    [InlineKeyboardButton(text="🎩 Банкир", callback_data="help_banker")],
+    [InlineKeyboardButton(text="💳 Баланс/Вывод", callback_data="help_balance")],
+    [InlineKeyboardButton(text="⬅ Назад", callback_data="help_back")],
+])
+
+
 def help_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню помощи — выбор раздела."""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎲 Кости", callback_data="help_dice")],
-        [InlineKeyboardButton(text="🎩 Банкир", callback_data="help_banker")],
-        [InlineKeyboardButton(text="💳 Баланс/Вывод", callback_data="help_balance")],
-        [InlineKeyboardButton(text="⬅ Назад", callback_data="help_back")],
-    ])
+    return _HELP_MENU
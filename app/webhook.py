@@ -0,0 +1,169 @@
+# app/webhook.py
+"""
+Получение апдейтов через webhook (BOT_MODE = "webhook").
+
+- aiohttp-сервер принимает POST от Telegram на WEBHOOK_PATH
+- заголовок X-Telegram-Bot-Api-Secret-Token сверяется с WEBHOOK_SECRET;
+  без секрета сервер не запускается, а endpoint отвечает 401 на всё
+- апдейт кладётся в очередь и запрос сразу подтверждается (200),
+  обработка идёт в WEBHOOK_MAX_CONCURRENCY воркерах через dp.feed_raw_update
+- очередь ограничена: при переполнении отвечаем 503, и Telegram
+  повторит доставку позже — лишнее не копится в памяти
+
+Локально проверяется без Telegram: build_webhook_app() + tools/replay_updates.py
+(отправляет записанные апдейты из JSON-файла на этот же endpoint).
+"""
+import asyncio
+import hmac
+import re
+import time
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+from app.bot import bot, dp
+from app.config import (
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_QUEUE_SIZE,
+)
+
+_SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# допустимый secret_token для setWebhook
+_SECRET_RE = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+_queue: asyncio.Queue | None = None
+_workers: List[asyncio.Task] = []
+
+_webhook_counters: Dict[str, Any] = {
+    "received": 0,
+    "processed": 0,
+    "errors": 0,
+    "bad_secret": 0,
+    "bad_body": 0,
+    "overflow": 0,
+    "in_flight": 0,
+    "latency_total": 0.0,   # от приёма до конца обработки
+    "latency_max": 0.0,
+}
+
+
+async def _worker() -> None:
+    while True:
+        update, received_at = await _queue.get()
+        _webhook_counters["in_flight"] += 1
+        try:
+            await dp.feed_raw_update(bot, update)
+            _webhook_counters["processed"] += 1
+        except Exception as e:
+            _webhook_counters["errors"] += 1
+            print("Ошибка обработки апдейта:", e)
+        finally:
+            _webhook_counters["in_flight"] -= 1
+            spent = time.monotonic() - received_at
+            _webhook_counters["latency_total"] += spent
+            _webhook_counters["latency_max"] = max(_webhook_counters["latency_max"], spent)
+            _queue.task_done()
+
+
+def _start_workers() -> None:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+        for _ in range(WEBHOOK_MAX_CONCURRENCY):
+            _workers.append(asyncio.create_task(_worker()))
+
+
+async def _handle_update(request: web.Request) -> web.Response:
+    # пустой секрет не значит «не проверять»: такой запрос не пройдёт никогда
+    if not WEBHOOK_SECRET or not hmac.compare_digest(
+        request.headers.get(_SECRET_HEADER, ""), WEBHOOK_SECRET
+    ):
+        _webhook_counters["bad_secret"] += 1
+        return web.Response(status=401)
+
+    try:
+        update = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        _webhook_counters["bad_body"] += 1
+        return web.Response(status=400)
+    if not isinstance(update, dict) or "update_id" not in update:
+        _webhook_counters["bad_body"] += 1
+        return web.Response(status=400)
+
+    try:
+        _queue.put_nowait((update, time.monotonic()))
+    except asyncio.QueueFull:
+        _webhook_counters["overflow"] += 1
+        return web.Response(status=503)
+
+    _webhook_counters["received"] += 1
+    return web.Response(status=200)
+
+
+async def _on_startup(app: web.Application) -> None:
+    _start_workers()
+
+
+async def _on_shutdown(app: web.Application) -> None:
+    # дать воркерам доделать то, что уже подтверждено Telegram
+    if _queue is not None:
+        try:
+            await asyncio.wait_for(_queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            print(f"Webhook: при остановке не обработано {_queue.qsize()} апдейтов")
+    for task in _workers:
+        task.cancel()
+
+
+def build_webhook_app() -> web.Application:
+    """aiohttp-приложение с endpoint'ом апдейтов (без регистрации webhook в Telegram)."""
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, _handle_update)
+    app.on_startup.append(_on_startup)
+    app.on_shutdown.append(_on_shutdown)
+    return app
+
+
+async def run_webhook() -> None:
+    """Поднять сервер и зарегистрировать webhook. Работает до отмены."""
+    if not WEBHOOK_BASE_URL:
+        raise Exception("BOT_MODE=webhook, но WEBHOOK_BASE_URL не задан.")
+    if not _SECRET_RE.fullmatch(WEBHOOK_SECRET):
+        raise Exception(
+            "BOT_MODE=webhook, но WEBHOOK_SECRET не задан или некорректен "
+            "(1-256 символов: A-Z, a-z, 0-9, _ и -)."
+        )
+
+    runner = web.AppRunner(build_webhook_app())
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    await bot.set_webhook(
+        WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=min(100, WEBHOOK_MAX_CONCURRENCY),
+    )
+    print(f"🌐 Webhook слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # webhook в Telegram не снимаем: новый экземпляр после деплоя
+        # поднимется на том же адресе, а апдейты подождут у Telegram
+        await runner.cleanup()
+
+
+def webhook_stats() -> Dict[str, Any]:
+    done = _webhook_counters["processed"] + _webhook_counters["errors"]
+    return {
+        "queued": _queue.qsize() if _queue else 0,
+        "latency_avg": (_webhook_counters["latency_total"] / done) if done else 0.0,
+        **_webhook_counters,
+    }
@@ -0,0 +1,10 @@
+# benchmarks/__init__.py
+"""
+Микробенчмарки структур данных бота. Запуск из корня репозитория:
+
+    python -m benchmarks.user_store --users 1000000
+    python -m benchmarks.e2e --users 200 --ops 20 --out results/e2e.json
+    python -m benchmarks.simulate --dice 5000 --banker 2000 --seed 7
+    python -m benchmarks.dataset --dsn postgres://bot@localhost/bench --scale large --truncate
+    python -m benchmarks.queries --dsn postgres://bot@localhost/bench --out results/queries.json
+"""
@@ -0,0 +1,340 @@
+# benchmarks/dataset.py
+"""
+Синтетические данные для проверки запросов на больших таблицах:
+users, games, raffle_rounds, raffle_bets, ton_deposits, transfers.
+
+Схема — та же, что создаёт бот (Storage.create_schema), поэтому запросы
+из app/db/ работают на этих данных как в проде. Загрузка:
+- PostgreSQL — COPY (asyncpg copy_records_to_table) пачками по --batch
+- SQLite — executemany в транзакции (для прогона без сервера)
+
+Активность неравномерная, как у живого бота:
+- пользователь для игры/ставки/перевода — степенное распределение
+  (--skew 3: 1% самых активных дают ~20% действий, 10% — ~45%)
+- со временем действий больше: плотность растёт линейно к концу периода
+  (--days дней до текущего момента), id идут в порядке времени
+- ставки в костях и цены долей — уровни комнат, мелкие чаще
+
+Размеры: --scale small|medium|large|xl, любую таблицу можно переопределить
+(--games 5000000 ...). xl — десятки миллионов строк.
+
+    python -m benchmarks.dataset --dsn postgres://bot@localhost/bench --scale large --truncate
+    python -m benchmarks.dataset --dsn sqlite:///bench.db --scale small
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Sequence, Tuple
+
+_UID_BASE = 100_000_000
+
+# users, games, raffle_rounds (ставок ~5 на раунд), ton_deposits, transfers
+SCALES = {
+    "small": (10_000, 100_000, 10_000, 10_000, 20_000),
+    "medium": (100_000, 2_000_000, 200_000, 100_000, 300_000),
+    "large": (1_000_000, 20_000_000, 2_000_000, 1_000_000, 3_000_000),
+    "xl": (3_000_000, 50_000_000, 6_000_000, 3_000_000, 10_000_000),
+}
+
+_BETS = [10, 50, 100, 500, 1000, 5000]
+_BET_WEIGHTS = [40, 25, 15, 10, 7, 3]
+_ROOM_TIERS = [10, 50, 100, 500, 1000]          # как RAFFLE_ROOM_TIERS
+_ROOM_WEIGHTS = [35, 25, 20, 12, 8]
+
+TABLES = ["users", "games", "raffle_rounds", "raffle_bets", "ton_deposits", "transfers"]
+
+
+class Generator:
+    """Строки таблиц; один --seed — одни и те же данные."""
+
+    def __init__(self, args) -> None:
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self.end = datetime.now(timezone.utc)
+        self.span = args.days * 86400
+
+    # ---------- распределения ----------
+
+    def user(self) -> int:
+        return _UID_BASE + int(self.args.users * self.rnd.random() ** self.args.skew)
+
+    def two_users(self) -> Tuple[int, int]:
+        a = self.user()
+        b = self.user()
+        while b == a:
+            b = self.user()
+        return a, b
+
+    def at(self, i: int, n: int) -> datetime:
+        """Время i-й из n записей: плотность растёт к концу периода."""
+        frac = ((i + self.rnd.random()) / n) ** 0.5
+        return self.end - timedelta(seconds=self.span * (1 - frac))
+
+    # ---------- таблицы ----------
+
+    def users(self) -> Iterator[tuple]:
+        n = self.args.users
+        rnd = self.rnd
+        for i in range(n):
+            # первые id — самые активные и самые старые пользователи
+            yield (
+                _UID_BASE + i,
+                None if rnd.random() < 0.1 else f"user{i}",
+                int(rnd.lognormvariate(6, 1.5)),
+                self.at(i, n).isoformat(),
+            )
+
+    def games(self) -> Iterator[tuple]:
+        n = self.args.games
+        rnd = self.rnd
+        for i in range(1, n + 1):
+            creator, opponent = self.two_users()
+            bet = rnd.choices(_BETS, _BET_WEIGHTS)[0]
+            created = self.at(i, n)
+            # последние игры ещё ждут соперника
+            if i > n - max(1, n // 1000) and rnd.random() < 0.5:
+                yield (i, creator, None, bet, None, None, None, 0, created.isoformat(), None)
+                continue
+            cr = rnd.randint(1, 6)
+            orr = rnd.randint(1, 6)
+            while orr == cr:
+                orr = rnd.randint(1, 6)
+            yield (
+                i, creator, opponent, bet, cr, orr,
+                "creator" if cr > orr else "opponent",
+                1,
+                created.isoformat(),
+                (created + timedelta(seconds=rnd.uniform(3, 60))).isoformat(),
+            )
+
+    def raffle(self) -> Iterator[Tuple[tuple, List[tuple]]]:
+        """Раунд и его ставки (ставки идут в raffle_bets)."""
+        n = self.args.rounds
+        rnd = self.rnd
+        private_room = len(_ROOM_TIERS)
+        for i in range(1, n + 1):
+            if rnd.random() < 0.1:
+                private_room += 1
+                room_id = private_room
+                entry = rnd.choice(_BETS)
+            else:
+                tier = rnd.choices(range(len(_ROOM_TIERS)), _ROOM_WEIGHTS)[0]
+                room_id = tier + 1
+                entry = _ROOM_TIERS[tier]
+
+            players = 1 if rnd.random() < 0.03 else min(30, self.args.users, 2 + int(rnd.expovariate(0.4)))
+            stakes = {}
+            while len(stakes) < players:
+                stakes.setdefault(self.user(), rnd.randint(1, 10) * entry)
+
+            bets = []
+            for uid, amount in stakes.items():
+                # часть игроков докупает доли второй ставкой
+                if amount > entry and rnd.random() < 0.3:
+                    first = entry * rnd.randint(1, amount // entry - 1)
+                    bets.append((i, uid, first))
+                    bets.append((i, uid, amount - first))
+                else:
+                    bets.append((i, uid, amount))
+
+            created = self.at(i, n)
+            finished = (created + timedelta(seconds=rnd.uniform(60, 600))).isoformat()
+            if players < 2:
+                # отменённый раунд: возврат, банк 0
+                round_row = (i, room_id, created.isoformat(), finished, None, 0)
+            else:
+                uids = list(stakes)
+                winner = rnd.choices(uids, [stakes[u] for u in uids])[0]
+                round_row = (i, room_id, created.isoformat(), finished, winner, sum(stakes.values()))
+            yield round_row, bets
+
+    def ton_deposits(self) -> Iterator[tuple]:
+        n = self.args.deposits
+        rnd = self.rnd
+        for i in range(n):
+            uid = self.user()
+            ton = round(rnd.lognormvariate(1, 1), 3)
+            yield (
+                hashlib.sha256(f"{self.args.seed}:{i}".encode()).hexdigest(),
+                uid,
+                ton,
+                int(ton * 100),
+                str(uid),
+                self.at(i, n).isoformat(),
+            )
+
+    def transfers(self) -> Iterator[tuple]:
+        n = self.args.transfers
+        rnd = self.rnd
+        for i in range(n):
+            a, b = self.two_users()
+            yield (a, b, max(1, int(rnd.lognormvariate(4, 1.5))), self.at(i, n).isoformat())
+
+
+# ---------- загрузка ----------
+
+_COLUMNS = {
+    "users": ("user_id", "username", "balance", "registered_at"),
+    "games": (
+        "id", "creator_id", "opponent_id", "bet", "creator_roll", "opponent_roll",
+        "winner", "finished", "created_at", "finished_at",
+    ),
+    "raffle_rounds": ("id", "room_id", "created_at", "finished_at", "winner_id", "total_bank"),
+    "raffle_bets": ("raffle_id", "user_id", "amount"),
+    "ton_deposits": ("tx_hash", "user_id", "ton_amount", "coins", "comment", "at"),
+    "transfers": ("from_id", "to_id", "amount", "at"),
+}
+
+
+async def load_rows(storage, table: str, rows: Sequence[tuple]) -> None:
+    """Пачка строк в таблицу: COPY в PostgreSQL, executemany в SQLite."""
+    columns = _COLUMNS[table]
+    async with storage.connection() as db:
+        if storage.name == "postgres":
+            await db.copy_records_to_table(table, records=rows, columns=columns)
+            return
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        async with db.transaction():
+            await db.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+            )
+
+
+class _Progress:
+    def __init__(self, table: str) -> None:
+        self.table = table
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def add(self, n: int) -> None:
+        self.rows += n
+        now = time.perf_counter()
+        if now - self._last >= 5:
+            self._last = now
+            print(f"  {self.table}: {self.rows:,} строк, {self.rows / (now - self.started):,.0f}/с")
+
+    def done(self) -> None:
+        spent = time.perf_counter() - self.started
+        rate = self.rows / spent if spent else 0.0
+        print(f"{self.table}: {self.rows:,} строк за {spent:.1f} с ({rate:,.0f}/с)")
+
+
+async def _load_table(storage, table: str, rows: Iterator[tuple], batch: int) -> None:
+    progress = _Progress(table)
+    chunk: List[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch:
+            await load_rows(storage, table, chunk)
+            progress.add(len(chunk))
+            chunk = []
+    if chunk:
+        await load_rows(storage, table, chunk)
+        progress.add(len(chunk))
+    progress.done()
+
+
+async def _load_raffle(storage, gen: Generator, batch: int) -> None:
+    rounds_progress = _Progress("raffle_rounds")
+    bets_progress = _Progress("raffle_bets")
+    rounds: List[tuple] = []
+    bets: List[tuple] = []
+
+    async def flush() -> None:
+        # раунды раньше ставок — ставки ссылаются на них
+        await load_rows(storage, "raffle_rounds", rounds)
+        await load_rows(storage, "raffle_bets", bets)
+        rounds_progress.add(len(rounds))
+        bets_progress.add(len(bets))
+        rounds.clear()
+        bets.clear()
+
+    for round_row, round_bets in gen.raffle():
+        rounds.append(round_row)
+        bets.extend(round_bets)
+        if len(bets) >= batch:
+            await flush()
+    if rounds:
+        await flush()
+    rounds_progress.done()
+    bets_progress.done()
+
+
+async def _prepare(storage, truncate: bool) -> None:
+    async with storage.connection() as db:
+        if truncate:
+            if storage.name == "postgres":
+                await db.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY")
+            else:
+                for table in TABLES:
+                    await db.execute(f"DELETE FROM {table}")
+            return
+        for table in TABLES:
+            if await db.fetchval(f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} LIMIT 1) t"):
+                raise SystemExit(f"Таблица {table} не пуста — запустите с --truncate")
+
+
+async def _finish(storage) -> None:
+    async with storage.connection() as db:
+        if storage.name == "postgres":
+            # id загружены явно — последовательности продолжают с максимума
+            for table in ("games", "raffle_rounds"):
+                await db.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"GREATEST(COALESCE(MAX(id), 0), 1)) FROM {table}"
+                )
+        await db.execute("ANALYZE")
+
+
+async def run(args) -> None:
+    from app.db.pool import open_storage
+
+    storage = open_storage(args.dsn)
+    await storage.open()
+    try:
+        await storage.create_schema()
+        await _prepare(storage, args.truncate)
+
+        gen = Generator(args)
+        started = time.perf_counter()
+        await _load_table(storage, "users", gen.users(), args.batch)
+        await _load_table(storage, "games", gen.games(), args.batch)
+        await _load_raffle(storage, gen, args.batch)
+        await _load_table(storage, "ton_deposits", gen.ton_deposits(), args.batch)
+        await _load_table(storage, "transfers", gen.transfers(), args.batch)
+        await _finish(storage)
+        print(f"Готово за {time.perf_counter() - started:.1f} с")
+    finally:
+        await storage.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True, help="postgres://... или sqlite:///file.db")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--games", type=int, default=None)
+    parser.add_argument("--rounds", type=int, default=None, help="раундов Банкира (ставок ~5 на раунд)")
+    parser.add_argument("--deposits", type=int, default=None)
+    parser.add_argument("--transfers", type=int, default=None)
+    parser.add_argument("--days", type=int, default=180, help="период данных до текущего момента")
+    parser.add_argument("--skew", type=float, default=3.0, help="1 — равномерно, больше — сильнее перекос")
+    parser.add_argument("--batch", type=int, default=50_000, help="строк в одном COPY")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед загрузкой")
+    args = parser.parse_args()
+
+    defaults = dict(zip(("users", "games", "rounds", "deposits", "transfers"), SCALES[args.scale]))
+    for name, value in defaults.items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+# benchmarks/e2e.py
+"""
+Сквозной бенчмарк бота: синтетические апдейты -> dp.feed_update -> хендлеры,
+middlewares, хранилище и исходящая очередь — как в проде, но без Telegram
+и без сервера БД:
+
+- Bot API — tools/fake_bot_api.py в этом же процессе (TELEGRAM_API_BASE)
+- БД — SQLite в памяти (DATABASE_URL=sqlite://), журнал и снимок — во
+  временной папке
+
+N пользователей действуют параллельно, у каждого --ops действий подряд
+с паузой --think-ms: создать игру в кости и вступить в чужую, ставка
+в Банкире и её отмена, перевод, профиль, рейтинги, баланс.
+
+Результат (JSON): апдейтов/с, p50/p95/p99 времени обработки апдейта
+(в целом и по видам действий), обращений к БД и вызовов Bot API на апдейт.
+
+    python -m benchmarks.e2e --users 200 --ops 20 --out results/e2e.json
+    python -m benchmarks.e2e --users 200 --ops 20 --compare results/e2e.json
+
+--think-ms 0 — предельная пропускная способность (антифлуд тогда заметно
+срабатывает — это тоже в отчёте).
+
+Темп исходящей очереди (OUTBOUND_*: 25 сообщений/с на бот, пауза на чат)
+по умолчанию снят — иначе время обработки почти целиком состоит из
+ожидания очереди, а не из работы бота. --telegram-limits оставляет его.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+_API_PORT = 18181
+
+
+def _prepare_env(workdir: str, port: int) -> None:
+    # до импорта app: конфиг читает окружение при импорте
+    os.environ["TELEGRAM_API_BASE"] = f"http://127.0.0.1:{port}"
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ["RAFFLE_JOURNAL_PATH"] = os.path.join(workdir, "raffle.journal")
+    os.environ["STATE_SNAPSHOT_PATH"] = os.path.join(workdir, "state.snapshot")
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    values = sorted(values)
+    n = len(values)
+
+    def q(p: float) -> float:
+        return values[min(n - 1, int(n * p))] * 1000
+
+    return {"count": n, "p50_ms": q(0.50), "p95_ms": q(0.95), "p99_ms": q(0.99), "max_ms": values[-1] * 1000}
+
+
+def _lift_outbound_limits() -> None:
+    """Без темпа Telegram: очередь отдаёт запросы сразу (только для бенчмарка)."""
+    from app.services import outbound
+
+    outbound.OUTBOUND_GLOBAL_RATE = 1_000_000
+    outbound.OUTBOUND_GLOBAL_BURST = 1_000_000
+    outbound.OUTBOUND_PER_CHAT_BURST = 1_000_000
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return ""
+
+
+class LoadGenerator:
+    """Синтетические пользователи и их сценарии."""
+
+    def __init__(self, args, bot, dp) -> None:
+        from aiogram.types import Update
+
+        self.Update = Update
+        self.args = args
+        self.bot = bot
+        self.dp = dp
+        self.rng = random.Random(args.seed)
+        self.next_update_id = 1
+        self.latencies: List[float] = []
+        self.by_kind: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.user_ids = [100000 + i for i in range(args.users)]
+
+    # ---------- апдейты ----------
+
+    def _user(self, uid: int) -> Dict[str, Any]:
+        return {"id": uid, "is_bot": False, "first_name": f"u{uid}", "username": f"bench{uid}"}
+
+    def _message(self, uid: int, text: str):
+        n = self.next_update_id
+        self.next_update_id += 1
+        return self.Update(
+            **{
+                "update_id": n,
+                "message": {
+                    "message_id": n,
+                    "date": int(time.time()),
+                    "chat": {"id": uid, "type": "private"},
+                    "from": self._user(uid),
+                    "text": text,
+                },
+            }
+        )
+
+    def _callback(self, uid: int, data: str):
+        n = self.next_update_id
+        self.next_update_id += 1
+        return self.Update(
+            **{
+                "update_id": n,
+                "callback_query": {
+                    "id": f"bench{n}",
+                    "from": self._user(uid),
+                    "chat_instance": "bench",
+                    "data": data,
+                    "message": {
+                        "message_id": 1,
+                        "date": int(time.time()),
+                        "chat": {"id": uid, "type": "private"},
+                        "text": "menu",
+                    },
+                },
+            }
+        )
+
+    async def _feed(self, kind: str, update) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            self.errors[f"{kind}: {type(e).__name__}"] += 1
+        spent = time.perf_counter() - started
+        self.latencies.append(spent)
+        self.by_kind[kind].append(spent)
+
+    # ---------- сценарии ----------
+
+    async def dice_create(self, uid: int) -> None:
+        from app.config import DICE_MIN_BET
+
+        await self._feed("dice_create", self._callback(uid, "create_game"))
+        await self._feed("dice_create", self._message(uid, str(DICE_MIN_BET * self.rng.randint(1, 5))))
+
+    async def dice_join(self, uid: int) -> None:
+        from app.models import GameStatus
+        from app.services.games import games
+
+        open_ids = [
+            g.id for g in games.values()
+            if g.status == GameStatus.OPEN and g.creator_id != uid
+        ]
+        if not open_ids:
+            return await self.dice_create(uid)
+        await self._feed("dice_join", self._callback(uid, f"join_confirm:{self.rng.choice(open_ids)}"))
+
+    async def banker_bet(self, uid: int) -> None:
+        from app.services.raffle import public_rooms
+
+        room = self.rng.choice(public_rooms())
+        await self._feed("banker_bet", self._callback(uid, f"raffle_quick:{room['id']}:{room['entry_amount']}"))
+
+    async def banker_cancel(self, uid: int) -> None:
+        from app.services.raffle import public_rooms
+
+        room = self.rng.choice(public_rooms())
+        await self._feed("banker_cancel", self._callback(uid, f"raffle_cancel:{room['id']}"))
+
+    async def transfer(self, uid: int) -> None:
+        target = self.rng.choice(self.user_ids)
+        if target == uid:
+            return
+        await self._feed("transfer", self._callback(uid, "transfer_menu"))
+        await self._feed("transfer", self._message(uid, str(target)))
+        await self._feed("transfer", self._message(uid, str(self.rng.randint(1, 50))))
+
+    async def profile(self, uid: int) -> None:
+        await self._feed("profile", self._message(uid, "👤 Профиль"))
+
+    async def rating(self, uid: int) -> None:
+        data = self.rng.choice(("rating", "raffle_rating"))
+        await self._feed("rating", self._callback(uid, data))
+
+    async def balance(self, uid: int) -> None:
+        await self._feed("balance", self._message(uid, "💼 Баланс"))
+
+    # вес сценария в смеси
+    SCENARIOS = {
+        "dice_create": 3,
+        "dice_join": 3,
+        "banker_bet": 3,
+        "banker_cancel": 1,
+        "transfer": 1,
+        "profile": 2,
+        "rating": 1,
+        "balance": 2,
+    }
+
+    async def run_user(self, uid: int) -> None:
+        names = list(self.SCENARIOS)
+        weights = [self.SCENARIOS[n] for n in names]
+        # разнести старт пользователей, чтобы не было одного залпа
+        await asyncio.sleep(self.rng.random() * self.args.think_ms / 1000)
+        for _ in range(self.args.ops):
+            await getattr(self, self.rng.choices(names, weights)[0])(uid)
+            if self.args.think_ms:
+                await asyncio.sleep(self.args.think_ms / 1000 * (0.5 + self.rng.random()))
+
+
+async def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    _prepare_env(workdir, args.api_port)
+
+    from aiohttp import web
+    from tools.fake_bot_api import FakeBotApi
+
+    api = FakeBotApi(
+        latency_ms=args.api_latency_ms,
+        jitter_ms=args.api_latency_ms / 4,
+        rate_429=args.api_429,
+        seed=args.seed,
+    )
+    runner = web.AppRunner(api.build_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.api_port).start()
+
+    from app.main import bot, dp  # регистрирует хендлеры
+    from app.db.pool import init_db, close_db, get_storage
+    from app.middlewares import idempotency_stats, throttling_stats
+    from app.services.balances import user_store
+    from app.services.raffle_journal import journal_sync
+    from app.services.ton import processed_ton_tx
+
+    await init_db(user_store, processed_ton_tx)
+    if not args.telegram_limits:
+        _lift_outbound_limits()
+    gen = LoadGenerator(args, bot, dp)
+    for uid in gen.user_ids:
+        user_store.set_balance(uid, args.balance)
+        user_store.set_username(uid, f"bench{uid}")
+
+    storage = get_storage()
+    queries_before = storage.counters["queries"]
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(gen.run_user(uid) for uid in gen.user_ids))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    # фоновые партии в кости и рассылки — досчитать их запросы и вызовы
+    pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    if pending and args.drain:
+        await asyncio.wait(pending, timeout=args.drain)
+    await journal_sync()
+
+    updates = len(gen.latencies)
+    queries = storage.counters["queries"] - queries_before
+    api_stats = api.stats()
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "users": args.users,
+            "ops": args.ops,
+            "think_ms": args.think_ms,
+            "api_latency_ms": args.api_latency_ms,
+            "api_429": args.api_429,
+            "telegram_limits": args.telegram_limits,
+            "seed": args.seed,
+            "storage": storage.name,
+        },
+        "updates": updates,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "updates_per_sec": updates / wall if wall else 0.0,
+        "cpu_ms_per_update": cpu / updates * 1000 if updates else 0.0,
+        "latency": _percentiles(gen.latencies),
+        "by_kind": {kind: _percentiles(v) for kind, v in sorted(gen.by_kind.items())},
+        "db_queries_per_update": queries / updates if updates else 0.0,
+        "telegram_calls_per_update": api_stats["calls"] / updates if updates else 0.0,
+        "telegram_by_method": {m: st["calls"] for m, st in api_stats["methods"].items()},
+        "telegram_statuses": dict(
+            sum((Counter(st["statuses"]) for st in api_stats["methods"].values()), Counter())
+        ),
+        "throttling": throttling_stats(),
+        "idempotency": idempotency_stats(),
+        "errors": dict(gen.errors),
+    }
+
+    await close_db()
+    await bot.session.close()
+    await runner.cleanup()
+    api.close()
+    return result
+
+
+def _compare(current: Dict[str, Any], path: str) -> None:
+    with open(path, encoding="utf-8") as fh:
+        base = json.load(fh)
+    rows = [
+        ("updates/s", base["updates_per_sec"], current["updates_per_sec"], True),
+        ("p50 ms", base["latency"]["p50_ms"], current["latency"]["p50_ms"], False),
+        ("p95 ms", base["latency"]["p95_ms"], current["latency"]["p95_ms"], False),
+        ("p99 ms", base["latency"]["p99_ms"], current["latency"]["p99_ms"], False),
+        ("cpu ms/update", base["cpu_ms_per_update"], current["cpu_ms_per_update"], False),
+        ("db/update", base["db_queries_per_update"], current["db_queries_per_update"], False),
+        ("api/update", base["telegram_calls_per_update"], current["telegram_calls_per_update"], False),
+    ]
+    print(f"\nСравнение с {path} ({base['meta'].get('commit')}):")
+    for name, old, new, higher_better in rows:
+        delta = (new - old) / old * 100 if old else 0.0
+        worse = delta < -5 if higher_better else delta > 5
+        mark = "  <-- хуже" if worse else ""
+        print(f"  {name:<14} {old:>10.2f} -> {new:>10.2f}  ({delta:+.1f}%){mark}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--ops", type=int, default=20, help="действий на пользователя")
+    parser.add_argument("--think-ms", type=float, default=300.0, help="пауза между действиями")
+    parser.add_argument("--balance", type=int, default=100_000)
+    parser.add_argument("--api-latency-ms", type=float, default=20.0)
+    parser.add_argument("--api-429", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--api-port", type=int, default=_API_PORT)
+    parser.add_argument("--telegram-limits", action="store_true", help="оставить темп исходящей очереди")
+    parser.add_argument("--drain", type=float, default=15.0, help="сколько ждать фоновые задачи, с")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="куда сохранить JSON")
+    parser.add_argument("--compare", default=None, help="JSON прошлого запуска")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    lat = result["latency"]
+    print(
+        f"апдейтов: {result['updates']} за {result['wall_s']:.1f} с "
+        f"({result['updates_per_sec']:.0f}/с, CPU {result['cpu_ms_per_update']:.2f} мс/апдейт)\n"
+        f"обработка: p50 {lat['p50_ms']:.1f} мс, p95 {lat['p95_ms']:.1f} мс, "
+        f"p99 {lat['p99_ms']:.1f} мс, max {lat['max_ms']:.0f} мс\n"
+        f"на апдейт: БД {result['db_queries_per_update']:.2f}, "
+        f"Bot API {result['telegram_calls_per_update']:.2f}"
+    )
+    for kind, st in result["by_kind"].items():
+        print(f"  {kind:<14} {st['count']:>6}  p50 {st['p50_ms']:7.1f}  p95 {st['p95_ms']:7.1f}  p99 {st['p99_ms']:7.1f}")
+    if result["errors"]:
+        print("ошибки:", result["errors"])
+
+    if args.out:
+        folder = os.path.dirname(args.out)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, ensure_ascii=False, indent=2)
+        print(f"сохранено: {args.out}")
+    if args.compare:
+        _compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+# benchmarks/queries.py
+"""
+Время каждого запроса из app/db/ на наборе данных benchmarks/dataset.py
+и план каждого выполненного SQL:
+- PostgreSQL — EXPLAIN (ANALYZE, BUFFERS); запросы на запись — в
+  транзакции с откатом, данные не меняются
+- SQLite — EXPLAIN QUERY PLAN
+
+Функции вызываются через те же обёртки, что и у бота (app/db/*.py),
+после init_db — его время тоже в отчёте. Пользовательские запросы — для
+трёх пользователей: самого активного (heavy), обычного (typical) и
+без игр за последнее время (cold): на перекошенных данных их время
+различается на порядки.
+
+Запись идёт в отдельные строки (отрицательные id пользователей,
+tx_hash/ключи с префиксом bench:), которые удаляются в конце.
+
+    python -m benchmarks.queries --dsn postgres://bot@localhost/bench --out results/queries.json
+    python -m benchmarks.queries --dsn sqlite:///bench.db --plans results/plans.txt
+
+--skip get_all_finished_games — на десятках миллионов игр эта выгрузка
+не помещается в память.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+_BENCH_UID = -1_000_000
+
+
+def _percentiles_ms(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    n = len(values)
+
+    def q(p: float) -> float:
+        return values[min(n - 1, int(n * p))] * 1000
+
+    return {"calls": n, "p50_ms": q(0.50), "p95_ms": q(0.95), "max_ms": values[-1] * 1000}
+
+
+def _rows(result: Any) -> int | None:
+    if isinstance(result, tuple):
+        return sum(len(part) for part in result if isinstance(part, list))
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+class _Recorder:
+    """Подключение, которое запоминает выполненные запросы с параметрами."""
+
+    def __init__(self, db, log: List[Tuple[str, tuple]]) -> None:
+        self._db = db
+        self._log = log
+
+    async def execute(self, query: str, *args: Any):
+        self._log.append((query, args))
+        return await self._db.execute(query, *args)
+
+    async def executemany(self, query: str, args):
+        args = list(args)
+        if args:
+            self._log.append((query, tuple(args[0])))
+        return await self._db.executemany(query, args)
+
+    async def fetch(self, query: str, *args: Any):
+        self._log.append((query, args))
+        return await self._db.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args: Any):
+        self._log.append((query, args))
+        return await self._db.fetchrow(query, *args)
+
+    async def fetchval(self, query: str, *args: Any):
+        self._log.append((query, args))
+        return await self._db.fetchval(query, *args)
+
+    def transaction(self):
+        return self._db.transaction()
+
+
+class QueryBench:
+    def __init__(self, storage, args) -> None:
+        self.storage = storage
+        self.args = args
+        self.log: List[Tuple[str, tuple]] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        # исходное подключение — для EXPLAIN и служебных запросов
+        self._connection = storage.connection
+
+        @asynccontextmanager
+        async def recording():
+            async with self._connection() as db:
+                yield _Recorder(db, self.log)
+
+        storage.connection = recording
+
+    # ---------- служебное ----------
+
+    async def fetch(self, query: str, *args: Any):
+        async with self._connection() as db:
+            return await db.fetch(query, *args)
+
+    async def fetchval(self, query: str, *args: Any):
+        async with self._connection() as db:
+            return await db.fetchval(query, *args)
+
+    async def explain(self, query: str, args: tuple) -> str:
+        async with self._connection() as db:
+            if self.storage.name != "postgres":
+                rows = await db.fetch("EXPLAIN QUERY PLAN " + query, *args)
+                return "\n".join(row[3] for row in rows)
+            # ANALYZE выполняет запрос — запись откатывается
+            tr = db.transaction()
+            await tr.start()
+            try:
+                rows = await db.fetch("EXPLAIN (ANALYZE, BUFFERS) " + query, *args)
+            finally:
+                await tr.rollback()
+            return "\n".join(row[0] for row in rows)
+
+    async def samples(self) -> Dict[str, Any]:
+        """heavy / typical / cold пользователи и последний раунд Банкира с игроком."""
+        recent = await self.fetch(
+            "SELECT creator_id FROM games ORDER BY id DESC LIMIT $1", self.args.sample_games
+        )
+        counts = Counter(r["creator_id"] for r in recent).most_common()
+        if not counts:
+            raise SystemExit("В таблице games нет строк — сначала benchmarks/dataset.py")
+        heavy = counts[0][0]
+        typical = counts[len(counts) // 2][0]
+        active = {uid for uid, _ in counts}
+        cold = next(
+            (r["user_id"] for r in await self.fetch("SELECT user_id FROM users ORDER BY user_id DESC LIMIT 1000")
+             if r["user_id"] not in active),
+            typical,
+        )
+        round_id = await self.fetchval("SELECT COALESCE(MAX(raffle_id), 0) FROM raffle_bets")
+        bettor = await self.fetchval("SELECT user_id FROM raffle_bets WHERE raffle_id = $1 LIMIT 1", round_id)
+        return {"heavy": heavy, "typical": typical, "cold": cold, "round_id": round_id, "bettor": bettor}
+
+    async def table_sizes(self) -> Dict[str, int]:
+        from benchmarks.dataset import TABLES
+
+        return {t: await self.fetchval(f"SELECT COUNT(*) FROM {t}") for t in TABLES + ["scheduled_jobs"]}
+
+    async def cleanup(self, max_game_id: int, max_round_id: int) -> None:
+        async with self._connection() as db:
+            await db.execute("DELETE FROM users WHERE user_id <= $1", _BENCH_UID)
+            await db.execute("DELETE FROM games WHERE id > $1", max_game_id)
+            await db.execute("DELETE FROM raffle_rounds WHERE id > $1", max_round_id)
+            await db.execute("DELETE FROM raffle_bets WHERE user_id <= $1", _BENCH_UID)
+            await db.execute("DELETE FROM ton_deposits WHERE tx_hash LIKE 'bench:%'")
+            await db.execute("DELETE FROM transfers WHERE from_id <= $1", _BENCH_UID)
+            await db.execute("DELETE FROM scheduled_jobs WHERE key LIKE 'bench:%'")
+
+    # ---------- замер ----------
+
+    async def measure(self, name: str, call: Callable[[int], Awaitable[Any]], repeat: int) -> None:
+        if any(skip in name for skip in self.args.skip):
+            return
+        timings: List[float] = []
+        result: Any = None
+        statements: List[Tuple[str, tuple]] = []
+        for i in range(repeat):
+            self.log.clear()
+            started = time.perf_counter()
+            result = await call(i)
+            timings.append(time.perf_counter() - started)
+            statements = self.log[:]
+        self.log.clear()
+
+        plans = []
+        for query, args in statements:
+            try:
+                plan = await self.explain(query, args)
+            except Exception as e:
+                plan = f"(EXPLAIN не выполнен: {e})"
+            plans.append({"sql": " ".join(query.split()), "plan": plan})
+
+        self.results[name] = {
+            **_percentiles_ms(timings),
+            "rows": _rows(result),
+            "statements": len(statements),
+            "plans": plans,
+        }
+        st = self.results[name]
+        rows = "" if st["rows"] is None else f"{st['rows']:>10,}"
+        print(f"{name:<48} {st['p50_ms']:>10.2f} {st['p95_ms']:>10.2f} {rows:>10}")
+
+
+async def run(args) -> Dict[str, Any]:
+    from app.db import games, pool, raffle, scheduler, transfers, users
+    from app.db.deposits import add_ton_deposit
+    from app.models import DiceGame, GameStatus, GameWinner
+    from app.services.user_store import UserStore
+
+    # init_db — как при старте бота: схема + загрузка пользователей и TON-транзакций
+    init_timings = []
+    for _ in range(args.init_repeat):
+        await pool.close_db()
+        started = time.perf_counter()
+        await pool.init_db(UserStore(), set(), args.dsn)
+        init_timings.append(time.perf_counter() - started)
+    storage = pool.get_storage()
+
+    bench = QueryBench(storage, args)
+    sizes = await bench.table_sizes()
+    s = await bench.samples()
+    max_game_id = await games.get_max_game_id()
+    max_round_id = await raffle.get_max_raffle_round_id()
+    repeat = args.repeat
+
+    print(f"{storage.name}: " + ", ".join(f"{t}={n:,}" for t, n in sizes.items()))
+    print(f"{'функция':<48} {'p50 мс':>10} {'p95 мс':>10} {'строк':>10}")
+    bench.results["init_db"] = {**_percentiles_ms(init_timings), "rows": None, "statements": None, "plans": []}
+    print(f"{'init_db':<48} {bench.results['init_db']['p50_ms']:>10.2f} {bench.results['init_db']['p95_ms']:>10.2f}")
+
+    # ---------- чтение ----------
+    for kind in ("heavy", "typical", "cold"):
+        uid = s[kind]
+        await bench.measure(f"get_user_registered_at[{kind}]", lambda i, u=uid: users.get_user_registered_at(u), repeat)
+        await bench.measure(f"get_user_games[{kind}]", lambda i, u=uid: games.get_user_games(u), repeat)
+        await bench.measure(f"get_user_dice_games_count[{kind}]", lambda i, u=uid: games.get_user_dice_games_count(u), repeat)
+        await bench.measure(f"get_user_raffle_bets_count[{kind}]", lambda i, u=uid: raffle.get_user_raffle_bets_count(u), repeat)
+        await bench.measure(f"get_user_transfers[{kind}]", lambda i, u=uid: transfers.get_user_transfers(u), repeat)
+
+    await bench.measure(
+        "get_user_bets_in_raffle", lambda i: raffle.get_user_bets_in_raffle(s["round_id"], s["bettor"]), repeat
+    )
+    await bench.measure("get_users_profit_and_games_30_days", lambda i: games.get_users_profit_and_games_30_days(), max(1, repeat // 4))
+    await bench.measure("get_raffle_rounds_and_bets_30_days", lambda i: raffle.get_raffle_rounds_and_bets_30_days(), max(1, repeat // 4))
+    await bench.measure("get_all_finished_games", lambda i: games.get_all_finished_games(), 1)
+    await bench.measure("get_max_game_id", lambda i: games.get_max_game_id(), repeat)
+    await bench.measure("get_max_raffle_round_id", lambda i: raffle.get_max_raffle_round_id(), repeat)
+    await bench.measure("load_scheduled_jobs", lambda i: scheduler.load_scheduled_jobs(), repeat)
+
+    # ---------- запись (свои строки, удаляются в конце) ----------
+    now = datetime.now(timezone.utc)
+
+    def game(i: int) -> DiceGame:
+        g = DiceGame(max_game_id + 1 + i, _BENCH_UID, 10, opponent_id=_BENCH_UID - 1)
+        g.creator_roll, g.opponent_roll = 6, 1
+        g.winner = GameWinner.CREATOR
+        g.status = GameStatus.FINISHED
+        g.finished_at = now
+        return g
+
+    def raffle_round(i: int) -> Dict[str, Any]:
+        return {"id": max_round_id + 1 + i, "room_id": 1, "created_at": now,
+                "finished_at": None, "winner_id": None, "total_bank": 0}
+
+    try:
+        await bench.measure("upsert_user", lambda i: users.upsert_user(_BENCH_UID - i, f"bench{i}", 100), repeat)
+        await bench.measure("upsert_game", lambda i: games.upsert_game(game(i)), repeat)
+        await bench.measure("upsert_raffle_round", lambda i: raffle.upsert_raffle_round(raffle_round(i)), repeat)
+        await bench.measure("add_raffle_bet", lambda i: raffle.add_raffle_bet(max_round_id + 1, _BENCH_UID, 10), repeat)
+        await bench.measure("add_ton_deposit", lambda i: add_ton_deposit(f"bench:{i}", _BENCH_UID, 1.0, 100, "bench"), repeat)
+        await bench.measure("add_transfer", lambda i: transfers.add_transfer(_BENCH_UID, _BENCH_UID - 1, 1), repeat)
+        await bench.measure(
+            "save_scheduled_jobs",
+            lambda i: scheduler.save_scheduled_jobs([(f"bench:{i}", "bench", 0.0, "[]")], [f"bench:{i - 1}"]),
+            repeat,
+        )
+    finally:
+        await bench.cleanup(max_game_id, max_round_id)
+
+    result = {
+        "meta": {
+            "backend": storage.name,
+            "python": platform.python_version(),
+            "repeat": repeat,
+            "tables": sizes,
+            "samples": s,
+        },
+        "functions": bench.results,
+    }
+    await pool.close_db()
+    return result
+
+
+def _write_plans(result: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        for name, st in result["functions"].items():
+            for item in st["plans"]:
+                fh.write(f"=== {name}  (p50 {st['p50_ms']:.2f} мс)\n{item['sql']}\n\n{item['plan']}\n\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True, help="postgres://... или sqlite:///file.db")
+    parser.add_argument("--repeat", type=int, default=20, help="вызовов каждой функции")
+    parser.add_argument("--init-repeat", type=int, default=1, help="запусков init_db")
+    parser.add_argument("--sample-games", type=int, default=100_000, help="последних игр для выбора пользователей")
+    parser.add_argument("--skip", default="", help="функции через запятую, которые не запускать")
+    parser.add_argument("--out", default=None, help="JSON с временем и планами")
+    parser.add_argument("--plans", default=None, help="планы текстом")
+    args = parser.parse_args()
+    args.skip = [name for name in args.skip.split(",") if name]
+
+    result = asyncio.run(run(args))
+    for path in (args.out, args.plans):
+        folder = os.path.dirname(path or "")
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, ensure_ascii=False, indent=2, default=str)
+    if args.plans:
+        _write_plans(result, args.plans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# benchmarks/simulate.py
+"""
+Симуляция игровой логики на виртуальном времени: тысячи раундов костей
+и Банкира за секунды, с заданным зерном — один и тот же --seed даёт те же
+броски, тех же победителей и тот же итоговый отпечаток балансов.
+
+Вызываются те же функции, что и из хендлеров (services/game_lifecycle.py,
+services/raffle.py); подменены только:
+- часы и генератор (services/clock.py): VirtualClock и Random(seed) —
+  анимация кубиков, таймер Банкира и окно отмены ставки проходят мгновенно
+- Bot API: ответы формируются в этом же процессе, значение кубика берётся
+  из того же генератора; очередь исходящих и её темп не участвуют
+- БД не подключается, журнал Банкира — во временной папке
+
+После каждого раунда проверяется сохранение денег:
+    сумма балансов (включая комиссию в MAIN_ADMIN_ID)
+    + ставки в незавершённых играх и раундах = сумма пополнений
+Расхождение — ошибка с номером раунда и выход с кодом 1.
+
+Отчёт (JSON): раундов по видам, процессорное время на раунд
+(среднее, p50/p95/p99, по видам), вызовы Bot API, виртуальное время,
+отпечаток балансов.
+
+    python -m benchmarks.simulate --dice 5000 --banker 2000 --seed 7
+    python -m benchmarks.simulate --dice 20000 --banker 0 --out results/sim.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+_DICE_BETS = [10, 50, 100, 500, 1000]
+# доля открытых игр, которые создатель отменяет, не дождавшись соперника
+_DICE_CANCEL_SHARE = 0.1
+
+
+def _prepare_env(workdir: str) -> None:
+    # до импорта app: конфиг читает окружение при импорте
+    os.environ["RAFFLE_JOURNAL_PATH"] = os.path.join(workdir, "raffle.journal")
+    os.environ["STATE_SNAPSHOT_PATH"] = os.path.join(workdir, "state.snapshot")
+
+
+def _percentiles_us(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "mean_us": 0.0, "p50_us": 0.0, "p95_us": 0.0, "p99_us": 0.0}
+    n = len(values)
+    ordered = sorted(values)
+
+    def q(p: float) -> float:
+        return ordered[min(n - 1, int(n * p))] * 1e6
+
+    return {
+        "count": n,
+        "mean_us": sum(values) / n * 1e6,
+        "p50_us": q(0.50),
+        "p95_us": q(0.95),
+        "p99_us": q(0.99),
+    }
+
+
+def _session_class():
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import AnswerCallbackQuery, EditMessageText, SendDice, SendMessage
+
+    class SimSession(BaseSession):
+        """Bot API в процессе: ответ сразу, кубик — из генератора services/clock.py."""
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.calls: Counter = Counter()
+            self._message_id = 0
+
+        def _message(self, chat_id: Any, **extra: Any) -> Dict[str, Any]:
+            from app.services import clock
+
+            self._message_id += 1
+            return {
+                "message_id": self._message_id,
+                "date": int(clock.now().timestamp()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                **extra,
+            }
+
+        async def make_request(self, bot, method, timeout=None):
+            from app.services.clock import get_rng
+
+            self.calls[type(method).__name__] += 1
+            if isinstance(method, SendDice):
+                result: Any = self._message(
+                    method.chat_id,
+                    dice={"emoji": method.emoji or "🎲", "value": get_rng().randint(1, 6)},
+                )
+            elif isinstance(method, (SendMessage, EditMessageText)):
+                result = self._message(method.chat_id or 0, text=method.text)
+            elif isinstance(method, AnswerCallbackQuery):
+                result = True
+            else:
+                raise RuntimeError(f"Симуляция не отвечает на {type(method).__name__}")
+            return method.build_response({"ok": True, "result": result}).result
+
+        async def stream_content(self, url, timeout, chunk_size, raise_for_status):
+            raise RuntimeError("Симуляция не отдаёт файлы")
+            yield b""
+
+        async def close(self) -> None:
+            pass
+
+    return SimSession
+
+
+class Simulation:
+    def __init__(self, args) -> None:
+        from app.config import MAIN_ADMIN_ID
+
+        self.args = args
+        # выбор действий — свой генератор, чтобы не сдвигать броски кубика
+        self.rng = random.Random(f"{args.seed}:actors")
+        self.house = MAIN_ADMIN_ID
+        self.users = list(range(1_000_001, 1_000_001 + args.users))
+        self.deposits = 0
+        self.checks = 0
+        self.cpu_by_kind: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Counter = Counter()
+
+    # ---------- деньги ----------
+
+    def deposit(self, uid: int, amount: int) -> None:
+        from app.services.balances import change_balance
+
+        change_balance(uid, amount)
+        self.deposits += amount
+
+    def locked(self) -> int:
+        """Деньги, списанные со счетов, но ещё не выплаченные: открытые игры и раунды."""
+        from app.services.games import games
+        from app.services.raffle import raffle_rooms
+
+        total = 0
+        for g in games.values():
+            if not g.finished:
+                total += g.bet * (2 if g.opponent_id is not None else 1)
+        for room in raffle_rooms.values():
+            r = room["round"]
+            if r is not None and not r.finished:
+                total += r.total_bank
+        return total
+
+    def check(self, n: int, kind: str) -> None:
+        from app.services.balances import user_balances
+
+        self.checks += 1
+        balances = sum(amount for _, amount in user_balances.items())
+        held = self.locked()
+        if balances + held != self.deposits:
+            raise AssertionError(
+                f"раунд {n} ({kind}): балансы {balances} + в игре {held} "
+                f"!= пополнения {self.deposits} (разница {balances + held - self.deposits})"
+            )
+
+    def _solvent(self, amount: int, exclude: tuple = ()) -> int | None:
+        from app.services.balances import get_balance
+
+        for _ in range(20):
+            uid = self.rng.choice(self.users)
+            if uid in exclude:
+                continue
+            if get_balance(uid) < amount:
+                # пополнение — как TON-депозит, учитывается в сумме пополнений
+                self.deposit(uid, self.args.balance)
+            return uid
+        return None
+
+    # ---------- раунды ----------
+
+    async def dice_round(self) -> None:
+        from app.db.games import upsert_game
+        from app.services.balances import change_balance
+        from app.services.game_lifecycle import cancel_by_creator, join_game, open_game, start_game
+        from app.services.games import new_game
+
+        bet = self.rng.choice(_DICE_BETS)
+        creator = self._solvent(bet)
+        opponent = self._solvent(bet, exclude=(creator,))
+        if creator is None or opponent is None:
+            self.outcomes["dice_skipped"] += 1
+            return
+
+        # как handlers/text.py: ставка списывается при создании игры
+        g = new_game(creator, bet)
+        change_balance(creator, -bet)
+        open_game(g)
+        await upsert_game(g)
+
+        # как handlers/games_menu.py (cb_cancel_game): с той же проверкой окна
+        if self.rng.random() < _DICE_CANCEL_SHARE:
+            if await cancel_by_creator(g.id, creator) is None:
+                self.outcomes["dice_cancelled"] += 1
+                return
+            self.outcomes["dice_cancel_rejected"] += 1
+
+        # как handlers/games_menu.py (cb_join_confirm)
+        change_balance(opponent, -bet)
+        join_game(g.id, opponent)
+        await upsert_game(g)
+        await start_game(g.id)
+        self.outcomes["dice_played"] += 1
+
+    async def banker_round(self) -> None:
+        from app.config import RAFFLE_CANCEL_WINDOW_SECONDS, RAFFLE_MAX_BETS_PER_ROUND, RAFFLE_TIMER_SECONDS
+        from app.services import clock
+        from app.services.raffle import (
+            _process_raffle_bet,
+            cancel_user_bets,
+            create_private_room,
+            perform_raffle_draw,
+            public_rooms,
+        )
+
+        vclock = clock.get_clock()
+        if self.rng.random() < 0.2:
+            room = create_private_room(self.rng.choice(self.users))
+            entry = self.rng.choice(_DICE_BETS)
+        else:
+            room = self.rng.choice(public_rooms())
+            entry = room["entry_amount"]
+        room_id = room["id"]
+
+        # изредка один участник — раунд отменяется с возвратом
+        bettors = 1 if self.rng.random() < 0.05 else self.rng.randint(2, 8)
+        players: List[int] = []
+        for _ in range(bettors):
+            shares = self.rng.randint(1, RAFFLE_MAX_BETS_PER_ROUND)
+            uid = self._solvent(entry * shares, exclude=tuple(players))
+            if uid is None:
+                continue
+            await _process_raffle_bet(uid, uid, entry * shares, room_id)
+            players.append(uid)
+            vclock.advance(self.rng.uniform(0, 5))
+
+        # отмена: часть — в окне, часть — после него (должна быть отклонена)
+        for uid in players:
+            roll = self.rng.random()
+            if roll < 0.05:
+                await cancel_user_bets(uid, room_id)
+                self.outcomes["banker_cancel"] += 1
+            elif roll < 0.07:
+                vclock.advance(RAFFLE_CANCEL_WINDOW_SECONDS + 1)
+                await cancel_user_bets(uid, room_id)
+                self.outcomes["banker_cancel_late"] += 1
+
+        vclock.advance(RAFFLE_TIMER_SECONDS)
+        await perform_raffle_draw(room_id)
+        self.outcomes["banker_drawn"] += 1
+
+    async def run(self) -> None:
+        from app.services.balances import register_user
+
+        class _User:
+            def __init__(self, uid: int) -> None:
+                self.id = uid
+                self.username = f"sim{uid}"
+
+        for uid in self.users:
+            register_user(_User(uid))
+            self.deposit(uid, self.args.balance)
+
+        kinds = ["dice"] * self.args.dice + ["banker"] * self.args.banker
+        self.rng.shuffle(kinds)
+        rounds = {"dice": self.dice_round, "banker": self.banker_round}
+
+        for n, kind in enumerate(kinds, 1):
+            started = time.process_time()
+            await rounds[kind]()
+            # фоновые записи баланса (change_balance -> create_task) — сразу
+            await asyncio.sleep(0)
+            self.cpu_by_kind[kind].append(time.process_time() - started)
+            self.check(n, kind)
+
+    def digest(self) -> str:
+        from app.services.balances import user_balances
+
+        data = ",".join(f"{uid}:{amount}" for uid, amount in sorted(user_balances.items()))
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+async def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="bot-sim-")
+    _prepare_env(workdir)
+
+    from app.bot import bot
+    from app.services import clock
+    from app.services.balances import get_balance
+
+    session = _session_class()()
+    bot.session = session
+    vclock = clock.VirtualClock()
+    clock.set_clock(vclock)
+    clock.set_rng(random.Random(args.seed))
+    started_at = vclock.now()
+
+    sim = Simulation(args)
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    error = None
+    try:
+        await sim.run()
+    except AssertionError as e:
+        error = str(e)
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    all_rounds = [v for values in sim.cpu_by_kind.values() for v in values]
+    rounds = len(all_rounds)
+    virtual = (vclock.now() - started_at).total_seconds()
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "seed": args.seed,
+            "users": args.users,
+            "balance": args.balance,
+        },
+        "rounds": rounds,
+        "outcomes": dict(sim.outcomes),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_per_round": _percentiles_us(all_rounds),
+        "cpu_by_kind": {kind: _percentiles_us(v) for kind, v in sorted(sim.cpu_by_kind.items())},
+        "rounds_per_sec": rounds / wall if wall else 0.0,
+        "virtual_s": virtual,
+        "speedup": virtual / wall if wall else 0.0,
+        "telegram_calls_per_round": sum(session.calls.values()) / rounds if rounds else 0.0,
+        "telegram_by_method": dict(session.calls),
+        "money": {
+            "deposits": sim.deposits,
+            "house": get_balance(sim.house),
+            "in_play": sim.locked(),
+            "checks": sim.checks,
+            "conserved": error is None,
+        },
+        "balances_digest": sim.digest(),
+        "error": error,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dice", type=int, default=2000, help="раундов костей")
+    parser.add_argument("--banker", type=int, default=1000, help="раундов Банкира")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--balance", type=int, default=10_000, help="пополнение при нехватке средств")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="куда сохранить JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.out:
+        folder = os.path.dirname(args.out)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    if result["error"]:
+        print("Нарушено сохранение денег:", result["error"], file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/user_store.py
+"""
+UserStore против двух dict (как было в app/services/balances.py):
+память на пользователя, загрузка, get_balance / change_balance, поиск по username.
+
+    python -m benchmarks.user_store --users 1000000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from app.services.user_store import UserStore
+
+
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789_"
+
+
+def _users(n: int, seed: int):
+    """
+    (uid, username, balance) как из таблицы users. Генератор: значения
+    создаются заново для каждого варианта, поэтому в замер памяти dict
+    входят и сами int/str, которые он держит.
+    """
+    rng = random.Random(seed)
+    # telegram id: до 10 знаков, username — до 32 символов [a-z0-9_], не у всех
+    for uid in rng.sample(range(10**6, 8 * 10**9), n):
+        name = None
+        if rng.random() < 0.8:
+            name = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(5, 16)))
+        yield uid, name, rng.randint(0, 10**6)
+
+
+def _memory(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def _load_time(build) -> float:
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    return time.perf_counter() - started
+
+
+def _timeit(fn, ops: int) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) / ops * 1e9
+
+
+def run(n: int, ops: int, seed: int) -> None:
+    def build_dicts():
+        user_balances = {}
+        user_usernames = {}
+        for uid, name, bal in _users(n, seed):
+            user_balances[uid] = bal
+            user_usernames[uid] = name
+        return user_balances, user_usernames
+
+    def build_store():
+        store = UserStore()
+        store.load(_users(n, seed))
+        return store
+
+    dict_bytes = _memory(build_dicts)
+    store_bytes = _memory(build_store)
+    # время загрузки включает генерацию строк — одинаково для обоих вариантов
+    dict_load = _load_time(build_dicts)
+    store_load = _load_time(build_store)
+
+    user_balances, user_usernames = build_dicts()
+    store = build_store()
+
+    rng = random.Random(seed + 1)
+    uids = list(user_balances)
+    probe = [rng.choice(uids) for _ in range(ops)]
+    lookup_name = next(name for name in reversed(user_usernames.values()) if name)
+
+    def dict_get():
+        for uid in probe:
+            user_balances.get(uid, 0)
+
+    def store_get():
+        for uid in probe:
+            store.get_balance(uid)
+
+    def dict_change():
+        for uid in probe:
+            user_balances[uid] = user_balances.get(uid, 0) + 1
+
+    def store_change():
+        for uid in probe:
+            store.add_balance(uid, 1)
+
+    def dict_find():
+        target = lookup_name.lower()
+        for uid, stored in user_usernames.items():
+            if stored and stored.lower() == target:
+                return uid
+
+    def store_find():
+        return store.find_username(lookup_name)
+
+    assert dict_find() == store_find()
+
+    rows = [
+        ("память, МБ", dict_bytes / 2**20, store_bytes / 2**20),
+        ("байт на пользователя", dict_bytes / n, store_bytes / n),
+        ("загрузка, сек", dict_load, store_load),
+        ("get_balance, нс", _timeit(dict_get, ops), _timeit(store_get, ops)),
+        ("change_balance, нс", _timeit(dict_change, ops), _timeit(store_change, ops)),
+        ("поиск по username, мс", _timeit(dict_find, 1) / 1e6, _timeit(store_find, 1) / 1e6),
+    ]
+
+    print(f"Пользователей: {n}, операций: {ops}")
+    print(f"{'':24} {'dict':>12} {'UserStore':>12}")
+    for name, a, b in rows:
+        print(f"{name:24} {a:12.2f} {b:12.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run(args.users, args.ops, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# tests/test_raffle_journal.py
+"""
+Журнал раундов Банкира (services/raffle_journal.py) и восстановление
+по нему (services/raffle.py: _replay), а также розыгрыш по дереву
+Фенвика (WeightedTickets) против наивного перебора.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import random
+import time
+
+import pytest
+
+from app.services import raffle, raffle_journal, scheduler
+from app.services.balances import get_balance, user_balances
+from app.services.raffle import WeightedTickets
+from app.services.raffle_journal import JournalError, journal_sync, read_journal
+
+ALICE, BOB, CAROL = 9_000_001, 9_000_002, 9_000_003
+
+
+def _reset_rooms() -> None:
+    for room_id in list(raffle.raffle_rooms):
+        if raffle.raffle_rooms[room_id]["private"]:
+            del raffle.raffle_rooms[room_id]
+        else:
+            raffle.raffle_rooms[room_id]["round"] = None
+    for key in [k for k in scheduler._jobs if k.startswith("raffle_")]:
+        scheduler.cancel(key)
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """Пустой журнал во временной папке и комнаты без раундов."""
+    path = tmp_path / "raffle.journal"
+    raffle_journal._close()
+    raffle_journal._buf.clear()
+    raffle_journal._waiters.clear()
+    monkeypatch.setattr(raffle_journal, "RAFFLE_JOURNAL_PATH", str(path))
+    monkeypatch.setattr(raffle, "next_raffle_id", 1)
+    # итоги розыгрыша не рассылаем
+    monkeypatch.setattr(raffle, "broadcast_later", lambda *args, **kwargs: None)
+    _reset_rooms()
+    for uid in (ALICE, BOB, CAROL):
+        user_balances[uid] = 10_000
+    yield path
+    raffle_journal._close()
+    _reset_rooms()
+
+
+def _restart() -> dict:
+    """Как после перезапуска: состояние в памяти потеряно, остаётся журнал."""
+    _reset_rooms()
+    raffle.next_raffle_id = 1
+    return raffle._replay(read_journal())
+
+
+def _write_lines(path, records, tail: str = "") -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        for rec in records:
+            fh.write(json.dumps(rec) + "\n")
+        fh.write(tail)
+
+
+_OPEN = {"t": "open", "id": 7, "room": 1, "entry": 10, "at": "2026-01-01T00:00:00+00:00"}
+
+
+def _bet(uid: int, shares: int) -> dict:
+    return {"t": "bet", "id": 7, "uid": uid, "shares": shares, "amount": shares * 10, "at": 1.0e9}
+
+
+# =====================================================
+#                  ВОССТАНОВЛЕНИЕ
+# =====================================================
+
+def test_round_trip_open_bet_cancel_timer(journal):
+    async def scenario():
+        await raffle._process_raffle_bet(ALICE, ALICE, 30, 1)
+        await raffle._process_raffle_bet(BOB, BOB, 50, 1)
+        await raffle._process_raffle_bet(CAROL, CAROL, 20, 1)
+        await raffle._process_raffle_bet(ALICE, ALICE, 10, 1)
+        await raffle.cancel_user_bets(CAROL, 1)
+
+    asyncio.run(scenario())
+    live = raffle.raffle_rooms[1]["round"]
+    assert [r["t"] for r in read_journal()] == ["open", "bet", "bet", "timer", "bet", "bet", "cancel"]
+
+    rounds = _restart()
+    r = rounds[live.id]
+    assert raffle.raffle_rooms[1]["round"] is r
+    assert {uid: (s.shares, s.amount) for uid, s in r.stakes.items()} == {
+        ALICE: (4, 40),
+        BOB: (5, 50),
+    }
+    assert r.total_bank == 90
+    assert r.tickets.total == 9
+    assert r.draw_at == live.draw_at
+    assert r.status == raffle.RoundStatus.TIMER
+    assert raffle.next_raffle_id == live.id + 1
+
+
+def test_draw_is_final_on_replay(journal):
+    async def scenario():
+        # комната 1000 ₽ за долю
+        await raffle._process_raffle_bet(ALICE, ALICE, 3000, 5)
+        await raffle._process_raffle_bet(BOB, BOB, 5000, 5)
+        await raffle.perform_raffle_draw(5)
+
+    asyncio.run(scenario())
+    records = read_journal()
+    draw = records[-1]
+    assert draw["t"] == "draw" and draw["winner"] in (ALICE, BOB) and not draw["refund"]
+    assert get_balance(ALICE) + get_balance(BOB) == 20_000 - 80  # комиссия 1%
+
+    assert _restart() == {}
+    assert raffle.raffle_rooms[5]["round"] is None
+
+
+def test_crash_after_draw_record_does_not_redraw(journal):
+    # итог записан, выплаты не успели — раунд не восстанавливается
+    _write_lines(
+        journal,
+        [_OPEN, _bet(ALICE, 3), _bet(BOB, 5), {"t": "timer", "id": 7, "draw_at": 2.0e9},
+         {"t": "draw", "id": 7, "winner": BOB, "refund": False}],
+    )
+    assert _restart() == {}
+    assert raffle.raffle_rooms[1]["round"] is None
+
+
+def test_crash_before_draw_restores_round_and_timer(journal):
+    _write_lines(
+        journal,
+        [_OPEN, _bet(ALICE, 3), _bet(BOB, 5), {"t": "timer", "id": 7, "draw_at": 2.0e9}],
+    )
+    rounds = _restart()
+    assert list(rounds) == [7]
+    r = rounds[7]
+    assert r.total_bank == 80 and r.tickets.total == 8
+    assert r.draw_at.timestamp() == 2.0e9
+
+    asyncio.run(raffle.restore_raffle_state())
+    assert scheduler.scheduled_due("raffle_draw:1") is not None
+    # журнал переписан компактно: то же состояние
+    assert [rec["t"] for rec in read_journal()] == ["open", "bet", "bet", "timer"]
+
+
+def test_torn_last_line_is_ignored(journal):
+    _write_lines(
+        journal,
+        [_OPEN, _bet(ALICE, 3), _bet(BOB, 5)],
+        tail='{"t":"cancel","id":7,"ui',
+    )
+    records = read_journal()
+    assert [rec["t"] for rec in records] == ["open", "bet", "bet"]
+    rounds = _restart()
+    assert set(rounds[7].stakes) == {ALICE, BOB}
+
+
+def test_private_room_closed_by_draw(journal):
+    _write_lines(
+        journal,
+        [
+            {"t": "room", "room": 50, "owner": ALICE},
+            {**_OPEN, "room": 50, "entry": None},
+            _bet(ALICE, 1),
+            {"t": "draw", "id": 7, "winner": None, "refund": True},
+        ],
+    )
+    assert _restart() == {}
+    assert 50 not in raffle.raffle_rooms
+
+
+# =====================================================
+#                  СБОЙ ЗАПИСИ
+# =====================================================
+
+def test_failed_write_is_reported_and_retried(journal, monkeypatch):
+    real_write = raffle_journal._write_sync
+
+    def broken(data: bytes) -> None:
+        raise OSError("диск отвалился")
+
+    async def scenario():
+        monkeypatch.setattr(raffle_journal, "_write_sync", broken)
+        raffle_journal.journal_write({"t": "room", "room": 60, "owner": ALICE})
+        with pytest.raises(JournalError):
+            await journal_sync()
+        assert read_journal() == []
+
+        monkeypatch.setattr(raffle_journal, "_write_sync", real_write)
+        await journal_sync()
+
+    asyncio.run(scenario())
+    assert read_journal() == [{"t": "room", "room": 60, "owner": ALICE}]
+
+
+def test_waiter_joining_during_failed_write_is_not_left_hanging(journal, monkeypatch):
+    def slow_broken(data: bytes) -> None:
+        time.sleep(0.05)
+        raise OSError("диск отвалился")
+
+    async def late_sync():
+        # встаёт в очередь, пока первая пачка пишется в потоке
+        await asyncio.sleep(0.01)
+        raffle_journal.journal_write({"t": "room_close", "room": 62})
+        await journal_sync()
+
+    async def scenario():
+        monkeypatch.setattr(raffle_journal, "_write_sync", slow_broken)
+        raffle_journal.journal_write({"t": "room", "room": 62, "owner": ALICE})
+        results = await asyncio.wait_for(
+            asyncio.gather(journal_sync(), late_sync(), return_exceptions=True), 1
+        )
+        assert all(isinstance(r, JournalError) for r in results)
+
+        monkeypatch.setattr(raffle_journal, "_write_sync", real_write)
+        await asyncio.wait_for(journal_sync(), 1)
+
+    real_write = raffle_journal._write_sync
+    asyncio.run(scenario())
+    assert read_journal() == [
+        {"t": "room", "room": 62, "owner": ALICE},
+        {"t": "room_close", "room": 62},
+    ]
+
+
+def test_failed_fsync_truncates_partial_batch(journal, monkeypatch):
+    real_fsync = raffle_journal.os.fsync
+    failures = [OSError("fsync")]
+
+    def flaky_fsync(fd: int) -> None:
+        if failures:
+            raise failures.pop()
+        real_fsync(fd)
+
+    async def scenario():
+        raffle_journal.journal_write({"t": "room", "room": 61, "owner": BOB})
+        await raffle_journal.journal_sync()
+        monkeypatch.setattr(raffle_journal.os, "fsync", flaky_fsync)
+        raffle_journal.journal_write({"t": "room_close", "room": 61})
+        with pytest.raises(JournalError):
+            await journal_sync()
+        # write прошёл, fsync нет — хвост обрезан, повтор не задвоит событие
+        assert len(read_journal()) == 1
+        await journal_sync()
+
+    asyncio.run(scenario())
+    assert read_journal() == [
+        {"t": "room", "room": 61, "owner": BOB},
+        {"t": "room_close", "room": 61},
+    ]
+
+
+def test_bet_rolled_back_when_journal_fails(journal, monkeypatch):
+    real_write = raffle_journal._write_sync
+
+    def broken(data: bytes) -> None:
+        raise OSError("диск отвалился")
+
+    async def scenario():
+        await raffle._process_raffle_bet(ALICE, ALICE, 30, 1)
+        monkeypatch.setattr(raffle_journal, "_write_sync", broken)
+        answer = await raffle._process_raffle_bet(BOB, BOB, 50, 1)
+        assert "возвращены" in answer
+        monkeypatch.setattr(raffle_journal, "_write_sync", real_write)
+        await journal_sync()
+
+    asyncio.run(scenario())
+    r = raffle.raffle_rooms[1]["round"]
+    assert get_balance(BOB) == 10_000
+    assert set(r.stakes) == {ALICE}
+    assert r.draw_at is None and r.status == raffle.RoundStatus.OPEN
+
+    # в журнале ставка и её откат — восстановленный раунд совпадает с живым
+    assert [rec["t"] for rec in read_journal()] == ["open", "bet", "bet", "timer", "undo"]
+    restored = _restart()[r.id]
+    assert {uid: s.amount for uid, s in restored.stakes.items()} == {ALICE: 30}
+    assert restored.draw_at is None
+
+
+def test_cancel_refunds_only_after_sync(journal, monkeypatch):
+    real_write = raffle_journal._write_sync
+    calls = []
+
+    def flaky(data: bytes) -> None:
+        calls.append(data)
+        if len(calls) == 1:
+            raise OSError("диск отвалился")
+        real_write(data)
+
+    async def scenario():
+        await raffle._process_raffle_bet(ALICE, ALICE, 30, 1)
+        monkeypatch.setattr(raffle, "_JOURNAL_RETRY_SECONDS", 0)
+        monkeypatch.setattr(raffle_journal, "_write_sync", flaky)
+        await raffle.cancel_user_bets(ALICE, 1)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert get_balance(ALICE) == 10_000
+    assert read_journal()[-1] == {"t": "cancel", "id": 1, "uid": ALICE}
+
+
+# =====================================================
+#                  ДЕРЕВО ФЕНВИКА
+# =====================================================
+
+class _Target:
+    """Вместо генератора: randrange отдаёт заданное число."""
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+    def randrange(self, n: int) -> int:
+        assert 0 <= self.value < n
+        return self.value
+
+
+def test_fenwick_draw_matches_naive_weights():
+    rnd = random.Random(5)
+    tickets = WeightedTickets()
+    naive = {}
+
+    for step in range(400):
+        uid = rnd.randrange(60)
+        if naive and rnd.random() < 0.3:
+            victim = rnd.choice(list(naive))
+            assert tickets.remove(victim) == naive.pop(victim)
+        else:
+            shares = rnd.randint(1, 10)
+            tickets.add(uid, shares)
+            naive[uid] = naive.get(uid, 0) + shares
+
+        assert tickets.total == sum(naive.values())
+        if step % 20 or not naive:
+            continue
+        # каждое значение randrange выбирает ровно одного владельца:
+        # у каждого участника столько исходов, сколько у него долей
+        wins = {}
+        for target in range(tickets.total):
+            winner = tickets.draw(_Target(target))
+            wins[winner] = wins.get(winner, 0) + 1
+        assert wins == naive
+        for uid, weight in naive.items():
+            assert tickets.weight(uid) == weight
+            assert tickets.chance(uid) == pytest.approx(weight / tickets.total)
+
+
+def test_fenwick_draw_is_contiguous_per_slot():
+    tickets = WeightedTickets()
+    for uid, shares in [(1, 3), (2, 1), (3, 4), (4, 2), (5, 5)]:
+        tickets.add(uid, shares)
+    tickets.remove(3)
+    tickets.add(6, 2)       # занимает освободившийся слот
+    expected = [1] * 3 + [2] + [6] * 2 + [4] * 2 + [5] * 5
+    assert [tickets.draw(_Target(t)) for t in range(tickets.total)] == expected
+
+    with pytest.raises(ValueError):
+        WeightedTickets().draw(random.Random(1))
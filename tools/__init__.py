@@ -0,0 +1,7 @@
+# tools/__init__.py
+"""
+Утилиты для локальных проверок бота (запуск из корня репозитория):
+
+    python tools/replay_updates.py updates.jsonl --url ...
+    python -m tools.fake_bot_api --port 8081 --latency-ms 40
+"""
@@ -0,0 +1,283 @@
+# tools/fake_bot_api.py
+"""
+Локальная замена Telegram Bot API для нагрузочных проверок исходящего пути.
+
+Отвечает на методы, которыми пользуется бот: sendMessage, sendDice,
+editMessageText, answerCallbackQuery, getUpdates (+ getMe, deleteWebhook,
+setWebhook, чтобы бот стартовал). Каждый вызов записывается.
+
+- задержка ответа: --latency-ms ± --jitter-ms
+- ошибки: --error-rate (500), --rate-429 (429 с retry_after = --retry-after)
+- лимиты как у Telegram: --chat-limit сообщений в секунду на чат и
+  --global-limit на всех; сверх лимита — 429 с честным retry_after
+- --record calls.jsonl — журнал вызовов (метод, чат, статус, задержка)
+
+Служебные адреса:
+    GET  /_stats     — сводка по методам: статусы, p50/p95 задержки
+    POST /_updates   — положить апдейт (или список) в очередь getUpdates
+    POST /_reset     — очистить журнал и очередь
+
+Бот направляется сюда через TELEGRAM_API_BASE (app/config.py):
+
+    python -m tools.fake_bot_api --port 8081 --latency-ms 40 --rate-429 0.01
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 DATABASE_URL=sqlite:// python main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List
+
+from aiohttp import web
+
+_BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+_CHAT_METHODS = {"sendMessage", "sendDice", "editMessageText"}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class FakeBotApi:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: int = 1,
+        chat_limit: float = 0.0,
+        global_limit: float = 0.0,
+        record_path: str | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.chat_limit = chat_limit
+        self.global_limit = global_limit
+        self.random = random.Random(seed)
+
+        # журнал: (время, метод, chat_id, статус, задержка ответа в сек)
+        self.calls: List[tuple] = []
+        self._record = open(record_path, "a", encoding="utf-8") if record_path else None
+
+        self._message_ids: Dict[Any, int] = defaultdict(int)
+        self._chat_sent: Dict[Any, Deque[float]] = defaultdict(deque)
+        self._global_sent: Deque[float] = deque()
+
+        self._updates: List[Dict[str, Any]] = []
+        self._updates_ready = asyncio.Event()
+
+    # ---------- ответы ----------
+
+    def _message(self, chat_id: Any, **extra: Any) -> Dict[str, Any]:
+        self._message_ids[chat_id] += 1
+        return {
+            "message_id": self._message_ids[chat_id],
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": _BOT_USER,
+            **extra,
+        }
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout > 0:
+            self._updates_ready.clear()
+            try:
+                await asyncio.wait_for(self._updates_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    async def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        chat_id = params.get("chat_id")
+        if method == "sendMessage":
+            return self._message(chat_id, text=params.get("text", ""))
+        if method == "sendDice":
+            emoji = params.get("emoji") or "🎲"
+            return self._message(
+                chat_id, dice={"emoji": emoji, "value": self.random.randint(1, 6)}
+            )
+        if method == "editMessageText":
+            return self._message(chat_id, text=params.get("text", ""))
+        if method in ("answerCallbackQuery", "deleteWebhook", "setWebhook"):
+            return True
+        if method == "getMe":
+            return _BOT_USER
+        if method == "getUpdates":
+            return await self._get_updates(params)
+        return None
+
+    # ---------- ошибки и лимиты ----------
+
+    def _limited(self, chat_id: Any, now: float) -> int:
+        """retry_after в секундах, если запрос сверх лимита; иначе 0."""
+        for limit, sent in (
+            (self.chat_limit, self._chat_sent[chat_id] if chat_id is not None else None),
+            (self.global_limit, self._global_sent),
+        ):
+            if not limit or sent is None:
+                continue
+            while sent and now - sent[0] >= 1.0:
+                sent.popleft()
+            if len(sent) >= limit:
+                return max(1, int(sent[0] + 1.0 - now + 0.999))
+        if chat_id is not None and self.chat_limit:
+            self._chat_sent[chat_id].append(now)
+        if self.global_limit:
+            self._global_sent.append(now)
+        return 0
+
+    def _error(self, method: str, params: Dict[str, Any]) -> Dict[str, Any] | None:
+        if method not in _CHAT_METHODS and method != "answerCallbackQuery":
+            return None
+        retry = self._limited(params.get("chat_id") if method in _CHAT_METHODS else None, time.monotonic())
+        if not retry and self.rate_429 and self.random.random() < self.rate_429:
+            retry = self.retry_after
+        if retry:
+            return {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry}",
+                "parameters": {"retry_after": retry},
+            }
+        if self.error_rate and self.random.random() < self.error_rate:
+            return {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+        return None
+
+    # ---------- HTTP ----------
+
+    async def _read_params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        form = await request.post()
+        params: Dict[str, Any] = {}
+        for key, value in form.items():
+            # aiogram шлёт сложные поля JSON-строками
+            if isinstance(value, str) and value[:1] in "{[":
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            params[key] = value
+        return params
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        method = request.match_info["method"]
+        params = await self._read_params(request)
+
+        if method != "getUpdates" and (self.latency or self.jitter):
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+
+        body = self._error(method, params)
+        if body is None:
+            result = await self._result(method, params)
+            if result is None:
+                body = {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+            else:
+                body = {"ok": True, "result": result}
+
+        status = 200 if body["ok"] else body["error_code"]
+        spent = time.perf_counter() - started
+        call = (time.time(), method, params.get("chat_id"), status, spent)
+        self.calls.append(call)
+        if self._record:
+            self._record.write(
+                json.dumps(dict(zip(("at", "method", "chat_id", "status", "latency"), call))) + "\n"
+            )
+        return web.json_response(body, status=status)
+
+    def stats(self) -> Dict[str, Any]:
+        by_method: Dict[str, Dict[str, Any]] = {}
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        for _, method, _, status, spent in self.calls:
+            st = by_method.setdefault(method, {"calls": 0, "statuses": defaultdict(int)})
+            st["calls"] += 1
+            st["statuses"][str(status)] += 1
+            latencies[method].append(spent)
+        for method, st in by_method.items():
+            st["p50_ms"] = _percentile(latencies[method], 0.50) * 1000
+            st["p95_ms"] = _percentile(latencies[method], 0.95) * 1000
+            st["statuses"] = dict(st["statuses"])
+        return {"calls": len(self.calls), "methods": by_method}
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def push_update(self, update: Dict[str, Any]) -> None:
+        self._updates.append(update)
+        self._updates_ready.set()
+
+    async def handle_push(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        for update in data if isinstance(data, list) else [data]:
+            self.push_update(update)
+        return web.json_response({"queued": len(self._updates)})
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.calls.clear()
+        self._updates.clear()
+        return web.json_response({"ok": True})
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_post("/_updates", self.handle_push)
+        app.router.add_post("/_reset", self.handle_reset)
+        return app
+
+    def close(self) -> None:
+        if self._record:
+            self._record.close()
+            self._record = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--chat-limit", type=float, default=0.0)
+    parser.add_argument("--global-limit", type=float, default=0.0)
+    parser.add_argument("--record", default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    api = FakeBotApi(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        chat_limit=args.chat_limit,
+        global_limit=args.global_limit,
+        record_path=args.record,
+        seed=args.seed,
+    )
+    try:
+        web.run_app(api.build_app(), host=args.host, port=args.port)
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# tools/replay_updates.py
+"""
+Отправить записанные апдейты Telegram на webhook бота (BOT_MODE=webhook).
+
+Файл — JSON-массив апдейтов, выгрузка getUpdates ({"ok": true,
+"result": [...]}, в одну строку или с отступами) или JSON Lines
+(по апдейту на строку), например логи. Пример:
+
+    python tools/replay_updates.py updates.jsonl \\
+        --url http://127.0.0.1:8080/telegram/webhook --secret $WEBHOOK_SECRET \\
+        --repeat 100 --concurrency 32
+
+--repeat N отправляет весь набор N раз с новыми update_id.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import aiohttp
+
+
+def load_updates(path: str) -> list:
+    with open(path, encoding="utf-8") as fh:
+        data = fh.read()
+    # сначала весь файл как один JSON-документ, JSON Lines — только если не вышло
+    try:
+        updates = json.loads(data)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+    # выгрузка getUpdates: {"ok": true, "result": [...]}
+    if isinstance(updates, dict) and "result" in updates:
+        return updates["result"]
+    # файл из одного апдейта
+    if isinstance(updates, dict):
+        return [updates]
+    return updates
+
+
+async def replay(args) -> None:
+    updates = load_updates(args.file)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+    statuses: Counter = Counter()
+    latencies = []
+
+    queue: asyncio.Queue = asyncio.Queue()
+    next_id = args.start_id
+    for _ in range(args.repeat):
+        for update in updates:
+            update = dict(update, update_id=next_id)
+            next_id += 1
+            queue.put_nowait(update)
+    total = queue.qsize()
+
+    async def worker(session: aiohttp.ClientSession):
+        while not queue.empty():
+            update = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with session.post(args.url, json=update, headers=headers) as resp:
+                    statuses[resp.status] += 1
+            except aiohttp.ClientError:
+                statuses["error"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(args.concurrency)))
+    spent = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    print(f"Отправлено {total} апдейтов за {spent:.2f} сек ({total / spent:.0f}/сек)")
+    print(f"Ответы: {dict(statuses)}")
+    print(f"Подтверждение: p50 {p50 * 1000:.1f} мс, p99 {p99 * 1000:.1f} мс")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/telegram/webhook")
+    parser.add_argument("--secret", default="")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--start-id", type=int, default=1)
+    asyncio.run(replay(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()